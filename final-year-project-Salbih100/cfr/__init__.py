@@ -0,0 +1,51 @@
+'''
+Library code shared by rps_trainer.py and rpslsp_trainer.py.
+
+Importing the package does no work. The names below are loaded from their
+modules the first time they are used, so a worker process that only needs
+one trainer does not pay for importing the rest (or NumPy) up front.
+'''
+
+import importlib
+
+LAZY_NAMES = {
+    "get_game": "cfr.games",
+    "RPS_PAYOFF": "cfr.games",
+    "RPSLSP_PAYOFF": "cfr.games",
+    "MatrixGameTrainer": "cfr.matrix_game_trainer",
+    "CompactGame": "cfr.compact_trainer",
+    "CompactTrainer": "cfr.compact_trainer",
+    "BatchedTrainer": "cfr.batched_trainer",
+    "CyclicTrainer": "cfr.cyclic",
+    "CFRTrainer": "cfr.extensive_form",
+    "train_from_log": "cfr.action_log",
+    "SweepTrainer": "cfr.sweep",
+    "LeagueTrainer": "cfr.league",
+    "TrainingJob": "cfr.parallel_runner",
+    "run_parallel": "cfr.parallel_runner",
+    "Coordinator": "cfr.distributed",
+    "OnlineTrainer": "cfr.opponent_model",
+    "ActionSampler": "cfr.sampler",
+    "HistoryRecorder": "cfr.history",
+    "plot_history": "cfr.plotting",
+    "export_plots": "cfr.plotting",
+    "PlayService": "cfr.play_server",
+    "Profiler": "cfr.profiling",
+    "solve_game": "cfr.exact",
+    "EquilibriumCache": "cfr.exact",
+    "ResultCache": "cfr.result_cache",
+}
+
+__all__ = sorted(LAZY_NAMES)
+
+
+def __getattr__(name):
+    if name not in LAZY_NAMES:
+        raise AttributeError("module 'cfr' has no attribute %r" % name)
+    value = getattr(importlib.import_module(LAZY_NAMES[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,3 @@
+from cfr.cli import main
+
+main()
@@ -0,0 +1,165 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+from cfr.checkpoint import restore
+from cfr.cli import parse_strategy
+from cfr.convergence import best_response_gap, normalise
+from cfr.games import GAMES, get_game
+from cfr.sampler import ActionSampler
+
+'''
+Training against logged opponent moves instead of a fixed opp_strategy.
+
+A log is a flat binary file with one byte per opponent action (so up to 256
+actions). train_from_log() memory-maps it and reads it a chunk at a time,
+nothing is parsed into Python objects. As in BatchedTrainer.train() the
+player's strategy is held for a block of records, each block is counted
+with one np.bincount over a slice of the map, and the block's regret is
+
+    payoff @ counts - strategy . (payoff @ counts) + 0.1 * records
+
+using the player's expected utility against the block rather than a
+sampled action of its own, so the per-record work is only the count. The
+per-block update works on a handful of Python floats.
+
+    python -m cfr.action_log moves.bin --write 1000000000 --opp-strategy 0.4,0.3,0.3
+    python -m cfr.action_log moves.bin --game rps
+
+Works with MatrixGameTrainer, CompactTrainer and BatchedTrainer (anything
+with payoff, regret_sum, strategy_sum and iteration). The records are
+added onto the trainer's iteration count. Only plain regret matching is
+supported: the blocks are weighted by their record counts, which the
+discounting and weighted averaging of the other update rules (see
+cfr.update_rules) do not fit, so a trainer with one of those is refused.
+'''
+
+
+class LogTrainingResult:
+    def __init__(self, records, seconds, counts, end):
+        self.records = records
+        self.seconds = seconds
+        # How often each action appeared in the part of the log that was read
+        self.counts = counts
+        # Record to carry on from
+        self.end = end
+        self.gb_per_second = records / seconds / 1e9 if seconds > 0 else float("inf")
+
+    # Empirical opponent strategy from the log
+    def opp_frequencies(self):
+        return normalise(self.counts)
+
+    def __repr__(self):
+        return ("LogTrainingResult(records=%d, seconds=%.3f, gb_per_second=%.3f)"
+                % (self.records, self.seconds, self.gb_per_second))
+
+
+# Writes `records` opponent actions drawn from opp_strategy, for testing
+def write_action_log(path, opp_strategy, records, seed=None, chunk_size=1 << 24):
+    if len(opp_strategy) > 256:
+        raise ValueError("action logs store one byte per action, at most 256 actions")
+    sampler = ActionSampler(len(opp_strategy), seed)
+    table = sampler.table(opp_strategy)
+    with open(path, "wb") as file:
+        for start in range(0, records, chunk_size):
+            sampler.sample_block(table, min(chunk_size, records - start)).astype(np.uint8).tofile(file)
+
+
+# Trains the player against the moves in the log at `path`, from record
+# `start` up to `limit` records. Returns a LogTrainingResult.
+def train_from_log(trainer, path, block_size=4096, chunk_size=1 << 26, start=0, limit=None):
+    if block_size < 1:
+        raise ValueError("block_size must be at least 1")
+    rule = getattr(trainer, "update_rule", None)
+    if rule is not None and (rule.changes_regrets or rule.gamma):
+        raise ValueError("train_from_log only supports the vanilla update rule, the trainer uses %r" % rule.name)
+    num_actions = trainer.NUM_ACTIONS
+    size = os.path.getsize(path)
+    end = size if limit is None else min(size, start + limit)
+    counts = np.zeros(num_actions, dtype=np.int64)
+    if start >= end:
+        return LogTrainingResult(0, 0.0, counts, start)
+
+    log = np.memmap(path, dtype=np.uint8, mode="r")
+    # utility_rows[b] is the utility of each action against opponent action b
+    utility_rows = np.asarray(trainer.payoff, dtype=np.float64).T
+    regret_sum = [float(r) for r in trainer.regret_sum]
+    strategy_sum = [float(s) for s in trainer.strategy_sum]
+    strategy = [0.0] * num_actions
+    chunk_records = max(block_size, chunk_size // block_size * block_size)
+
+    began = time.perf_counter()
+    for chunk_start in range(start, end, chunk_records):
+        chunk = log[chunk_start:min(end, chunk_start + chunk_records)]
+        if chunk.max() >= num_actions:
+            raise ValueError("%s has an action >= %d near record %d" % (path, num_actions, chunk_start))
+
+        block_counts = np.empty((-(-len(chunk) // block_size), num_actions), dtype=np.int64)
+        for b in range(len(block_counts)):
+            block_counts[b] = np.bincount(chunk[b * block_size:(b + 1) * block_size], minlength=num_actions)
+        counts += block_counts.sum(axis=0)
+        block_utilities = (block_counts @ utility_rows).tolist()
+        block_records = block_counts.sum(axis=1).tolist()
+
+        for utilities, records in zip(block_utilities, block_records):
+            # Regret matching, as in MatrixGameTrainer.regret_matching()
+            normalising_sum = 0.0
+            for x in range(num_actions):
+                if regret_sum[x] > 0:
+                    normalising_sum += regret_sum[x]
+            received = 0.0
+            for x in range(num_actions):
+                if normalising_sum > 0:
+                    strategy[x] = (regret_sum[x] if regret_sum[x] > 0 else 0.0) / normalising_sum
+                else:
+                    strategy[x] = 1.0 / num_actions
+                strategy_sum[x] += records * strategy[x]
+                received += strategy[x] * utilities[x]
+            received -= 0.1 * records
+            for x in range(num_actions):
+                regret_sum[x] += utilities[x] - received
+    seconds = time.perf_counter() - began
+    del log
+
+    restore(trainer.regret_sum, np.array(regret_sum))
+    restore(trainer.strategy_sum, np.array(strategy_sum))
+    trainer.iteration += end - start
+    return LogTrainingResult(end - start, seconds, counts, end)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="cfr.action_log", description="Train against a logged opponent.")
+    parser.add_argument("path")
+    parser.add_argument("--game", choices=sorted(GAMES), default="rps")
+    parser.add_argument("--write", type=int, metavar="RECORDS", default=None,
+                        help="write a log of RECORDS moves drawn from --opp-strategy first")
+    parser.add_argument("--opp-strategy", type=parse_strategy, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--block-size", type=int, default=4096)
+    parser.add_argument("--chunk-mb", type=int, default=64)
+    args = parser.parse_args(argv)
+
+    actions, payoff = get_game(args.game)
+    opp_strategy = args.opp_strategy or [1.0 / len(actions)] * len(actions)
+    if len(opp_strategy) != len(actions):
+        parser.error("--opp-strategy needs %d probabilities for %s" % (len(actions), args.game))
+    if args.write is not None:
+        start = time.perf_counter()
+        write_action_log(args.path, opp_strategy, args.write, args.seed)
+        print("Wrote %d records in %.2fs" % (args.write, time.perf_counter() - start))
+
+    from cfr.batched_trainer import BatchedTrainer
+    trainer = BatchedTrainer(payoff, opp_strategy, seed=args.seed)
+    result = train_from_log(trainer, args.path, args.block_size, args.chunk_mb << 20)
+    frequencies = result.opp_frequencies()
+    strategy = trainer.get_avg_strategy()
+    print("Records: %d in %.3fs, %.3f GB/s" % (result.records, result.seconds, result.gb_per_second))
+    print("Opponent frequencies:", " ".join("%s: %.5f" % (a, p) for a, p in zip(actions, frequencies)))
+    print("Player Strategy:", " ".join("%s: %.5f" % (a, p) for a, p in zip(actions, strategy)))
+    print("Best response gap:", round(best_response_gap(payoff, strategy, frequencies), 7))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from cfr.cyclic import make_batched_trainer
+from cfr.games import GAMES, HAND_WRITTEN_GAMES, get_game
+from cfr.matrix_game_trainer import MatrixGameTrainer
+
+'''
+Benchmark suite for the trainers. For every game (which sets the number of
+actions), engine, method and iteration count it measures:
+
+- iterations per second, over `repeats` fresh trainers
+- peak memory of one run, traced with tracemalloc in a separate run so the
+  tracing does not slow down the timed ones
+- time to epsilon, how long nash training takes to get the exploitability
+  down to epsilon (see cfr.convergence)
+
+Every measurement is summarised as min/median/mean/stdev/max and the whole
+report can be written as JSON and compared against an earlier one:
+
+    python -m cfr.benchmark --iterations 10000 100000 --repeats 5 --output before.json
+    python -m cfr.benchmark --iterations 10000 100000 --repeats 5 --output after.json
+    python -m cfr.benchmark --compare before.json after.json
+
+The python engine uses rpsTrainer and rpslspTrainer for the games they
+cover, so the numbers are for the classes main_method() runs. The batched
+engine uses CyclicTrainer for the rps-N games.
+'''
+
+FORMAT_VERSION = 1
+METHODS = ("train", "nash_equilibrium", "rps_to_nash")
+ENGINES = ("python", "batched")
+
+
+# The opponent train() plays against, the same skew for every game size
+def benchmark_opp_strategy(num_actions):
+    weights = [num_actions - a for a in range(num_actions)]
+    return [w / sum(weights) for w in weights]
+
+
+def make_trainer(game, engine, seed=None):
+    actions, payoff = get_game(game)
+    opp_strategy = benchmark_opp_strategy(len(actions))
+    if engine == "batched":
+        return make_batched_trainer(payoff, opp_strategy, seed=seed)
+    if engine != "python":
+        raise ValueError("unknown engine %r, expected one of %s" % (engine, list(ENGINES)))
+    if game == "rps":
+        from rps_trainer import rpsTrainer
+        return rpsTrainer(opp_strategy, seed)
+    if game == "rpslsp":
+        from rpslsp_trainer import rpslspTrainer
+        return rpslspTrainer(opp_strategy, seed)
+    return MatrixGameTrainer(payoff, opp_strategy, actions, seed)
+
+
+def summarise(values):
+    return {
+        "min": min(values),
+        "median": statistics.median(values),
+        "mean": statistics.mean(values),
+        "stdev": statistics.stdev(values) if len(values) > 1 else 0.0,
+        "max": max(values),
+        "runs": len(values),
+    }
+
+
+# Seconds for one call of `method`, the trainer is built outside the timer
+def time_method(game, engine, method, iterations, seed):
+    trainer = make_trainer(game, engine, seed)
+    run = getattr(trainer, method)
+    start = time.perf_counter()
+    run(iterations)
+    return time.perf_counter() - start
+
+
+# Peak bytes allocated while building the trainer and running `method`
+def peak_memory(game, engine, method, iterations, seed):
+    tracemalloc.start()
+    try:
+        trainer = make_trainer(game, engine, seed)
+        getattr(trainer, method)(iterations)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark_method(game, engine, method, iterations, repeats=3, memory=True):
+    seconds = [time_method(game, engine, method, iterations, seed) for seed in range(repeats)]
+    result = {
+        "game": game,
+        "num_actions": len(get_game(game)[0]),
+        "engine": engine,
+        "method": method,
+        "iterations": iterations,
+        "seconds": summarise(seconds),
+        "iterations_per_second": summarise([iterations / s for s in seconds]),
+    }
+    if memory:
+        result["peak_memory_bytes"] = peak_memory(game, engine, method, iterations, 0)
+    return result
+
+
+def benchmark_epsilon(game, engine, epsilon, max_iterations, check_every=1000, repeats=3):
+    runs = [make_trainer(game, engine, seed).train_until(epsilon, max_iterations, "nash", check_every)
+            for seed in range(repeats)]
+    converged = [run for run in runs if run.converged]
+    result = {
+        "game": game,
+        "num_actions": len(get_game(game)[0]),
+        "engine": engine,
+        "epsilon": epsilon,
+        "max_iterations": max_iterations,
+        "converged": len(converged),
+        "runs": len(runs),
+        "seconds": None,
+        "iterations": None,
+    }
+    # Only runs that got there count towards the time
+    if converged:
+        result["seconds"] = summarise([run.seconds for run in converged])
+        result["iterations"] = summarise([run.iterations for run in converged])
+    return result
+
+
+def run_suite(games=None, engines=ENGINES, methods=METHODS, iteration_counts=(10000, 100000),
+              repeats=3, epsilon=0.01, max_iterations=1000000, memory=True):
+    games = HAND_WRITTEN_GAMES if games is None else games
+    report = {
+        "format": FORMAT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "repeats": repeats,
+        "throughput": [],
+        "time_to_epsilon": [],
+    }
+    for game in games:
+        for engine in engines:
+            for method in methods:
+                for iterations in iteration_counts:
+                    report["throughput"].append(
+                        benchmark_method(game, engine, method, iterations, repeats, memory))
+            if epsilon is not None:
+                report["time_to_epsilon"].append(
+                    benchmark_epsilon(game, engine, epsilon, max_iterations, repeats=repeats))
+    return report
+
+
+def print_report(report):
+    print("Throughput (median of %d runs)" % report["repeats"])
+    print("%-8s %-8s %-17s %10s %14s %10s %12s" % (
+        "game", "engine", "method", "iterations", "iterations/s", "stdev %", "peak KiB"))
+    for result in report["throughput"]:
+        rate = result["iterations_per_second"]
+        memory = result.get("peak_memory_bytes")
+        print("%-8s %-8s %-17s %10d %14.0f %10.1f %12s" % (
+            result["game"], result["engine"], result["method"], result["iterations"],
+            rate["median"], 100.0 * rate["stdev"] / rate["mean"],
+            "-" if memory is None else "%.1f" % (memory / 1024.0)))
+
+    if report["time_to_epsilon"]:
+        print()
+        print("Time to exploitability <= epsilon, nash training (median of converged runs)")
+        print("%-8s %-8s %10s %12s %10s %10s" % (
+            "game", "engine", "epsilon", "iterations", "seconds", "converged"))
+        for result in report["time_to_epsilon"]:
+            if result["converged"]:
+                iterations = "%d" % result["iterations"]["median"]
+                seconds = "%.3f" % result["seconds"]["median"]
+            else:
+                iterations = seconds = "-"
+            print("%-8s %-8s %10g %12s %10s %7d/%d" % (
+                result["game"], result["engine"], result["epsilon"], iterations, seconds,
+                result["converged"], result["runs"]))
+
+
+# Lines up the throughput results of two reports and prints the change in
+# median iterations/sec. Returns the keys that got slower by more than
+# `threshold` (a fraction).
+def compare_reports(before, after, threshold=0.1):
+    def key(result):
+        return (result["game"], result["engine"], result["method"], result["iterations"])
+
+    old = {key(result): result for result in before["throughput"]}
+    regressions = []
+    print("%-8s %-8s %-17s %10s %14s %14s %9s" % (
+        "game", "engine", "method", "iterations", "before/s", "after/s", "change"))
+    for result in after["throughput"]:
+        if key(result) not in old:
+            continue
+        old_rate = old[key(result)]["iterations_per_second"]["median"]
+        new_rate = result["iterations_per_second"]["median"]
+        change = new_rate / old_rate - 1
+        flag = ""
+        if change < -threshold:
+            flag = "  REGRESSION"
+            regressions.append(key(result))
+        print("%-8s %-8s %-17s %10d %14.0f %14.0f %+8.1f%%%s" % (
+            key(result) + (old_rate, new_rate, 100.0 * change, flag)))
+    return regressions
+
+
+def load_report(path):
+    with open(path) as file:
+        report = json.load(file)
+    if report.get("format") != FORMAT_VERSION:
+        raise ValueError("%s is not a benchmark report this version can read" % path)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="cfr.benchmark", description="Benchmark the trainers.")
+    parser.add_argument("--games", nargs="+", choices=sorted(GAMES), default=None,
+                        help="default: %s, the rps-N games cover larger action counts" % " ".join(HAND_WRITTEN_GAMES))
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES))
+    parser.add_argument("--methods", nargs="+", choices=METHODS, default=list(METHODS))
+    parser.add_argument("--iterations", nargs="+", type=int, default=[10000, 100000])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--epsilon", type=float, default=0.01,
+                        help="target exploitability for time to epsilon, 0 to skip it")
+    parser.add_argument("--max-iterations", type=int, default=1000000)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc runs")
+    parser.add_argument("--output", help="write the report to this JSON file")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"),
+                        help="compare two saved reports instead of running")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="slowdown (fraction) reported as a regression by --compare")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        regressions = compare_reports(load_report(args.compare[0]), load_report(args.compare[1]),
+                                      args.threshold)
+        return 1 if regressions else 0
+
+    if args.repeats < 1:
+        parser.error("--repeats must be at least 1")
+    report = run_suite(args.games, args.engines, args.methods, args.iterations, args.repeats,
+                       args.epsilon or None, args.max_iterations, not args.no_memory)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+        print("\nWrote", args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+import os
+from array import array
+
+import numpy as np
+
+from cfr.history import RETENTIONS, HistoryRecorder
+
+'''
+Checkpoint and resume for long training runs.
+
+The state file is a fixed layout binary file opened with np.memmap: a small
+header followed by two state slots. A checkpoint copies the regrets,
+strategy sums, RNG state (which is enough to draw the sampler's pre-drawn
+numbers again) and the history buffers into the older slot, then flips the header to point at it. Nothing
+is pickled and nothing is allocated, so a checkpoint is a few memory copies
+into the page cache. If the process dies half way through a checkpoint the
+other slot is still complete.
+
+    checkpointer = Checkpointer("run.ckpt", trainer, every=1000000)
+    trainer.train(1000000000, checkpointer=checkpointer)
+
+    # after a crash, with a trainer built the same way
+    resume_training("run.ckpt", trainer)
+
+Works with MatrixGameTrainer (and so rpsTrainer/rpslspTrainer),
+CompactTrainer, BatchedTrainer and CyclicTrainer. The trainers only
+checkpoint between sample blocks, so the trainer does not have to save
+actions it has drawn but not used yet.
+'''
+
+MAGIC = b"CFRCKPT1"
+VERSION = 1
+MODES = ("train", "nash", "expected")
+
+
+def header_dtype():
+    return np.dtype([
+        ("magic", "S8"),
+        ("version", "<u4"),
+        ("num_actions", "<u4"),
+        ("history_capacity", "<i8"),
+        ("retention", "<i8"),
+        ("latest", "<i8"),
+    ])
+
+
+def slot_dtype(num_actions, history_capacity):
+    return np.dtype([
+        ("mode", "<i8"),
+        ("iteration", "<i8"),
+        ("iterations", "<i8"),
+        ("regret_sum", "<f8", (num_actions,)),
+        ("strategy_sum", "<f8", (num_actions,)),
+        ("opp_regret_sum", "<f8", (num_actions,)),
+        ("opp_strategy_sum", "<f8", (num_actions,)),
+        ("opp_strategy", "<f8", (num_actions,)),
+        # PCG64 state and increment as low/high 64 bit halves, has_uint32,
+        # uinteger. block_rng is the state before the sampler's current block
+        # of uniforms was drawn.
+        ("rng", "<u8", (6,)),
+        ("block_rng", "<u8", (6,)),
+        ("uniform_count", "<i8"),
+        ("uniform_position", "<i8"),
+        ("history_count", "<i8"),
+        ("history_next", "<i8"),
+        ("history_interval", "<i8"),
+        ("history_ratio", "<f8"),
+        ("history_iterations", "<i8", (history_capacity,)),
+        ("history_strategies", "<f8", (history_capacity, num_actions)),
+    ])
+
+
+def file_dtype(num_actions, history_capacity):
+    return np.dtype([
+        ("header", header_dtype()),
+        ("slots", slot_dtype(num_actions, history_capacity), (2,)),
+    ])
+
+
+MASK_64 = (1 << 64) - 1
+
+
+def pack_rng(state):
+    if state is None:
+        return [0] * 6
+    if state["bit_generator"] != "PCG64":
+        raise ValueError("only PCG64 generators can be checkpointed, got %s" % state["bit_generator"])
+    value, increment = state["state"]["state"], state["state"]["inc"]
+    return [value & MASK_64, value >> 64, increment & MASK_64, increment >> 64,
+            state["has_uint32"], state["uinteger"]]
+
+
+def unpack_rng(packed):
+    packed = [int(x) for x in packed]
+    return {
+        "bit_generator": "PCG64",
+        "state": {"state": packed[0] | (packed[1] << 64), "inc": packed[2] | (packed[3] << 64)},
+        "has_uint32": packed[4],
+        "uinteger": packed[5],
+    }
+
+
+# Copies saved values back into a trainer array without replacing the object,
+# lists stay lists, array('d') buffers stay arrays and NumPy arrays stay
+# NumPy arrays
+def restore(target, values):
+    if isinstance(target, list):
+        target[:] = values.tolist()
+    elif isinstance(target, array):
+        target[:] = array(target.typecode, values.tolist())
+    else:
+        target[:] = values
+
+
+# Checkpoint details returned when resuming
+class CheckpointState:
+    def __init__(self, mode, iteration, iterations):
+        self.mode = mode
+        self.iteration = iteration
+        self.iterations = iterations
+
+
+class Checkpointer:
+    # Opens (or creates) the state file for `trainer`. An existing file is
+    # only reused if it was written for the same shape of trainer.
+    def __init__(self, path, trainer, every=1000000):
+        if every < 1:
+            raise ValueError("every must be at least 1")
+        self.path = path
+        self.trainer = trainer
+        self.every = every
+
+        history = trainer.history
+        self.has_history = isinstance(history, HistoryRecorder)
+        capacity = history.capacity if self.has_history else 0
+        retention = RETENTIONS.index(history.retention) if self.has_history else -1
+        dtype = file_dtype(trainer.NUM_ACTIONS, capacity)
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            if os.path.getsize(path) != dtype.itemsize:
+                raise ValueError("%s was written for a different trainer" % path)
+            self.memory = np.memmap(path, dtype=dtype, mode="r+", shape=())
+            header = self.memory["header"]
+            if (header["magic"] != MAGIC or header["version"] != VERSION
+                    or header["num_actions"] != trainer.NUM_ACTIONS
+                    or header["history_capacity"] != capacity or header["retention"] != retention):
+                raise ValueError("%s was written for a different trainer" % path)
+        else:
+            self.memory = np.memmap(path, dtype=dtype, mode="w+", shape=())
+            header = self.memory["header"]
+            header["magic"] = MAGIC
+            header["version"] = VERSION
+            header["num_actions"] = trainer.NUM_ACTIONS
+            header["history_capacity"] = capacity
+            header["retention"] = retention
+            header["latest"] = -1
+            self.memory.flush()
+
+    # Iteration at which the next checkpoint is due
+    def next_checkpoint(self, iteration):
+        return (iteration // self.every + 1) * self.every
+
+    # Writes the trainer state into the older slot and makes it the latest.
+    # sync=True also asks the OS to write the pages to disk.
+    def save(self, mode, iteration, iterations, sync=False):
+        trainer = self.trainer
+        header = self.memory["header"]
+        index = 0 if header["latest"] != 0 else 1
+        slot = self.memory["slots"][index]
+
+        slot["mode"] = MODES.index(mode)
+        slot["iteration"] = iteration
+        slot["iterations"] = iterations
+        slot["regret_sum"] = trainer.regret_sum
+        slot["strategy_sum"] = trainer.strategy_sum
+        slot["opp_regret_sum"] = trainer.opp_regret_sum
+        slot["opp_strategy_sum"] = trainer.opp_strategy_sum
+        slot["opp_strategy"] = trainer.opp_strategy
+
+        rng_state, block_state, count, position = trainer.sampler.get_state()
+        slot["rng"] = pack_rng(rng_state)
+        slot["block_rng"] = pack_rng(block_state)
+        slot["uniform_count"] = count
+        slot["uniform_position"] = position
+
+        if self.has_history:
+            history = trainer.history
+            stored = len(history)
+            slot["history_count"] = history.count
+            slot["history_next"] = history.next_iteration
+            slot["history_interval"] = history.interval
+            slot["history_ratio"] = history.ratio
+            slot["history_iterations"][:stored] = history.iteration_buffer[:stored]
+            slot["history_strategies"][:stored] = history.strategy_buffer[:stored]
+
+        header["latest"] = index
+        if sync:
+            self.memory.flush()
+
+    # Loads the latest checkpoint into the trainer, returns a CheckpointState
+    # or None when nothing has been saved yet
+    def load(self):
+        header = self.memory["header"]
+        if header["latest"] < 0:
+            return None
+        slot = self.memory["slots"][int(header["latest"])]
+        trainer = self.trainer
+
+        restore(trainer.regret_sum, slot["regret_sum"])
+        restore(trainer.strategy_sum, slot["strategy_sum"])
+        restore(trainer.opp_regret_sum, slot["opp_regret_sum"])
+        restore(trainer.opp_strategy_sum, slot["opp_strategy_sum"])
+        restore(trainer.opp_strategy, slot["opp_strategy"])
+        trainer.iteration = int(slot["iteration"])
+
+        count = int(slot["uniform_count"])
+        block_state = unpack_rng(slot["block_rng"]) if count > 0 else None
+        trainer.sampler.set_state((unpack_rng(slot["rng"]), block_state, count,
+                                   int(slot["uniform_position"])))
+
+        if self.has_history:
+            history = trainer.history
+            history.count = int(slot["history_count"])
+            history.next_iteration = int(slot["history_next"])
+            history.interval = int(slot["history_interval"])
+            history.ratio = float(slot["history_ratio"])
+            stored = len(history)
+            history.iteration_buffer[:stored] = slot["history_iterations"][:stored]
+            history.strategy_buffer[:stored] = slot["history_strategies"][:stored]
+
+        return CheckpointState(MODES[int(slot["mode"])], int(slot["iteration"]), int(slot["iterations"]))
+
+    def close(self):
+        self.memory.flush()
+        del self.memory
+
+
+# Loads the latest checkpoint at `path` into `trainer` and carries on with the
+# run it came from, checkpointing to the same file. Returns the CheckpointState
+# that was resumed, or None if the file had no checkpoint in it.
+def resume_training(path, trainer, every=1000000):
+    checkpointer = Checkpointer(path, trainer, every)
+    state = checkpointer.load()
+    if state is None:
+        return None
+    remaining = state.iterations - state.iteration
+    if state.mode == "train":
+        trainer.train(remaining, checkpointer=checkpointer)
+    elif state.mode == "expected":
+        trainer.expected_nash_equilibrium(remaining, checkpointer=checkpointer)
+    else:
+        trainer.nash_equilibrium(remaining, checkpointer=checkpointer)
+    return state
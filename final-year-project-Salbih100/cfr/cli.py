@@ -0,0 +1,115 @@
+import argparse
+import time
+
+from cfr.games import GAMES, format_strategy, get_game
+
+'''
+Command line entry point for the trainers, e.g.
+
+    python -m cfr --game rps --mode train --iterations 1000000 --opp-strategy 0.4,0.3,0.3
+
+The trainer modules are only imported once the arguments have been parsed,
+and matplotlib only when --graph is given.
+'''
+
+MODES = ("train", "nash", "expected")
+ENGINES = ("python", "batched")
+# Kept here rather than imported from cfr.update_rules so --help stays cheap
+UPDATE_RULE_NAMES = ("vanilla", "rm+", "linear", "cfr+", "dcfr")
+
+
+# Parses "0.4,0.3,0.3" into a list of probabilities
+def parse_strategy(text):
+    try:
+        strategy = [float(p) for p in text.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected comma separated probabilities, got %r" % text)
+    if any(p < 0 for p in strategy) or abs(sum(strategy) - 1.0) > 1e-6:
+        raise argparse.ArgumentTypeError("probabilities must be non-negative and add to 1, got %r" % text)
+    return strategy
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cfr", description="Regret matching trainers for RPS and RPSLSP.")
+    parser.add_argument("--game", choices=sorted(GAMES), default="rps")
+    parser.add_argument("--mode", choices=MODES, default="nash",
+                        help="train: best response to a fixed opponent, nash: both players learn, "
+                             "expected: nash with full-width expected utilities instead of sampling")
+    parser.add_argument("--iterations", type=int, default=1000000)
+    parser.add_argument("--opp-strategy", type=parse_strategy, default=None,
+                        help="comma separated opponent probabilities (default: uniform)")
+    parser.add_argument("--engine", choices=ENGINES, default="python",
+                        help="python: MatrixGameTrainer, batched: NumPy BatchedTrainer (CyclicTrainer for rps-N)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--update-rule", choices=UPDATE_RULE_NAMES, default="vanilla",
+                        help="regret update rule (python engine only)")
+    parser.add_argument("--epsilon", type=float, default=None,
+                        help="stop once the exploitability is at most EPSILON (--iterations is the limit)")
+    parser.add_argument("--check-every", type=int, default=1000,
+                        help="iterations between exploitability checks with --epsilon")
+    parser.add_argument("--graph", nargs="?", const="", default=None, metavar="PATH",
+                        help="plot the strategy history, saved to PATH if given (--mode train only)")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    actions, payoff = get_game(args.game)
+    opp_strategy = args.opp_strategy
+    if opp_strategy is None:
+        opp_strategy = [1.0 / len(actions)] * len(actions)
+    if len(opp_strategy) != len(actions):
+        parser.error("--opp-strategy needs %d probabilities for %s" % (len(actions), args.game))
+    if args.iterations < 1:
+        parser.error("--iterations must be at least 1")
+
+    if args.engine == "batched" and args.update_rule != "vanilla":
+        parser.error("--update-rule is only supported by the python engine")
+    # Only train() records the average strategy history
+    if args.graph is not None and args.mode != "train":
+        parser.error("--graph needs --mode train, %s mode does not record a history" % args.mode)
+
+    if args.engine == "batched":
+        from cfr.cyclic import make_batched_trainer
+        trainer = make_batched_trainer(payoff, opp_strategy, seed=args.seed)
+    else:
+        from cfr.matrix_game_trainer import MatrixGameTrainer
+        trainer = MatrixGameTrainer(payoff, opp_strategy, actions, args.seed,
+                                    update_rule=args.update_rule)
+
+    from cfr.convergence import normalise
+
+    start = time.perf_counter()
+    iterations = args.iterations
+    if args.epsilon is not None:
+        result = trainer.train_until(args.epsilon, args.iterations, args.mode, args.check_every)
+        iterations = result.iterations
+    elif args.mode == "train":
+        trainer.train(args.iterations)
+    elif args.mode == "expected":
+        trainer.expected_nash_equilibrium(args.iterations)
+    else:
+        trainer.nash_equilibrium(args.iterations)
+    elapsed = time.perf_counter() - start
+    player = trainer.get_avg_strategy()
+    opponent = opp_strategy if args.mode == "train" else normalise(trainer.opp_strategy_sum)
+
+    print("Game:", args.game, " Mode:", args.mode, " Engine:", args.engine, " Update rule:", args.update_rule)
+    print("Number of Iterations:", iterations)
+    print("Player Strategy:", format_strategy(actions, player))
+    print("Opponent Strategy:", format_strategy(actions, opponent))
+    print("Exploitability:", round(trainer.exploitability(args.mode), 7))
+    if args.epsilon is not None:
+        print("Reached epsilon" if result.converged else "Did not reach epsilon", args.epsilon)
+    print("Time taken (s):", round(elapsed, 4))
+
+    if args.graph is not None:
+        from cfr.plotting import plot_history
+        title = "Opponent Strategy: " + ", ".join(str(p) for p in opp_strategy)
+        plot_history(trainer.history, actions, title, args.graph or None)
+    return 0
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import argparse
+import gc
+import tracemalloc
+from array import array
+
+from cfr.games import HAND_WRITTEN_GAMES, get_game
+from cfr.matrix_game_trainer import MatrixGameTrainer
+from cfr.sampler import ActionSampler
+from cfr.trainer_base import SampledTrainer
+from cfr.update_rules import get_update_rule
+
+'''
+A small-footprint trainer for keeping very many trainers (one per player)
+in memory at once.
+
+MatrixGameTrainer is built for one long run: every instance copies the
+payoff matrix into two utility tables, owns a NumPy generator with a block
+of 4096 pre-drawn uniforms and preallocates a 10000 sample HistoryRecorder.
+That is hundreds of kilobytes per instance.
+
+Here everything that only depends on the game lives in one CompactGame that
+all its trainers share, including the ActionSampler. A CompactTrainer is a
+__slots__ object holding its regrets, strategy sums and strategies as
+array('d') buffers, six contiguous N double arrays, and its iteration count. Regret
+matching writes the current strategy into the trainer's strategy buffer in
+place instead of building a new list every iteration. History is off unless
+a recorder is passed in.
+
+    game = CompactGame(RPS_PAYOFF, RPS_ACTIONS, seed=0)
+    players = [CompactTrainer(game, opp_strategy) for x in range(1000000)]
+
+A trainer with its own CompactGame and seed gives exactly the same numbers
+as a MatrixGameTrainer with that seed. Trainers sharing a game share its
+random stream, so their runs depend on the order they are trained in.
+
+    python -m cfr.compact_trainer --count 10000
+
+prints the bytes per instance of both trainers.
+'''
+
+
+# Everything a trainer needs that depends only on the game
+class CompactGame:
+    __slots__ = ("NUM_ACTIONS", "actions", "payoff", "utility_rows", "opp_utility_rows", "sampler")
+
+    def __init__(self, payoff, actions=None, seed=None):
+        self.NUM_ACTIONS = len(payoff)
+        for row in payoff:
+            if len(row) != self.NUM_ACTIONS:
+                raise ValueError("payoff matrix must be square")
+        if actions is None:
+            actions = ["action %d" % a for a in range(self.NUM_ACTIONS)]
+        self.actions = list(actions)
+        self.payoff = [list(row) for row in payoff]
+        # Same tables as MatrixGameTrainer, see there
+        self.utility_rows = [[self.payoff[a][b] for a in range(self.NUM_ACTIONS)]
+                             for b in range(self.NUM_ACTIONS)]
+        self.opp_utility_rows = [[-self.payoff[a][b] for b in range(self.NUM_ACTIONS)]
+                                 for a in range(self.NUM_ACTIONS)]
+        self.sampler = ActionSampler(self.NUM_ACTIONS, seed)
+
+
+# Regret matching into an existing strategy buffer, adds the strategy onto
+# strategy_sum multiplied by weight. Same arithmetic as
+# MatrixGameTrainer.regret_matching().
+def regret_matching(regret_sum, strategy, strategy_sum, weight=1):
+    normalising_sum = 0
+    for regret in regret_sum:
+        if regret > 0:
+            normalising_sum += regret
+
+    if normalising_sum > 0:
+        for x in range(len(strategy)):
+            regret = regret_sum[x]
+            probability = regret / normalising_sum if regret > 0 else 0.0
+            strategy[x] = probability
+            strategy_sum[x] += weight * probability
+    else:
+        probability = 1.0 / len(strategy)
+        for x in range(len(strategy)):
+            strategy[x] = probability
+            strategy_sum[x] += weight * probability
+
+
+# The training loops are MatrixGameTrainer's, from SampledTrainer. Only the
+# storage and get_strategy()/get_strategy_opp() are different.
+class CompactTrainer(SampledTrainer):
+    __slots__ = ("game", "regret_sum", "strategy", "strategy_sum", "opp_regret_sum",
+                 "opp_strategy", "opp_strategy_sum", "update_rule", "history", "profiler",
+                 "iteration")
+
+    def __init__(self, game, opp_strategy, update_rule="vanilla", history=None):
+        if len(opp_strategy) != game.NUM_ACTIONS:
+            raise ValueError("opponent strategy needs %d probabilities, got %d"
+                             % (game.NUM_ACTIONS, len(opp_strategy)))
+        zeros = array("d", bytes(8 * game.NUM_ACTIONS))
+        self.game = game
+        self.regret_sum = array("d", zeros)
+        self.strategy = array("d", zeros)
+        self.strategy_sum = array("d", zeros)
+        self.opp_regret_sum = array("d", zeros)
+        self.opp_strategy = array("d", opp_strategy)
+        self.opp_strategy_sum = array("d", zeros)
+        self.update_rule = get_update_rule(update_rule)
+        self.history = history
+        self.profiler = None
+        self.iteration = 0
+
+    # The game's attributes under the names the rest of the package uses
+    @property
+    def NUM_ACTIONS(self):
+        return self.game.NUM_ACTIONS
+
+    @property
+    def actions(self):
+        return self.game.actions
+
+    @property
+    def payoff(self):
+        return self.game.payoff
+
+    @property
+    def sampler(self):
+        return self.game.sampler
+
+    @property
+    def utility_rows(self):
+        return self.game.utility_rows
+
+    @property
+    def opp_utility_rows(self):
+        return self.game.opp_utility_rows
+
+    def get_strategy(self, weight=1):
+        regret_matching(self.regret_sum, self.strategy, self.strategy_sum, weight)
+        return self.strategy, self.strategy_sum
+
+    def get_strategy_opp(self, weight=1):
+        regret_matching(self.opp_regret_sum, self.opp_strategy, self.opp_strategy_sum, weight)
+        return self.opp_strategy, self.opp_strategy_sum
+
+    def get_action(self, strategy):
+        return self.game.sampler.sample(strategy)
+
+
+# Average bytes per instance of whatever factory() builds, measured with
+# tracemalloc over `count` live instances
+def memory_per_instance(factory, count=10000):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        instances = [factory() for x in range(count)]
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    # The list holding them is not part of an instance
+    list_bytes = instances.__sizeof__()
+    del instances
+    return (after - before - list_bytes) / count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="cfr.compact_trainer",
+                                     description="Memory per trainer instance, before and after.")
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--iterations", type=int, default=0,
+                        help="train every instance this many nash iterations before measuring")
+    args = parser.parse_args(argv)
+
+    print("%-8s %22s %22s" % ("game", "MatrixGameTrainer B", "CompactTrainer B"))
+    for name in HAND_WRITTEN_GAMES:
+        actions, payoff = get_game(name)
+        uniform = [1.0 / len(actions)] * len(actions)
+        game = CompactGame(payoff, actions, seed=0)
+
+        def matrix_trainer():
+            trainer = MatrixGameTrainer(payoff, uniform, actions, seed=0)
+            trainer.nash_equilibrium(args.iterations)
+            return trainer
+
+        def compact_trainer():
+            trainer = CompactTrainer(game, uniform)
+            trainer.nash_equilibrium(args.iterations)
+            return trainer
+
+        # MatrixGameTrainer is far bigger, fewer of them measure it as well
+        print("%-8s %22.0f %22.0f" % (name, memory_per_instance(matrix_trainer, max(1, args.count // 100)),
+                                      memory_per_instance(compact_trainer, args.count)))
+
+
+if __name__ == "__main__":
+    main()
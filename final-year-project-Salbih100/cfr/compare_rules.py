@@ -0,0 +1,74 @@
+import argparse
+import statistics
+
+from cfr.games import HAND_WRITTEN_GAMES, get_game
+from cfr.matrix_game_trainer import MatrixGameTrainer
+from cfr.update_rules import UPDATE_RULES
+
+'''
+Compares the update rules by how many iterations and seconds nash training
+needs to bring the exploitability down to epsilon, for every game.
+
+    python -m cfr.compare_rules --epsilon 0.01 --repeats 5
+
+Each rule is run with the same seeds. The medians are taken over the runs
+that reached epsilon, runs that hit max_iterations first would only report
+the limit, so they are counted in the "not reached" column instead.
+'''
+
+
+# Returns {(game, rule name): [ConvergenceResult for each seed]}
+def compare_rules(games=None, rules=None, epsilon=0.01, max_iterations=1000000,
+                  check_every=1000, repeats=3):
+    games = HAND_WRITTEN_GAMES if games is None else games
+    rules = list(UPDATE_RULES) if rules is None else rules
+    results = {}
+    for game in games:
+        actions, payoff = get_game(game)
+        uniform = [1.0 / len(actions)] * len(actions)
+        for rule in rules:
+            runs = []
+            for seed in range(repeats):
+                trainer = MatrixGameTrainer(payoff, uniform, actions, seed=seed, update_rule=rule)
+                runs.append(trainer.train_until(epsilon, max_iterations, "nash", check_every))
+            results[(game, rule)] = runs
+    return results
+
+
+# Median iterations and seconds over the runs that reached epsilon, None
+# for both when none did, and how many runs did not reach it
+def summarise(runs):
+    converged = [run for run in runs if run.converged]
+    if not converged:
+        return None, None, len(runs)
+    return (statistics.median(run.iterations for run in converged),
+            statistics.median(run.seconds for run in converged),
+            len(runs) - len(converged))
+
+
+def print_comparison(results, epsilon):
+    print("Iterations and seconds to exploitability <= %g (median over converged runs)" % epsilon)
+    print("%-8s %-8s %12s %10s %12s" % ("game", "rule", "iterations", "seconds", "not reached"))
+    for (game, rule), runs in results.items():
+        iterations, seconds, not_reached = summarise(runs)
+        print("%-8s %-8s %12s %10s %12d" % (
+            game, rule,
+            "-" if iterations is None else "%d" % iterations,
+            "-" if seconds is None else "%.3f" % seconds,
+            not_reached))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="cfr.compare_rules", description="Compare regret update rules.")
+    parser.add_argument("--epsilon", type=float, default=0.01)
+    parser.add_argument("--max-iterations", type=int, default=1000000)
+    parser.add_argument("--check-every", type=int, default=1000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args(argv)
+    results = compare_rules(epsilon=args.epsilon, max_iterations=args.max_iterations,
+                            check_every=args.check_every, repeats=args.repeats)
+    print_comparison(results, args.epsilon)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import time
+
+import numpy as np
+
+from cfr import streaming
+
+'''
+Exploitability and convergence based early stopping.
+
+For "nash" (and full-width "expected") training the exploitability is the
+sum of what each player could
+win by switching to a best response against the other's average strategy,
+max_a (A y)_a - min_b (x A)_b, which is 0 exactly at a Nash equilibrium. For
+"train" against a fixed opponent it is how much better the best response
+does than the player's average strategy, max_a (A y)_a - x A y.
+
+Both only need the average strategies and the payoff matrix, so checking
+costs O(NUM_ACTIONS^2) however long the run has been going, O(NUM_ACTIONS)
+for the generated cyclic games.
+'''
+
+
+def normalise(strategy_sum):
+    strategy_sum = np.asarray(strategy_sum, dtype=np.float64)
+    normalising_sum = strategy_sum.sum()
+    if normalising_sum > 0:
+        return strategy_sum / normalising_sum
+    return np.full(len(strategy_sum), 1.0 / len(strategy_sum))
+
+
+# Utility of every action against a mixed opponent strategy, (A y). Payoffs
+# that can do better than a dense product (cfr.games.CyclicPayoff) provide
+# expected_utilities().
+def expected_utilities(payoff, opp_strategy):
+    if hasattr(payoff, "expected_utilities"):
+        return payoff.expected_utilities(opp_strategy)
+    return np.asarray(payoff, dtype=np.float64) @ np.asarray(opp_strategy, dtype=np.float64)
+
+
+# What the player's mixed strategy wins against every opponent action, (x A).
+# The generated payoffs are symmetric zero-sum, so x A == -(A x) for them.
+def column_utilities(payoff, strategy):
+    if hasattr(payoff, "expected_utilities"):
+        return -payoff.expected_utilities(strategy)
+    return np.asarray(strategy, dtype=np.float64) @ np.asarray(payoff, dtype=np.float64)
+
+
+# Exploitability of the pair of average strategies (NashConv)
+def exploitability(payoff, strategy, opp_strategy):
+    best_response_value = expected_utilities(payoff, opp_strategy).max()
+    opp_best_response_value = -column_utilities(payoff, strategy).min()
+    return float(best_response_value + opp_best_response_value)
+
+
+# How far a strategy is from a best response to a fixed opponent strategy
+def best_response_gap(payoff, strategy, opp_strategy):
+    utilities = expected_utilities(payoff, opp_strategy)
+    return float(utilities.max() - np.asarray(strategy, dtype=np.float64) @ utilities)
+
+
+# Exploitability of a trainer's current average strategies. In "train" mode
+# the opponent plays its fixed opp_strategy.
+def trainer_exploitability(trainer, mode="nash"):
+    strategy = normalise(trainer.strategy_sum)
+    if mode == "train":
+        return best_response_gap(trainer.payoff, strategy, trainer.opp_strategy)
+    if mode in ("nash", "expected"):
+        return exploitability(trainer.payoff, strategy, normalise(trainer.opp_strategy_sum))
+    raise ValueError("unknown mode %r, expected 'train', 'nash' or 'expected'" % mode)
+
+
+class ConvergenceResult:
+    def __init__(self, converged, iterations, seconds, exploitability, trace):
+        self.converged = converged
+        self.iterations = iterations
+        self.seconds = seconds
+        self.exploitability = exploitability
+        # (iteration, exploitability) at every check
+        self.trace = trace
+
+    def __repr__(self):
+        return ("ConvergenceResult(converged=%s, iterations=%d, seconds=%.4f, exploitability=%.6g)"
+                % (self.converged, self.iterations, self.seconds, self.exploitability))
+
+
+# Trains in chunks of check_every iterations until the exploitability is at
+# most epsilon or max_iterations more have been run. The result's iterations
+# is the trainer's total count.
+def train_until(trainer, epsilon, max_iterations, mode="nash", check_every=1000):
+    start = time.perf_counter()
+    done = trainer.iteration
+    trace = []
+    value = trainer_exploitability(trainer, mode)
+    for snapshot in streaming.stream_training(trainer, max_iterations, check_every, mode):
+        done = snapshot.iteration
+        value = snapshot.exploitability
+        trace.append((done, value))
+        if value <= epsilon:
+            break
+    return ConvergenceResult(value <= epsilon, done, time.perf_counter() - start, value, trace)
@@ -0,0 +1,57 @@
+import numpy as np
+
+from cfr.batched_trainer import DEFAULT_BLOCK_SIZE, BatchedTrainer
+from cfr.games import CyclicPayoff
+
+'''
+O(N) training for the balanced cyclic games (rps-7, rps-15, rps-101, see
+cfr.games.CyclicPayoff).
+
+In a cyclic game the utility of action a against a mix of opponent actions
+w only depends on how much of w sits in the (N-1)/2 places before a and how
+much in the (N-1)/2 places after it:
+
+    (A w)_a = 2 * (w[a-1] + ... + w[a-(N-1)/2]) - (sum(w) - w[a])
+
+With prefix sums over w written out twice (to wrap round the circle) every
+window is one subtraction, so A w costs O(N) instead of the O(N^2) dense
+product. CyclicTrainer is BatchedTrainer on a CyclicPayoff, whose
+expected_utilities() works the block regret out this way. A block of B
+samples costs O(N + B) and the payoff matrix is never built.
+
+    trainer = CyclicTrainer(101, opp_strategy)
+    trainer.nash_equilibrium(10000000)
+'''
+
+
+# A w for a cyclic payoff, w is a strategy or a count of opponent actions
+def cyclic_utilities(payoff, weights):
+    weights = np.asarray(weights, dtype=np.float64)
+    num_actions = payoff.NUM_ACTIONS
+    prefix = np.zeros(2 * num_actions + 1)
+    np.cumsum(np.concatenate((weights, weights)), out=prefix[1:])
+    # before[a] is the weight on the `half` actions before a
+    before = prefix[num_actions:2 * num_actions] - prefix[num_actions - payoff.half:2 * num_actions - payoff.half]
+    return 2 * before - (prefix[num_actions] - weights)
+
+
+class CyclicTrainer(BatchedTrainer):
+    # payoff is a CyclicPayoff or its number of actions
+    def __init__(self, payoff, opp_strategy, block_size=DEFAULT_BLOCK_SIZE, seed=None, history=None):
+        if not isinstance(payoff, CyclicPayoff):
+            payoff = CyclicPayoff(payoff)
+        super().__init__(payoff, opp_strategy, block_size, seed, history)
+
+    def init_payoff(self, payoff):
+        self.payoff = payoff
+        self.NUM_ACTIONS = payoff.NUM_ACTIONS
+        # The game is symmetric, the opponent's payoff is the same as ours
+        self.opp_payoff = payoff
+
+
+# The NumPy trainer for a payoff, CyclicTrainer for generated cyclic payoffs
+# and BatchedTrainer for everything else
+def make_batched_trainer(payoff, opp_strategy, block_size=DEFAULT_BLOCK_SIZE, seed=None, history=None):
+    if isinstance(payoff, CyclicPayoff):
+        return CyclicTrainer(payoff, opp_strategy, block_size, seed, history)
+    return BatchedTrainer(payoff, opp_strategy, block_size, seed, history)
@@ -0,0 +1,436 @@
+import argparse
+import asyncio
+import socket
+import struct
+import threading
+import time
+from multiprocessing import Process
+
+import numpy as np
+
+from cfr.batched_trainer import DEFAULT_BLOCK_SIZE
+from cfr.checkpoint import restore
+from cfr.convergence import exploitability, normalise
+from cfr.exact import payoff_key
+from cfr.games import GAMES, get_game
+
+'''
+Distributed nash training. A coordinator holds the shared regrets and
+strategy sums, and any number of workers (processes on this machine or on
+other hosts) each run nash_equilibrium() on their own RNG stream:
+
+1. a worker connects and gets the shared regrets and a grant of iterations
+2. it trains that many iterations starting from those regrets
+3. it sends back what it added to the regrets and strategy sums, the
+   coordinator merges that into the shared arrays and replies with the new
+   shared regrets and the next grant
+4. a grant of 0 means the run is finished
+
+Regret deltas are averaged: each is multiplied by 1 / num_workers, the
+number of workers the run is sized for, so the shared regrets grow about as
+fast as one trainer's would. The weight is fixed for the whole run, a count
+of the workers connected right now would change between the deltas of one
+round as workers join and leave and weight them differently. Adding the
+deltas up instead lets workers that started from older shared regrets push
+the shared ones around far more than one trainer would, and with 2-4
+workers the exploitability after 200000 rps iterations was 0.05-0.3
+against 0.004 for one worker. Averaged it stays around 0.001-0.005 as long
+as every worker trains a few thousand iterations between syncs. Strategy
+sums are added up, every worker's strategies count towards the average
+strategy. The coordinator hands out iterations until the total is reached,
+so a faster worker simply does more of them.
+
+A worker that drops (or sends something that is not a delta) is
+disconnected and the grant it had not reported is handed out again. Once
+every iteration has been handed out, a worker asking for more is kept
+waiting until the rest are reported, rather than sent away with 0, so a
+grant that comes back late still has a worker to go to.
+
+Messages are a 16 byte header (magic, type, number of actions and one
+64 bit value) followed by raw little endian float64 arrays. Nothing is
+pickled. The hello carries a hash of the worker's payoff matrix, so a
+worker started for a different game is turned away.
+
+run_local() watches its worker processes. If one exits with an error
+(turned away, or killed), or they have all exited with iterations still
+unreported, or the timeout runs out, it stops the coordinator, terminates
+the workers and raises RuntimeError instead of waiting forever. The same
+goes for a coordinator that fails to start or stops with an error.
+
+    python -m cfr.distributed coordinator --game rps-101 --iterations 100000000 --num-workers 4 --port 9000
+    python -m cfr.distributed worker --game rps-101 --host coordinator-host --port 9000
+    python -m cfr.distributed local --game rps-101 --iterations 2000000 --workers 1 2 4
+'''
+
+MAGIC = b"CFRD"
+HEADER = struct.Struct("<4sBxHQ")
+# The header's value is the worker's index in WELCOME and the iterations
+# done in DELTA. WELCOME and STATE start their payload with the next grant.
+HELLO, WELCOME, DELTA, STATE, REJECT = 1, 2, 3, 4, 5
+GRANT = struct.Struct("<Q")
+
+
+def pack_message(kind, num_actions, value, *arrays):
+    return HEADER.pack(MAGIC, kind, num_actions, value) + b"".join(
+        np.ascontiguousarray(array, dtype="<f8").tobytes() for array in arrays)
+
+
+def unpack_header(data):
+    magic, kind, num_actions, value = HEADER.unpack(data)
+    if magic != MAGIC:
+        raise ValueError("not a distributed training message")
+    return kind, num_actions, value
+
+
+# Splits a float64 payload into `count` arrays of num_actions
+def unpack_arrays(payload, num_actions, count):
+    return np.frombuffer(payload, dtype="<f8", count=count * num_actions).reshape(count, num_actions)
+
+
+# Payload bytes that follow a header of each kind
+def payload_size(kind, num_actions):
+    if kind == HELLO:
+        return 32
+    if kind == DELTA:
+        return 4 * 8 * num_actions
+    if kind in (WELCOME, STATE):
+        return GRANT.size + 2 * 8 * num_actions
+    return 0
+
+
+class Coordinator:
+    # num_workers is how many workers the run is sized for, every regret
+    # delta is divided by it
+    def __init__(self, payoff, iterations, sync_every=10000, num_workers=1):
+        if sync_every < 1:
+            raise ValueError("sync_every must be at least 1")
+        if num_workers < 1:
+            raise ValueError("num_workers must be at least 1")
+        self.payoff = payoff
+        self.NUM_ACTIONS = len(payoff)
+        self.payoff_digest = bytes.fromhex(payoff_key(payoff))
+        self.iterations = iterations
+        self.sync_every = sync_every
+        self.NUM_WORKERS = num_workers
+
+        self.regret_sum = np.zeros(self.NUM_ACTIONS)
+        self.opp_regret_sum = np.zeros(self.NUM_ACTIONS)
+        self.strategy_sum = np.zeros(self.NUM_ACTIONS)
+        self.opp_strategy_sum = np.zeros(self.NUM_ACTIONS)
+
+        # Iterations handed out and iterations reported back
+        self.granted = 0
+        self.completed = 0
+        # Workers welcomed so far
+        self.workers = 0
+        self.messages = 0
+        self.bytes = 0
+        self.port = None
+        self.done = None
+        # Notified whenever granted or completed changes
+        self.progress = None
+        self.loop = None
+
+    def next_grant(self):
+        grant = min(self.sync_every, self.iterations - self.granted)
+        self.granted += grant
+        return grant
+
+    # The next grant for a worker. While every iteration has been handed out
+    # but not all reported back, waits in case a grant is returned.
+    async def wait_for_grant(self):
+        async with self.progress:
+            await self.progress.wait_for(
+                lambda: self.granted < self.iterations or self.completed >= self.iterations)
+            return self.next_grant()
+
+    async def notify_progress(self):
+        async with self.progress:
+            self.progress.notify_all()
+
+    def state_message(self, kind, value, grant):
+        return (HEADER.pack(MAGIC, kind, self.NUM_ACTIONS, value) + GRANT.pack(grant)
+                + self.regret_sum.astype("<f8").tobytes() + self.opp_regret_sum.astype("<f8").tobytes())
+
+    async def send(self, writer, message):
+        writer.write(message)
+        self.messages += 1
+        self.bytes += len(message)
+        await writer.drain()
+
+    # Serves one worker connection until its grants run out. `grant` is
+    # what the worker holds and has not reported back yet.
+    async def handle_worker(self, reader, writer):
+        grant = 0
+        try:
+            header = await reader.readexactly(HEADER.size)
+            kind, num_actions, value = unpack_header(header)
+            digest = await reader.readexactly(payload_size(kind, num_actions))
+            self.messages += 1
+            self.bytes += HEADER.size + len(digest)
+            if kind != HELLO or num_actions != self.NUM_ACTIONS or digest != self.payoff_digest:
+                await self.send(writer, pack_message(REJECT, self.NUM_ACTIONS, 0))
+                return
+            index = self.workers
+            self.workers += 1
+            grant = await self.wait_for_grant()
+            await self.send(writer, self.state_message(WELCOME, index, grant))
+
+            while grant:
+                kind, num_actions, done = unpack_header(await reader.readexactly(HEADER.size))
+                if kind != DELTA or num_actions != self.NUM_ACTIONS:
+                    raise ValueError("expected a delta message from worker %d" % index)
+                deltas = unpack_arrays(await reader.readexactly(payload_size(DELTA, num_actions)),
+                                       num_actions, 4)
+                self.messages += 1
+                self.bytes += HEADER.size + deltas.nbytes
+                self.regret_sum += deltas[0] / self.NUM_WORKERS
+                self.opp_regret_sum += deltas[1] / self.NUM_WORKERS
+                self.strategy_sum += deltas[2]
+                self.opp_strategy_sum += deltas[3]
+                self.completed += done
+                grant = 0
+                await self.notify_progress()
+                grant = await self.wait_for_grant()
+                await self.send(writer, self.state_message(STATE, 0, grant))
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            # The worker went away or broke the protocol, it is disconnected
+            pass
+        finally:
+            # What the worker had not sent back is lost, its grant goes
+            # back to be handed to another worker
+            if grant:
+                self.granted -= grant
+                await self.notify_progress()
+            writer.close()
+            if self.completed >= self.iterations:
+                self.done.set()
+
+    # Serves workers until every iteration has been reported back. started
+    # (a threading.Event) is set once the port is known, or once starting
+    # the server has failed, port is still None then.
+    async def serve(self, host="127.0.0.1", port=0, started=None):
+        self.loop = asyncio.get_running_loop()
+        self.done = asyncio.Event()
+        self.progress = asyncio.Condition()
+        if self.iterations <= 0:
+            self.done.set()
+        try:
+            server = await asyncio.start_server(self.handle_worker, host, port)
+            self.port = server.sockets[0].getsockname()[1]
+        finally:
+            if started is not None:
+                started.set()
+        async with server:
+            await self.done.wait()
+
+    # Makes serve() return early, safe to call from another thread
+    def stop(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.done.set)
+
+    def get_avg_strategy(self):
+        return normalise(self.strategy_sum)
+
+    def exploitability(self):
+        return exploitability(self.payoff, normalise(self.strategy_sum), normalise(self.opp_strategy_sum))
+
+
+def receive_exactly(connection, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("coordinator closed the connection")
+        data += chunk
+    return bytes(data)
+
+
+# Reads a WELCOME or STATE, returns (value, grant, regret arrays)
+def receive_state(connection):
+    kind, received_actions, value = unpack_header(receive_exactly(connection, HEADER.size))
+    if kind == REJECT:
+        raise ValueError("the coordinator is training a different game")
+    payload = receive_exactly(connection, payload_size(kind, received_actions))
+    grant = GRANT.unpack_from(payload)[0]
+    return value, grant, unpack_arrays(payload[GRANT.size:], received_actions, 2)
+
+
+def make_worker_trainer(game, engine, seed, block_size=DEFAULT_BLOCK_SIZE):
+    actions, payoff = get_game(game)
+    uniform = [1.0 / len(actions)] * len(actions)
+    if engine == "batched":
+        from cfr.cyclic import make_batched_trainer
+        return make_batched_trainer(payoff, uniform, block_size, seed)
+    from cfr.matrix_game_trainer import MatrixGameTrainer
+    return MatrixGameTrainer(payoff, uniform, actions, seed)
+
+
+# Connects to the coordinator and trains until it has no more iterations to
+# hand out. The worker's RNG stream is child `index` of SeedSequence(seed),
+# the index comes from the coordinator. Returns the iterations trained.
+def run_worker(host, port, game, engine="python", seed=None, block_size=DEFAULT_BLOCK_SIZE):
+    payoff = get_game(game)[1]
+    num_actions = len(payoff)
+    connection = socket.create_connection((host, port))
+    connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    try:
+        connection.sendall(HEADER.pack(MAGIC, HELLO, num_actions, 0) + bytes.fromhex(payoff_key(payoff)))
+        index, grant, regrets = receive_state(connection)
+        entropy = np.random.SeedSequence(seed).entropy
+        trainer = make_worker_trainer(game, engine, np.random.SeedSequence(entropy, spawn_key=(index,)),
+                                      block_size)
+        zeros = np.zeros(num_actions)
+        done = 0
+        while grant:
+            restore(trainer.regret_sum, regrets[0])
+            restore(trainer.opp_regret_sum, regrets[1])
+            restore(trainer.strategy_sum, zeros)
+            restore(trainer.opp_strategy_sum, zeros)
+            trainer.nash_equilibrium(grant)
+            done += grant
+            connection.sendall(pack_message(
+                DELTA, num_actions, grant,
+                np.asarray(trainer.regret_sum, dtype=np.float64) - regrets[0],
+                np.asarray(trainer.opp_regret_sum, dtype=np.float64) - regrets[1],
+                trainer.strategy_sum, trainer.opp_strategy_sum))
+            value, grant, regrets = receive_state(connection)
+        return done
+    finally:
+        connection.close()
+
+
+class DistributedResult:
+    def __init__(self, coordinator, workers, seconds):
+        self.workers = workers
+        self.seconds = seconds
+        self.iterations = coordinator.completed
+        self.iterations_per_second = self.iterations / seconds if seconds > 0 else float("inf")
+        self.strategy = coordinator.get_avg_strategy()
+        self.exploitability = coordinator.exploitability()
+        self.messages = coordinator.messages
+        self.bytes = coordinator.bytes
+
+    def __repr__(self):
+        return ("DistributedResult(workers=%d, iterations=%d, seconds=%.3f, exploitability=%.6g)"
+                % (self.workers, self.iterations, self.seconds, self.exploitability))
+
+
+# Why a local run cannot finish, or None while it still can
+def worker_failure(processes, started, timeout):
+    codes = [process.exitcode for process in processes]
+    for index, code in enumerate(codes):
+        if code is not None and code != 0:
+            return "worker %d exited with code %d" % (index, code)
+    if None not in codes:
+        return "every worker exited before all iterations were reported"
+    if timeout is not None and time.perf_counter() - started > timeout:
+        return "the run did not finish within %gs" % timeout
+    return None
+
+
+# Runs coordinator.serve() on 127.0.0.1 until it returns, keeping the
+# exception it stops with (if any) in `errors` for run_local() to raise
+def serve_in_thread(coordinator, started, errors):
+    try:
+        asyncio.run(coordinator.serve("127.0.0.1", 0, started))
+    except Exception as error:
+        errors.append(error)
+
+
+# Runs a coordinator in a thread and `workers` worker processes on this
+# machine, all over TCP on 127.0.0.1. Raises RuntimeError if a worker or the
+# coordinator fails or the run takes longer than timeout seconds.
+def run_local(game, iterations, workers=2, sync_every=10000, engine="python", seed=None, block_size=DEFAULT_BLOCK_SIZE,
+              timeout=None):
+    coordinator = Coordinator(get_game(game)[1], iterations, sync_every, workers)
+    started = threading.Event()
+    errors = []
+    thread = threading.Thread(target=serve_in_thread, args=(coordinator, started, errors), daemon=True)
+    thread.start()
+    if not started.wait(timeout) or coordinator.port is None:
+        coordinator.stop()
+        raise RuntimeError("distributed run failed: the coordinator did not start") from (
+            errors[0] if errors else None)
+
+    start = time.perf_counter()
+    processes = [Process(target=run_worker, args=("127.0.0.1", coordinator.port, game, engine, seed, block_size))
+                 for x in range(workers)]
+    for process in processes:
+        process.start()
+    failure = None
+    while thread.is_alive():
+        thread.join(0.1)
+        if thread.is_alive():
+            failure = worker_failure(processes, start, timeout)
+        if failure is not None:
+            # The last worker may exit just before the coordinator notices
+            # its final report, give the coordinator a moment first
+            thread.join(1.0)
+            if not thread.is_alive():
+                failure = None
+                break
+            coordinator.stop()
+            break
+    thread.join()
+    if failure is None and errors:
+        failure = "the coordinator stopped with %r" % errors[0]
+    for process in processes:
+        if failure is not None:
+            process.terminate()
+        process.join()
+    if failure is not None:
+        raise RuntimeError("distributed run failed: %s" % failure) from (errors[0] if errors else None)
+    return DistributedResult(coordinator, workers, time.perf_counter() - start)
+
+
+# Runs the same job with each worker count. Returns the DistributedResults.
+def scaling_report(game, iterations, worker_counts=(1, 2, 4), sync_every=10000, engine="python", seed=0,
+                   timeout=None):
+    return [run_local(game, iterations, workers, sync_every, engine, seed, timeout=timeout)
+            for workers in worker_counts]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="cfr.distributed", description="Distributed nash training.")
+    parser.add_argument("role", choices=("coordinator", "worker", "local"))
+    parser.add_argument("--game", choices=sorted(GAMES), default="rps")
+    parser.add_argument("--iterations", type=int, default=1000000)
+    parser.add_argument("--sync-every", type=int, default=10000)
+    parser.add_argument("--engine", choices=("python", "batched"), default="python")
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--num-workers", type=int, default=1,
+                        help="workers the coordinator averages regret deltas over")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4],
+                        help="worker counts for the local scaling report")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="seconds before a local run is given up on")
+    args = parser.parse_args(argv)
+
+    actions = get_game(args.game)[0]
+    if args.role == "worker":
+        done = run_worker(args.host, args.port, args.game, args.engine, args.seed, args.block_size)
+        print("Trained %d iterations" % done)
+    elif args.role == "coordinator":
+        coordinator = Coordinator(get_game(args.game)[1], args.iterations, args.sync_every, args.num_workers)
+        start = time.perf_counter()
+        asyncio.run(coordinator.serve(args.host, args.port))
+        print(DistributedResult(coordinator, coordinator.workers, time.perf_counter() - start))
+        print("Player Strategy:", " ".join("%s: %.5f" % (a, p) for a, p in zip(actions, coordinator.get_avg_strategy())))
+    else:
+        print("%7s %12s %10s %14s %8s %14s %10s" % ("workers", "iterations", "seconds", "iterations/s",
+                                                   "speedup", "exploitability", "KiB sent"))
+        results = scaling_report(args.game, args.iterations, args.workers, args.sync_every, args.engine, args.seed,
+                                 args.timeout)
+        for result in results:
+            print("%7d %12d %10.3f %14.0f %8.2f %14.6f %10.1f" % (
+                result.workers, result.iterations, result.seconds, result.iterations_per_second,
+                result.iterations_per_second / results[0].iterations_per_second, result.exploitability,
+                result.bytes / 1024.0))
+
+
+if __name__ == "__main__":
+    main()
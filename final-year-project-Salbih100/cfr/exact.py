@@ -0,0 +1,276 @@
+import argparse
+import hashlib
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from cfr.games import GAMES, get_game
+
+'''
+Exact Nash equilibria of zero-sum matrix games by linear programming.
+
+Adding a constant to every payoff makes them all at least 1 and does not
+change the equilibria. The opponent's equilibrium strategy is then y = v / sum(v)
+for the v solving
+
+    maximise sum(v)  subject to  payoff v <= 1, v >= 0
+
+and the game is worth 1 / sum(v) (minus the constant). The constraints are
+already in the form a x <= b with b >= 0, so the origin is a feasible start
+and simplex() needs no first phase. The player's strategy comes out of the
+same tableau, as the dual values of the constraints.
+
+simplex() is a dense tableau simplex in NumPy using Bland's rule, which
+can not cycle. Solving rps or rpslsp takes under a millisecond and rps-101
+about 20. Answers are correct to floating point precision, not
+exact fractions.
+
+Solutions are kept in an EquilibriumCache keyed by a hash of the payoff
+matrix and evicted least recently used first. rps_to_nash(exact=True)
+returns the cached answer without training, and rps_to_nash(tolerance=...)
+trains and checks the result against it:
+
+    python -m cfr.exact --game rpslsp --iterations 1000000
+'''
+
+# Reduced costs and pivot entries smaller than this count as 0
+TOLERANCE = 1e-12
+
+
+class NotConvergedError(RuntimeError):
+    def __init__(self, validation):
+        super().__init__("trained strategies are %.3g from the exact game value, tolerance %.3g"
+                         % (validation.error, validation.tolerance))
+        self.validation = validation
+
+
+# Maximises c x subject to a x <= b and x >= 0, b must be non negative.
+# Returns the optimal x, the dual values of the constraints, the optimal
+# objective and the number of pivots taken.
+def simplex(c, a, b, max_pivots=None):
+    c = np.asarray(c, dtype=np.float64)
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    rows, columns = a.shape
+    if (b < 0).any():
+        raise ValueError("simplex() needs b >= 0 so the origin is feasible")
+    if max_pivots is None:
+        max_pivots = 50 * (rows + columns)
+
+    # One row per constraint with a slack variable each, the objective row last
+    tableau = np.zeros((rows + 1, columns + rows + 1))
+    tableau[:rows, :columns] = a
+    tableau[:rows, columns:columns + rows] = np.eye(rows)
+    tableau[:rows, -1] = b
+    tableau[rows, :columns] = -c
+    basis = np.arange(columns, columns + rows)
+
+    pivots = 0
+    while True:
+        # Bland's rule, the lowest numbered variable that improves the objective
+        entering = np.flatnonzero(tableau[rows, :-1] < -TOLERANCE)
+        if len(entering) == 0:
+            break
+        if pivots == max_pivots:
+            raise RuntimeError("simplex did not finish in %d pivots" % max_pivots)
+        column = entering[0]
+        entries = tableau[:rows, column]
+        positive = entries > TOLERANCE
+        if not positive.any():
+            raise ValueError("the linear program is unbounded")
+        ratios = np.full(rows, np.inf)
+        ratios[positive] = tableau[:rows, -1][positive] / entries[positive]
+        # Ties leave by the lowest numbered basic variable, also Bland's rule
+        tied = np.flatnonzero(ratios <= ratios.min() + TOLERANCE)
+        row = tied[np.argmin(basis[tied])]
+
+        tableau[row] /= tableau[row, column]
+        factors = tableau[:, column].copy()
+        factors[row] = 0.0
+        tableau -= np.outer(factors, tableau[row])
+        basis[row] = column
+        pivots += 1
+
+    x = np.zeros(columns)
+    in_basis = basis < columns
+    x[basis[in_basis]] = tableau[:rows, -1][in_basis]
+    duals = tableau[rows, columns:columns + rows].copy()
+    return x, duals, tableau[rows, -1], pivots
+
+
+# Clears rounding noise and makes the probabilities add to 1
+def clean_strategy(weights):
+    weights = np.clip(weights, 0.0, None)
+    weights[weights < TOLERANCE] = 0.0
+    return tuple(float(w) for w in weights / weights.sum())
+
+
+class Equilibrium:
+    def __init__(self, strategy, opp_strategy, value, pivots, seconds):
+        # Tuples, so a cached answer can not be changed by whoever got it
+        self.strategy = strategy
+        self.opp_strategy = opp_strategy
+        # What the player wins on average when both play their equilibrium
+        self.value = value
+        self.pivots = pivots
+        self.seconds = seconds
+
+    def __repr__(self):
+        return ("Equilibrium(value=%.6g, strategy=%s, opp_strategy=%s)"
+                % (self.value, [round(p, 6) for p in self.strategy],
+                   [round(p, 6) for p in self.opp_strategy]))
+
+
+# Solves the zero-sum game with payoff[a][b] for the player, which need not
+# be square. Returns an Equilibrium.
+def solve_game(payoff):
+    start = time.perf_counter()
+    matrix = np.asarray(payoff, dtype=np.float64)
+    if matrix.ndim != 2 or matrix.size == 0:
+        raise ValueError("payoff must be a non empty matrix")
+    shift = 1.0 - matrix.min()
+    rows, columns = matrix.shape
+    opp_weights, weights, total, pivots = simplex(np.ones(columns), matrix + shift, np.ones(rows))
+    return Equilibrium(clean_strategy(weights), clean_strategy(opp_weights), 1.0 / total - shift,
+                       pivots, time.perf_counter() - start)
+
+
+# Hash of the payoff matrix's shape and values
+def payoff_key(payoff):
+    matrix = np.ascontiguousarray(payoff, dtype=np.float64)
+    digest = hashlib.sha256(repr(matrix.shape).encode())
+    digest.update(matrix.tobytes())
+    return digest.hexdigest()
+
+
+class EquilibriumCache:
+    def __init__(self, max_size=128):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, payoff):
+        return payoff_key(payoff) in self.entries
+
+    # The Equilibrium of payoff, solved on the first request
+    def get(self, payoff):
+        key = payoff_key(payoff)
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        self.misses += 1
+        equilibrium = solve_game(payoff)
+        self.entries[key] = equilibrium
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return equilibrium
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return ("EquilibriumCache(size=%d, max_size=%d, hits=%d, misses=%d)"
+                % (len(self.entries), self.max_size, self.hits, self.misses))
+
+
+# Shared by every trainer in the process
+CACHE = EquilibriumCache()
+
+
+def exact_equilibrium(payoff, cache=CACHE):
+    if cache is None:
+        return solve_game(payoff)
+    return cache.get(payoff)
+
+
+class Validation:
+    def __init__(self, equilibrium, shortfall, opp_shortfall, distance, tolerance):
+        self.equilibrium = equilibrium
+        # How much less than the game value the player's strategy guarantees
+        self.shortfall = shortfall
+        # The same for the opponent
+        self.opp_shortfall = opp_shortfall
+        # Largest difference in any probability from the solved equilibrium.
+        # Only meaningful when the equilibrium is unique, as in rps and rpslsp.
+        self.distance = distance
+        self.tolerance = tolerance
+        self.error = max(shortfall, opp_shortfall)
+        self.converged = self.error <= tolerance
+
+    def __repr__(self):
+        return ("Validation(converged=%s, shortfall=%.3g, opp_shortfall=%.3g, distance=%.3g)"
+                % (self.converged, self.shortfall, self.opp_shortfall, self.distance))
+
+
+# Compares a pair of strategies against the exact game value. Works for
+# games with more than one equilibrium, every equilibrium guarantees the
+# value.
+def validate(payoff, strategy, opp_strategy, tolerance=1e-3, cache=CACHE):
+    equilibrium = exact_equilibrium(payoff, cache)
+    matrix = np.asarray(payoff, dtype=np.float64)
+    strategy = np.asarray(strategy, dtype=np.float64)
+    opp_strategy = np.asarray(opp_strategy, dtype=np.float64)
+    shortfall = max(0.0, equilibrium.value - float((strategy @ matrix).min()))
+    opp_shortfall = max(0.0, float((matrix @ opp_strategy).max()) - equilibrium.value)
+    distance = max(np.abs(strategy - equilibrium.strategy).max(),
+                   np.abs(opp_strategy - equilibrium.opp_strategy).max())
+    return Validation(equilibrium, shortfall, opp_shortfall, float(distance), tolerance)
+
+
+# The exact equilibrium strategies as lists, what rps_to_nash(exact=True) returns
+def exact_strategies(payoff, cache=CACHE):
+    equilibrium = exact_equilibrium(payoff, cache)
+    return list(equilibrium.strategy), list(equilibrium.opp_strategy)
+
+
+# validate(), raising NotConvergedError if the strategies are off by more
+# than tolerance
+def check_convergence(payoff, strategy, opp_strategy, tolerance, cache=CACHE):
+    validation = validate(payoff, strategy, opp_strategy, tolerance, cache)
+    if not validation.converged:
+        raise NotConvergedError(validation)
+    return validation
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="cfr.exact", description="Solve a matrix game exactly.")
+    parser.add_argument("--game", choices=sorted(GAMES), default="rps")
+    parser.add_argument("--iterations", type=int, default=0,
+                        help="also train this many nash iterations and compare")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--tolerance", type=float, default=1e-3)
+    args = parser.parse_args(argv)
+
+    actions, payoff = get_game(args.game)
+    equilibrium = CACHE.get(payoff)
+    start = time.perf_counter()
+    CACHE.get(payoff)
+    cached_seconds = time.perf_counter() - start
+    print("Player Strategy:", " ".join("%s: %.6f" % (a, p) for a, p in zip(actions, equilibrium.strategy)))
+    print("Opponent Strategy:", " ".join("%s: %.6f" % (a, p) for a, p in zip(actions, equilibrium.opp_strategy)))
+    print("Game value:", round(equilibrium.value, 9))
+    print("Solved in %.6fs (%d pivots), from the cache in %.6fs"
+          % (equilibrium.seconds, equilibrium.pivots, cached_seconds))
+
+    if args.iterations:
+        from cfr.matrix_game_trainer import MatrixGameTrainer
+        trainer = MatrixGameTrainer(payoff, [1.0 / len(actions)] * len(actions), actions, args.seed)
+        start = time.perf_counter()
+        strategy, opp_strategy = trainer.rps_to_nash(args.iterations)
+        seconds = time.perf_counter() - start
+        print("Trained %d iterations in %.3fs: %s"
+              % (args.iterations, seconds, validate(payoff, strategy, opp_strategy, args.tolerance)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+import argparse
+import time
+from array import array
+from itertools import permutations
+
+import numpy as np
+
+from cfr.compact_trainer import regret_matching
+from cfr.convergence import normalise
+from cfr.sampler import ActionSampler
+
+'''
+Counterfactual regret minimisation for sequential games, Kuhn poker and
+Leduc hold'em, as in section 3 of Neller & Lanctot's CFR tutorial.
+
+A poker game here is a deck of ranks (one or two suits), an ante of 1, one
+or two betting rounds with a fixed bet size and a cap on raises, and a
+public board card dealt before the second round. The betting does not
+depend on the cards, so the betting tree is built once up front as
+BettingNodes, every node knowing who acts, its children and, at the end,
+who folded and how much is at stake. Cards only matter for showdowns and
+for what a player can see.
+
+An information set is a betting node plus what the acting player can see
+(their card, and the board once it is out). Each betting node keeps its
+own table of InfoSets keyed by that observation. An InfoSet is a
+__slots__ object holding array('d') regrets, strategy and strategy sum.
+Regret matching is cfr.compact_trainer.regret_matching, the same rule
+the matrix game trainers use, with the player's own reach probability as
+the weight added to the strategy sum.
+
+CFRTrainer.train() uses chance sampling like the tutorial: one deal is
+drawn per iteration (by the trainer's ActionSampler) and the whole betting
+tree is walked for it. game_value() and exploitability() are exact. They
+enumerate every deal at once with NumPy, and exploitability() is the sum
+of both players' best response gains, as in cfr.convergence.
+
+    python -m cfr.extensive_form --game kuhn --iterations 100000
+    python -m cfr.extensive_form --game leduc --iterations 20000
+'''
+
+RANK_NAMES = "JQKA"
+
+
+class BettingNode:
+    __slots__ = ("history", "player", "round", "actions", "children", "terminal", "folded", "stake",
+                 "info_sets")
+
+    def __init__(self, history, player, round):
+        self.history = history
+        self.player = player
+        self.round = round
+        self.actions = ""
+        self.children = []
+        self.terminal = False
+        # Player who folded (-1 for a showdown) and what each player has put in
+        self.folded = -1
+        self.stake = 0
+        # observation -> InfoSet, filled in as training reaches them
+        self.info_sets = {}
+
+
+class InfoSet:
+    __slots__ = ("key", "regret_sum", "strategy", "strategy_sum")
+
+    def __init__(self, key, num_actions):
+        zeros = array("d", bytes(8 * num_actions))
+        self.key = key
+        self.regret_sum = array("d", zeros)
+        self.strategy = array("d", zeros)
+        self.strategy_sum = array("d", zeros)
+
+    def get_avg_strategy(self):
+        return normalise(self.strategy_sum).tolist()
+
+
+class Deal:
+    __slots__ = ("cards", "observations", "showdown")
+
+    def __init__(self, cards, observations, showdown):
+        self.cards = cards
+        # observations[player][round]
+        self.observations = observations
+        # +1 if player 0 wins a showdown, -1 if player 1 does, 0 for a tie
+        self.showdown = showdown
+
+
+class PokerGame:
+    # labels are the letters for (check, bet, fold, call) in histories
+    def __init__(self, name, ranks, suits, bet_sizes, max_raises, labels="cbfc"):
+        self.name = name
+        self.ranks = ranks
+        self.rounds = len(bet_sizes)
+        self.bet_sizes = bet_sizes
+        self.max_raises = max_raises
+        self.check, self.bet, self.fold, self.call = labels
+
+        deck = [rank for rank in range(ranks) for suit in range(suits)]
+        cards_dealt = 2 if self.rounds == 1 else 3
+        self.deals = []
+        for positions in permutations(range(len(deck)), cards_dealt):
+            self.deals.append(self.make_deal([deck[p] for p in positions]))
+
+        self.nodes = []
+        self.root = self.build(0, "", "", [1, 1], 0)
+
+    def make_deal(self, cards):
+        board = cards[2] if len(cards) == 3 else None
+        observations = []
+        for player in range(2):
+            private = cards[player]
+            if board is None:
+                observations.append((private,))
+            else:
+                observations.append((private, self.ranks + private * self.ranks + board))
+        # A pair with the board beats any unpaired card, then the higher rank
+        strength = [(cards[p] == board, cards[p]) for p in range(2)]
+        showdown = (strength[0] > strength[1]) - (strength[0] < strength[1])
+        return Deal(tuple(cards), observations, showdown)
+
+    # Builds the betting tree below a node, contributions is what each
+    # player has put in the pot so far
+    def build(self, round, history, round_history, contributions, raises):
+        player = len(round_history) % 2
+        node = BettingNode(history, player, round)
+        self.nodes.append(node)
+        owed = contributions[1 - player] - contributions[player]
+        if owed > 0:
+            node.actions = self.fold + self.call + (self.bet if raises < self.max_raises else "")
+        else:
+            node.actions = self.check + self.bet
+
+        for i, action in enumerate(node.actions):
+            after = list(contributions)
+            if owed > 0 and i == 0:
+                child = self.leaf(history + action, round, player, after[player])
+            elif owed > 0 and i == 1 or owed == 0 and i == 0:
+                after[player] += owed
+                # A call, or a check by the second player, ends the round
+                if owed > 0 or round_history:
+                    if round + 1 < self.rounds:
+                        child = self.build(round + 1, history + action + "/", "", after, 0)
+                    else:
+                        child = self.leaf(history + action, round, -1, after[player])
+                else:
+                    child = self.build(round, history + action, round_history + action, after, raises)
+            else:
+                after[player] = after[1 - player] + self.bet_sizes[round]
+                child = self.build(round, history + action, round_history + action, after, raises + 1)
+            node.children.append(child)
+        return node
+
+    def leaf(self, history, round, folded, stake):
+        node = BettingNode(history, -1, round)
+        node.terminal = True
+        node.folded = folded
+        node.stake = stake
+        self.nodes.append(node)
+        return node
+
+    # Readable information set key, e.g. "K pb" or "Q|K cr/c"
+    def info_set_key(self, deal, player, node):
+        key = RANK_NAMES[deal.cards[player]]
+        if node.round > 0:
+            key += "|" + RANK_NAMES[deal.cards[2]]
+        return key + " " + node.history
+
+
+def kuhn_poker():
+    return PokerGame("kuhn", 3, 1, (1,), 1, labels="pbpb")
+
+
+def leduc_holdem():
+    return PokerGame("leduc", 3, 2, (2, 4), 2, labels="crfc")
+
+
+POKER_GAMES = {"kuhn": kuhn_poker, "leduc": leduc_holdem}
+
+
+class CFRTrainer:
+    def __init__(self, game, seed=None, block_size=4096):
+        if isinstance(game, str):
+            if game not in POKER_GAMES:
+                raise ValueError("unknown game %r, expected one of %s" % (game, sorted(POKER_GAMES)))
+            game = POKER_GAMES[game]()
+        self.game = game
+        self.block_size = block_size
+        self.sampler = ActionSampler(len(game.deals), seed)
+        self.deal_table = self.sampler.table([1.0 / len(game.deals)] * len(game.deals))
+        self.iterations = 0
+        self.nodes_touched = 0
+        self.seconds = 0.0
+
+        # Per deal observations and showdowns as arrays, for the exact
+        # evaluation in game_value() and exploitability()
+        deals = game.deals
+        self.showdowns = np.array([deal.showdown for deal in deals], dtype=np.float64)
+        self.observations = [[np.array([deal.observations[player][round] for deal in deals])
+                              for round in range(game.rounds)] for player in range(2)]
+
+    # Every InfoSet reached so far
+    def info_sets(self):
+        return [info for node in self.game.nodes for info in node.info_sets.values()]
+
+    # Trains `iterations` sampled deals, returns player 0's average utility
+    def train(self, iterations):
+        start = time.perf_counter()
+        touched = self.nodes_touched
+        deals = self.game.deals
+        total = 0.0
+        done = 0
+        while done < iterations:
+            samples = min(self.block_size, iterations - done)
+            for index in self.sampler.sample_block(self.deal_table, samples).tolist():
+                total += self.walk(self.game.root, deals[index], 1.0, 1.0)
+            done += samples
+        self.iterations += iterations
+        self.seconds += time.perf_counter() - start
+        return total / iterations if iterations else 0.0
+
+    # CFR on one deal below `node`. Returns player 0's expected utility,
+    # reach0/reach1 are the players' probabilities of getting here.
+    def walk(self, node, deal, reach0, reach1):
+        self.nodes_touched += 1
+        if node.terminal:
+            if node.folded < 0:
+                return node.stake * deal.showdown
+            return node.stake if node.folded == 1 else -node.stake
+
+        player = node.player
+        observation = deal.observations[player][node.round]
+        info = node.info_sets.get(observation)
+        if info is None:
+            info = InfoSet(self.game.info_set_key(deal, player, node), len(node.actions))
+            node.info_sets[observation] = info
+
+        strategy = info.strategy
+        regret_matching(info.regret_sum, strategy, info.strategy_sum, reach0 if player == 0 else reach1)
+
+        children = node.children
+        utilities = [0.0] * len(children)
+        node_utility = 0.0
+        for i in range(len(children)):
+            if player == 0:
+                utilities[i] = self.walk(children[i], deal, reach0 * strategy[i], reach1)
+            else:
+                utilities[i] = self.walk(children[i], deal, reach0, reach1 * strategy[i])
+            node_utility += strategy[i] * utilities[i]
+
+        # Counterfactual regrets, weighted by the other player's reach
+        regret_sum = info.regret_sum
+        if player == 0:
+            for i in range(len(children)):
+                regret_sum[i] += reach1 * (utilities[i] - node_utility)
+        else:
+            for i in range(len(children)):
+                regret_sum[i] += reach0 * (node_utility - utilities[i])
+        return node_utility
+
+    def nodes_per_second(self):
+        return self.nodes_touched / self.seconds if self.seconds > 0 else 0.0
+
+    # {information set key: average strategy}
+    def get_avg_strategy(self):
+        return {info.key: info.get_avg_strategy() for info in self.info_sets()}
+
+    # Average strategy for every deal at a node as a (deals, actions) array,
+    # uniform where the information set has not been reached
+    def strategy_matrix(self, node):
+        observations = self.observations[node.player][node.round]
+        matrix = np.full((len(observations), len(node.actions)), 1.0 / len(node.actions))
+        for observation, info in node.info_sets.items():
+            matrix[observations == observation] = normalise(info.strategy_sum)
+        return matrix
+
+    # `player`'s utility below `node` for every deal, weighted by `reach`
+    # (chance and the other player's probability of getting there). With
+    # best_response the player picks the best action for each of its
+    # information sets instead of playing its average strategy.
+    def evaluate(self, node, player, reach, best_response):
+        if node.terminal:
+            if node.folded < 0:
+                utility = node.stake * self.showdowns
+            else:
+                utility = node.stake if node.folded == 1 else -node.stake
+            return reach * (utility if player == 0 else -utility)
+
+        if node.player == player and best_response:
+            values = np.array([self.evaluate(child, player, reach, True) for child in node.children])
+            observations = self.observations[player][node.round]
+            totals = np.array([np.bincount(observations, weights=row) for row in values])
+            best = totals.argmax(axis=0)
+            return values[best[observations], np.arange(len(observations))]
+
+        strategy = self.strategy_matrix(node)
+        value = 0.0
+        for i, child in enumerate(node.children):
+            if node.player == player:
+                value = value + strategy[:, i] * self.evaluate(child, player, reach, best_response)
+            else:
+                value = value + self.evaluate(child, player, reach * strategy[:, i], best_response)
+        return value
+
+    def chance(self):
+        return np.full(len(self.game.deals), 1.0 / len(self.game.deals))
+
+    # Player 0's expected utility when both play their average strategies
+    def game_value(self):
+        return float(self.evaluate(self.game.root, 0, self.chance(), False).sum())
+
+    # How much both players together could gain by best responding to the
+    # other's average strategy, 0 at a Nash equilibrium
+    def exploitability(self):
+        return float(sum(self.evaluate(self.game.root, player, self.chance(), True).sum()
+                         for player in range(2)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="cfr.extensive_form", description="CFR for Kuhn and Leduc poker.")
+    parser.add_argument("--game", choices=sorted(POKER_GAMES), default="kuhn")
+    parser.add_argument("--iterations", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--strategy", action="store_true", help="print the average strategy")
+    args = parser.parse_args(argv)
+
+    trainer = CFRTrainer(args.game, args.seed)
+    average = trainer.train(args.iterations)
+    print("Game:", args.game, " Iterations:", args.iterations)
+    print("Information sets:", len(trainer.info_sets()), " Betting nodes:", len(trainer.game.nodes))
+    print("Average sampled game value:", round(average, 5))
+    print("Game value of average strategies:", round(trainer.game_value(), 5))
+    print("Exploitability:", round(trainer.exploitability(), 5))
+    print("Nodes touched: %d in %.3fs, %.0f nodes/sec"
+          % (trainer.nodes_touched, trainer.seconds, trainer.nodes_per_second()))
+    if args.strategy:
+        for key, strategy in sorted(trainer.get_avg_strategy().items()):
+            print("%-14s %s" % (key, " ".join("%.3f" % p for p in strategy)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+'''
+Payoff matrices for the games used by the trainers.
+
+PAYOFF[a][b] is the utility to a player choosing action a when the
+opponent chooses action b. Every game here is symmetric and zero-sum,
+so PAYOFF[a][b] == -PAYOFF[b][a].
+
+The rps-N games are balanced cyclic tournaments with an odd number of
+actions, generated by CyclicPayoff instead of being written out. Action a
+beats the (N-1)/2 actions before it (counting round in a circle) and loses
+to the (N-1)/2 after it, so rps-3 is plain RPS.
+'''
+
+# Rock Beats  Scissors and loses to Paper
+# Paper Beats Rock and loses to Scissors
+# Scissors Beats Paper and loses to Rock
+RPS_ACTIONS = ["rock", "paper", "scissors"]
+RPS_PAYOFF = [
+    [ 0, -1,  1],
+    [ 1,  0, -1],
+    [-1,  1,  0],
+]
+
+# Rock Beats Lizard and Scissors and loses to Paper and Spock
+# Paper Beats Rock and Spock and loses to Scissors and Lizard
+# Scissors Beats Paper and Lizard and loses to Rock and Spock
+# Lizard Beats Paper and Spock and loses to Rock and Scissors
+# Spock Beats Rock and Scissors and loses to Paper and Lizard
+RPSLSP_ACTIONS = ["rock", "paper", "scissors", "lizard", "spock"]
+RPSLSP_PAYOFF = [
+    [ 0, -1,  1,  1, -1],
+    [ 1,  0, -1, -1,  1],
+    [-1,  1,  0,  1, -1],
+    [-1,  1, -1,  0,  1],
+    [ 1, -1,  1, -1,  0],
+]
+
+
+
+# Payoff matrix of a balanced cyclic game. Entries are generated from the
+# circular distance between the actions, only one row of N values is kept.
+# It can be indexed and iterated like the nested lists above, which builds
+# the dense rows, cfr.cyclic has the O(N) operations.
+class CyclicPayoff:
+    def __init__(self, num_actions):
+        if num_actions < 3 or num_actions % 2 == 0:
+            raise ValueError("cyclic games need an odd number of actions (at least 3), got %d" % num_actions)
+        self.NUM_ACTIONS = num_actions
+        # How many actions each action beats
+        self.half = (num_actions - 1) // 2
+        # base[d] is the payoff of an action d places after the opponent's
+        self.base = [0] + [1] * self.half + [-1] * self.half
+
+    def value(self, a, b):
+        return self.base[(a - b) % self.NUM_ACTIONS]
+
+    def __len__(self):
+        return self.NUM_ACTIONS
+
+    def __getitem__(self, a):
+        if not 0 <= a < self.NUM_ACTIONS:
+            raise IndexError("action %d out of range" % a)
+        return [self.base[(a - b) % self.NUM_ACTIONS] for b in range(self.NUM_ACTIONS)]
+
+    def __iter__(self):
+        for a in range(self.NUM_ACTIONS):
+            yield self[a]
+
+    # Utility of every action against a mixed strategy in O(N), used by
+    # cfr.convergence in place of a dense matrix product
+    def expected_utilities(self, strategy):
+        from cfr.cyclic import cyclic_utilities
+        return cyclic_utilities(self, strategy)
+
+    def __repr__(self):
+        return "CyclicPayoff(%d)" % self.NUM_ACTIONS
+
+
+# (actions, payoff) for a cyclic game with num_actions actions
+def cyclic_game(num_actions):
+    payoff = CyclicPayoff(num_actions)
+    if num_actions == 3:
+        return RPS_ACTIONS, payoff
+    return ["action %d" % a for a in range(num_actions)], payoff
+
+
+CYCLIC_SIZES = (7, 15, 101)
+
+# The hand written games, what the benchmarks run unless asked for others
+HAND_WRITTEN_GAMES = ("rps", "rpslsp")
+
+GAMES = {
+    "rps": (RPS_ACTIONS, RPS_PAYOFF),
+    "rpslsp": (RPSLSP_ACTIONS, RPSLSP_PAYOFF),
+}
+GAMES.update(("rps-%d" % size, cyclic_game(size)) for size in CYCLIC_SIZES)
+
+
+# Looks up a game by name and returns (action names, payoff matrix)
+def get_game(name):
+    if name not in GAMES:
+        raise ValueError("unknown game %r, expected one of %s" % (name, sorted(GAMES)))
+    return GAMES[name]
+
+
+# Formats a strategy over the action names as "Rock: 0.3 Paper: 0.3 ..."
+def format_strategy(actions, strategy, round_value=7):
+    return " ".join(name.capitalize() + ": " + str(round(float(p), round_value))
+                    for name, p in zip(actions, strategy))
@@ -0,0 +1,102 @@
+import math
+
+import numpy as np
+
+'''
+Records the average strategy during training (for graph production) in a
+preallocated NumPy buffer, so a long run can keep its convergence history
+without growing Python lists of floats.
+
+A recorder stores at most `capacity` samples. max_bytes can be given instead
+as a hard memory ceiling and the capacity is worked out from it. What
+happens when the buffer is full depends on the retention:
+- "ring" keeps the most recent samples and overwrites the oldest
+- "decimate" throws away every other sample and halves how often it records,
+  so the history always covers the whole run
+- "log" records at log-spaced iterations (per_decade samples for every
+  factor of 10) and decimates the same way when full
+
+The trainers only look at next_iteration in their loop, record() is called
+when the iteration reaches it. Anything with a next_iteration attribute and a
+record(iteration, avg_strategy) method can be used in place of this class.
+'''
+
+RETENTIONS = ("ring", "decimate", "log")
+
+
+class HistoryRecorder:
+    def __init__(self, num_actions, interval=100, capacity=10000, retention="decimate",
+                 max_bytes=None, per_decade=20):
+        if retention not in RETENTIONS:
+            raise ValueError("unknown retention %r, expected one of %s" % (retention, RETENTIONS))
+        if interval < 1:
+            raise ValueError("interval must be at least 1")
+        row_bytes = 8 * (num_actions + 1)
+        if max_bytes is not None:
+            capacity = max_bytes // row_bytes
+        if capacity < 2:
+            raise ValueError("history needs room for at least 2 samples")
+
+        self.NUM_ACTIONS = num_actions
+        self.retention = retention
+        self.interval = interval
+        self.ratio = 10 ** (1.0 / per_decade)
+        self.capacity = capacity
+
+        # Preallocated storage, one row per sample
+        self.iteration_buffer = np.zeros(capacity, dtype=np.int64)
+        self.strategy_buffer = np.zeros((capacity, num_actions))
+        self.count = 0
+        self.next_iteration = 0
+
+    # Works out when the next sample is due after recording at `iteration`
+    def advance(self, iteration):
+        if self.retention == "log":
+            return max(iteration + 1, math.ceil(iteration * self.ratio))
+        return iteration + self.interval
+
+    def record(self, iteration, avg_strategy):
+        position = self.count % self.capacity if self.retention == "ring" else self.count
+        self.iteration_buffer[position] = iteration
+        self.strategy_buffer[position] = avg_strategy
+        self.count += 1
+        self.next_iteration = self.advance(iteration)
+
+        if self.count == self.capacity and self.retention != "ring":
+            self.decimate()
+
+    # Keeps every other sample and records half as often from now on
+    def decimate(self):
+        kept = (self.count + 1) // 2
+        self.iteration_buffer[:kept] = self.iteration_buffer[0:self.count:2]
+        self.strategy_buffer[:kept] = self.strategy_buffer[0:self.count:2]
+        self.count = kept
+        self.interval *= 2
+        self.ratio *= self.ratio
+        self.next_iteration = max(self.next_iteration, self.advance(int(self.iteration_buffer[kept - 1])))
+
+    # Indexes of the stored samples in the order they were recorded
+    def order(self):
+        if self.retention == "ring" and self.count > self.capacity:
+            start = self.count % self.capacity
+            return np.r_[start:self.capacity, 0:start]
+        return np.arange(min(self.count, self.capacity))
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    # Iteration number of every stored sample
+    def iterations(self):
+        return self.iteration_buffer[self.order()]
+
+    # Stored average strategies, shape (samples, actions)
+    def strategies(self):
+        return self.strategy_buffer[self.order()]
+
+    # Stored probabilities of one action, e.g. the old rockstrats list
+    def action_history(self, action):
+        return self.strategy_buffer[self.order(), action]
+
+    # Memory used by the preallocated buffers
+    def nbytes(self):
+        return self.iteration_buffer.nbytes + self.strategy_buffer.nbytes
@@ -0,0 +1,61 @@
+import subprocess
+import sys
+
+'''
+Measures how long a fresh interpreter takes to import each module and checks
+it against a budget, so short-lived worker processes keep starting quickly.
+Each module is timed in its own subprocess so nothing is already cached.
+
+    python -m cfr.import_time
+
+exits with status 1 if any module is over its budget.
+'''
+
+# Budgets in milliseconds. The trainers need NumPy (~80ms on its own),
+# the package and the CLI must not import anything heavy.
+IMPORT_BUDGETS_MS = {
+    "cfr": 20,
+    "cfr.cli": 40,
+    "cfr.games": 20,
+    "cfr.matrix_game_trainer": 200,
+    "cfr.batched_trainer": 200,
+    "rps_trainer": 200,
+    "rpslsp_trainer": 200,
+}
+
+TIMER = ("import time; start = time.perf_counter(); import %s; "
+         "print((time.perf_counter() - start) * 1000); "
+         "import sys; print('matplotlib' in sys.modules)")
+
+
+# Returns (milliseconds, whether matplotlib got imported) for one module.
+# The best of `repeats` runs is used to keep disk cache noise out.
+def measure_import_time(module, repeats=3):
+    best = None
+    for x in range(repeats):
+        output = subprocess.run([sys.executable, "-c", TIMER % module], capture_output=True,
+                                text=True, check=True).stdout.split()
+        milliseconds = float(output[0])
+        if best is None or milliseconds < best:
+            best = milliseconds
+        loaded_matplotlib = output[1] == "True"
+    return best, loaded_matplotlib
+
+
+def main(budgets=IMPORT_BUDGETS_MS):
+    failed = False
+    print("%-26s %9s %9s" % ("module", "ms", "budget"))
+    for module, budget in budgets.items():
+        milliseconds, loaded_matplotlib = measure_import_time(module)
+        status = "ok"
+        if milliseconds > budget:
+            status = "OVER BUDGET"
+        if loaded_matplotlib:
+            status = "IMPORTS MATPLOTLIB"
+        failed = failed or status != "ok"
+        print("%-26s %9.1f %9d  %s" % (module, milliseconds, budget, status))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+import argparse
+import time
+
+import numpy as np
+
+from cfr.batched_trainer import DEFAULT_BLOCK_SIZE
+from cfr.games import GAMES, get_game
+from cfr.sweep import stacked_normalise, stacked_regret_matching
+from cfr.update_rules import UPDATE_RULES, get_update_rule
+
+'''
+League self-play: a population of regret matching agents that all train
+against each other, for checking how robust the update rules are.
+
+Like SweepTrainer every agent is a row of stacked (agents, NUM_ACTIONS)
+arrays. In a round every agent plays the other agents' current strategies
+(never itself). With P the stacked strategies and A the payoff matrix, the
+utility of every action of every agent against the rest of the league is
+
+    (P.sum(axis=0) - P) @ A.T / (agents - 1)
+
+which is one matrix product for the whole league. The update rules are
+applied row by row from per-agent alpha, beta, gamma and floor arrays, so
+agents with different rules train in the same arrays.
+
+"expected" rounds use those utilities directly, so they are deterministic.
+"sampled" rounds draw block_size opponent actions per agent from the rest
+of the league, counted with one multinomial draw as in SweepTrainer.
+
+Each agent has a seed, spawned from the league's seed unless given. It
+sets the agent's small random starting regrets, so agents with the same
+rule do not all play the same strategies.
+
+pairwise_payoffs() is the full round-robin between average strategies,
+P A P^T, a (agents, agents) matrix from one matrix product.
+
+    python -m cfr.league --agents 500 --rounds 2000
+
+trains a league with the built in rules spread evenly and prints each
+rule's results and a scaling report (agents and rounds per second).
+'''
+
+
+class LeagueTrainer:
+    # rules is one update rule (name or UpdateRule) per agent, seeds is one
+    # seed per agent or None to spawn them from `seed`
+    def __init__(self, payoff, rules, seeds=None, block_size=DEFAULT_BLOCK_SIZE, seed=None, initial_regret=0.01):
+        self.payoff = np.asarray(payoff, dtype=np.float64)
+        self.NUM_ACTIONS = self.payoff.shape[0]
+        if self.payoff.shape != (self.NUM_ACTIONS, self.NUM_ACTIONS):
+            raise ValueError("payoff matrix must be square, got shape %s" % (self.payoff.shape,))
+        self.rules = [get_update_rule(rule) for rule in rules]
+        self.NUM_AGENTS = len(self.rules)
+        if self.NUM_AGENTS < 2:
+            raise ValueError("a league needs at least 2 agents")
+        if block_size < 1:
+            raise ValueError("block_size must be at least 1")
+        self.block_size = block_size
+
+        sequence = np.random.SeedSequence(seed)
+        league_sequence, *children = sequence.spawn(self.NUM_AGENTS + 1)
+        if seeds is None:
+            seeds = children
+        elif len(seeds) != self.NUM_AGENTS:
+            raise ValueError("need one seed per agent, got %d for %d agents" % (len(seeds), self.NUM_AGENTS))
+        self.seeds = list(seeds)
+        self.rng = np.random.default_rng(league_sequence)
+
+        # Rule parameters per agent, NaN where the rule leaves that side alone
+        self.alpha = np.array([np.nan if r.alpha is None else r.alpha for r in self.rules])
+        self.beta = np.array([np.nan if r.beta is None else r.beta for r in self.rules])
+        self.gamma = np.array([r.gamma for r in self.rules], dtype=np.float64)
+        self.floor = np.array([r.floor for r in self.rules])
+        self.changes_regrets = any(r.changes_regrets for r in self.rules)
+
+        # One row per agent
+        self.regret_sum = np.array([initial_regret * np.random.default_rng(s).random(self.NUM_ACTIONS)
+                                    for s in self.seeds])
+        self.strategy_sum = np.zeros((self.NUM_AGENTS, self.NUM_ACTIONS))
+        self.rounds = 0
+        # (round, league scores) for every evaluation train() made
+        self.evaluations = []
+
+    # Discounts (or floors) every agent's regrets by its own rule after round t,
+    # UpdateRule.apply() for all rows at once
+    def apply_rules(self, t):
+        with np.errstate(invalid="ignore"):
+            positive = np.where(np.isnan(self.alpha), 1.0, t ** self.alpha / (t ** self.alpha + 1))
+            negative = np.where(np.isnan(self.beta), 1.0, t ** self.beta / (t ** self.beta + 1))
+        negative[self.floor] = 0.0
+        self.regret_sum *= np.where(self.regret_sum > 0, positive[:, None], negative[:, None])
+
+    # Row i is the average of every agent's strategy but agent i's, what
+    # agent i faces in a round
+    def opponent_mix(self, strategy):
+        return (strategy.sum(axis=0) - strategy) / (self.NUM_AGENTS - 1)
+
+    # Trains every agent for `rounds` rounds. mode is "expected" (every agent
+    # against the others' whole strategies) or "sampled" (block_size sampled
+    # opponent actions per agent per round). evaluate_every=n works out the
+    # pairwise payoffs every n rounds and keeps the league scores.
+    def train(self, rounds, mode="expected", evaluate_every=None):
+        if mode not in ("expected", "sampled"):
+            raise ValueError("unknown mode %r, expected 'expected' or 'sampled'" % mode)
+        samples = self.block_size if mode == "sampled" else 1
+        for x in range(rounds):
+            t = self.rounds + 1
+            strategy = stacked_regret_matching(self.regret_sum)
+            self.strategy_sum += samples * t ** self.gamma[:, None] * strategy
+
+            if mode == "sampled":
+                # Opponent action counts of block_size draws from the mix of
+                # everyone else's strategies
+                counts = self.rng.multinomial(samples, self.opponent_mix(strategy))
+                utilities = counts @ self.payoff.T
+            else:
+                utilities = self.opponent_mix(strategy) @ self.payoff.T
+            received = (strategy * utilities).sum(axis=1)
+            self.regret_sum += utilities - received[:, None]
+            if self.changes_regrets:
+                self.apply_rules(t)
+            self.rounds = t
+            if evaluate_every and t % evaluate_every == 0:
+                self.evaluations.append((t, self.league_scores()))
+        return self.get_avg_strategy()
+
+    # Average strategy of every agent, shape (agents, actions)
+    def get_avg_strategy(self):
+        return stacked_normalise(self.strategy_sum)
+
+    # pairwise[i, j] is what agent i's average strategy wins on average
+    # against agent j's
+    def pairwise_payoffs(self):
+        strategies = self.get_avg_strategy()
+        return strategies @ self.payoff @ strategies.T
+
+    # Mean of each agent's results against every other agent
+    def league_scores(self, pairwise=None):
+        if pairwise is None:
+            pairwise = self.pairwise_payoffs()
+        return (pairwise.sum(axis=1) - np.diagonal(pairwise)) / (self.NUM_AGENTS - 1)
+
+    # How much a best response wins against each agent's average strategy,
+    # 0 for an agent playing an equilibrium of a symmetric game
+    def exploitability(self):
+        return -(self.get_avg_strategy() @ self.payoff).min(axis=1)
+
+    # Mean and worst league score and exploitability for every rule name
+    def rule_summary(self):
+        scores = self.league_scores()
+        exploitability = self.exploitability()
+        names = np.array([rule.name for rule in self.rules])
+        summary = {}
+        for name in dict.fromkeys(names):
+            rows = names == name
+            summary[name] = {
+                "agents": int(rows.sum()),
+                "mean_score": float(scores[rows].mean()),
+                "worst_score": float(scores[rows].min()),
+                "mean_exploitability": float(exploitability[rows].mean()),
+                "worst_exploitability": float(exploitability[rows].max()),
+            }
+        return summary
+
+
+# A league with `agents` agents, the rules taken in turn
+def make_league(payoff, agents, rules=tuple(UPDATE_RULES), block_size=DEFAULT_BLOCK_SIZE, seed=None):
+    return LeagueTrainer(payoff, [rules[a % len(rules)] for a in range(agents)],
+                         block_size=block_size, seed=seed)
+
+
+# Times `rounds` rounds and one pairwise evaluation for every league size.
+# Returns (agents, rounds/sec, agent rounds/sec, seconds per evaluation),
+# the rates are without evaluations.
+def scaling_report(payoff, agent_counts=(10, 100, 1000), rounds=200, mode="expected", seed=0):
+    report = []
+    for agents in agent_counts:
+        league = make_league(payoff, agents, seed=seed)
+        start = time.perf_counter()
+        league.train(rounds, mode)
+        seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        league.pairwise_payoffs()
+        evaluation = time.perf_counter() - start
+        report.append((agents, rounds / seconds, agents * rounds / seconds, evaluation))
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="cfr.league", description="Train a league of agents against each other.")
+    parser.add_argument("--game", choices=sorted(GAMES), default="rpslsp")
+    parser.add_argument("--agents", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=2000)
+    parser.add_argument("--mode", choices=("expected", "sampled"), default="expected")
+    parser.add_argument("--rules", nargs="+", choices=sorted(UPDATE_RULES), default=list(UPDATE_RULES))
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--scaling", type=int, nargs="*", default=None, metavar="AGENTS",
+                        help="league sizes for the scaling report (default: 10 100 1000)")
+    args = parser.parse_args(argv)
+
+    payoff = get_game(args.game)[1]
+    league = make_league(payoff, args.agents, args.rules, seed=args.seed)
+    start = time.perf_counter()
+    league.train(args.rounds, args.mode)
+    seconds = time.perf_counter() - start
+    print("%d agents, %d %s rounds in %.3fs" % (args.agents, args.rounds, args.mode, seconds))
+    print("%-8s %7s %12s %12s %14s %14s" % ("rule", "agents", "mean score", "worst score",
+                                             "mean exploit", "worst exploit"))
+    for name, result in league.rule_summary().items():
+        print("%-8s %7d %12.6f %12.6f %14.6f %14.6f" % (
+            name, result["agents"], result["mean_score"], result["worst_score"],
+            result["mean_exploitability"], result["worst_exploitability"]))
+
+    print()
+    print("%7s %12s %16s %14s" % ("agents", "rounds/s", "agent rounds/s", "pairwise s"))
+    for agents, rate, agent_rate, evaluation in scaling_report(payoff, args.scaling or (10, 100, 1000),
+                                                              mode=args.mode):
+        print("%7d %12.1f %16.0f %14.6f" % (agents, rate, agent_rate, evaluation))
+
+
+if __name__ == "__main__":
+    main()
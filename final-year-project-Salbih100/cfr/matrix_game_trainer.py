@@ -0,0 +1,124 @@
+from cfr.games import format_strategy
+from cfr.history import HistoryRecorder
+from cfr.plotting import plot_history
+from cfr.sampler import ActionSampler
+from cfr.trainer_base import SampledTrainer
+from cfr.update_rules import get_update_rule
+
+'''
+Regret matching for any two player zero-sum matrix game. The payoff matrix
+is given from the player's point of view, payoff[a][b] is what the player
+wins by choosing action a when the opponent chooses action b, and the
+opponent wins -payoff[a][b].
+
+Rather than writing out an if/elif branch for every opponent action, the
+utility of every action against each opponent action is worked out once in
+the constructor. An iteration then looks up the row for the action the
+opponent actually played and the regret update is a single pass over it.
+
+Actions are drawn by an ActionSampler owned by the trainer, pass a seed to
+make a run repeatable. train() records the average strategy every 100
+iterations into a HistoryRecorder, pass a recorder as `history` to change how
+often and how much is kept. update_rule picks how regrets are discounted and
+strategies averaged, see cfr.update_rules. enable_profiling() times each
+phase of an iteration, see cfr.profiling. train(), nash_equilibrium(),
+expected_nash_equilibrium(), rps_to_nash(), exploitability(), train_until()
+and stream() come from cfr.trainer_base.SampledTrainer.
+'''
+
+class MatrixGameTrainer(SampledTrainer):
+    def __init__(self, payoff, opp_strategy, actions=None, seed=None, history=None,
+                 update_rule="vanilla"):
+        self.NUM_ACTIONS = len(payoff)
+        for row in payoff:
+            if len(row) != self.NUM_ACTIONS:
+                raise ValueError("payoff matrix must be square")
+        if len(opp_strategy) != self.NUM_ACTIONS:
+            raise ValueError("opponent strategy needs %d probabilities, got %d"
+                             % (self.NUM_ACTIONS, len(opp_strategy)))
+        if actions is None:
+            actions = ["action %d" % a for a in range(self.NUM_ACTIONS)]
+        self.actions = list(actions)
+        self.payoff = [list(row) for row in payoff]
+
+        # utility_rows[b][a] is the player's utility for action a when the
+        # opponent plays b, opp_utility_rows[a][b] is the opponent's utility
+        # for action b when the player plays a
+        self.utility_rows = [[self.payoff[a][b] for a in range(self.NUM_ACTIONS)]
+                             for b in range(self.NUM_ACTIONS)]
+        self.opp_utility_rows = [[-self.payoff[a][b] for b in range(self.NUM_ACTIONS)]
+                                 for a in range(self.NUM_ACTIONS)]
+
+        # Initialising player arrays
+        self.regret_sum = [0] * self.NUM_ACTIONS
+        self.strategy = [0] * self.NUM_ACTIONS
+        self.strategy_sum = [0] * self.NUM_ACTIONS
+
+        # Keeps track of the average strategy at certain iterations
+        if history is None:
+            history = HistoryRecorder(self.NUM_ACTIONS)
+        self.history = history
+
+        # Initialising opposition arrays
+        self.opp_strategy = list(opp_strategy)
+        self.opp_regret_sum = [0] * self.NUM_ACTIONS
+        self.opp_strategy_sum = [0] * self.NUM_ACTIONS
+
+        self.sampler = ActionSampler(self.NUM_ACTIONS, seed)
+        self.update_rule = get_update_rule(update_rule)
+        # A cfr.profiling.Profiler while profiling is on
+        self.profiler = None
+        # Iterations completed so far, the loops carry on from here
+        self.iteration = 0
+
+    # Regret matching. Actions with positive regret are played in proportion
+    # to their regret, with no positive regret the strategy is split evenly.
+    # The strategy is also added onto strategy_sum for the average strategy,
+    # multiplied by weight.
+    def regret_matching(self, regret_sum, strategy_sum, weight=1):
+        strategy = [0] * self.NUM_ACTIONS
+        normalising_sum = 0
+        for x in range(self.NUM_ACTIONS):
+            if regret_sum[x] > 0:
+                strategy[x] = regret_sum[x]
+                normalising_sum += regret_sum[x]
+
+        for x in range(self.NUM_ACTIONS):
+            if normalising_sum > 0:
+                strategy[x] = strategy[x] / normalising_sum
+            else:
+                strategy[x] = 1.0 / self.NUM_ACTIONS
+            strategy_sum[x] += weight * strategy[x]
+        return strategy
+
+    # Gets the current strategy for the player.
+    # Returns an array for the strategy and the sum of strategies
+    def get_strategy(self, weight=1):
+        self.strategy = self.regret_matching(self.regret_sum, self.strategy_sum, weight)
+        return self.strategy, self.strategy_sum
+
+    # Same as player get_strategy() but for the opponent
+    def get_strategy_opp(self, weight=1):
+        self.opp_strategy = self.regret_matching(self.opp_regret_sum, self.opp_strategy_sum, weight)
+        return self.opp_strategy, self.opp_strategy_sum
+
+    # Gets an action based on the probabilities of the strategy
+    def get_action(self, strategy):
+        return self.sampler.sample(strategy)
+
+    # Formats a strategy as "Rock: 0.3 Paper: 0.3 ...", see cfr.games
+    def format_strategy(self, strategy, round_value):
+        return format_strategy(self.actions, strategy, round_value)
+
+    # Prints out avg strategy in a readable way
+    def print_avg_strategy(self, round_value=7):
+        return "Trainer Strategy \n" + self.format_strategy(self.get_avg_strategy(), round_value) + "\n"
+
+    # Prints out opponent strategy in readable way
+    def print_opp_strategy(self, round_value=7):
+        return "\nOpponent Strategy \n" + self.format_strategy(self.opp_strategy, round_value) + "\n"
+
+    # Creates a graph to show how the avg strategy changes with iterations.
+    # Saves it to `path` instead of showing it when a path is given.
+    def show_graph(self, graph_title=None, path=None):
+        plot_history(self.history, self.actions, graph_title, path)
@@ -0,0 +1,272 @@
+import argparse
+import statistics
+import time
+from array import array
+
+from cfr.cli import parse_strategy
+from cfr.convergence import best_response_gap
+from cfr.games import GAMES, get_game
+from cfr.matrix_game_trainer import MatrixGameTrainer
+from cfr.sampler import ActionSampler
+from cfr.update_rules import get_update_rule
+
+'''
+Online opponent modelling. train() needs the opponent's opp_strategy up
+front and assumes it never changes. Against a live opponent the mix has to
+be estimated from the moves it makes, and the estimate has to follow it
+when it drifts.
+
+Two models count the observed moves with O(1) work per move:
+- SlidingWindowModel counts the last `window` moves in a ring buffer, the
+  move falling out of the window is taken off again
+- DecayedModel weights older moves down exponentially with a half life.
+  Instead of shrinking every count each move, the weight of a new move
+  grows by 2^(1 / half_life) and everything is divided down once the
+  weight gets large, which comes round once every few thousand half lives.
+  half_life=None counts every move the same, the plain frequencies.
+
+Both keep a pseudo count `prior` on every action so the estimate starts
+uniform.
+
+Given the trainer's utility rows a model also keeps the summed utility of
+each of our actions against the moves it counts, one utility row added (and
+one taken off) per move, so the expected utilities against the estimate
+cost O(NUM_ACTIONS) rather than a matrix product.
+
+OnlineTrainer feeds those expected utilities into regret matching after
+every observed move, the same update as train() but against the estimate
+instead of a sampled opponent action, and carries on from its current
+regrets. The default rule is regret-matching+ (regrets floored at zero),
+so regrets built up against an old mix do not have to be unwound first.
+
+    python -m cfr.opponent_model --game rps
+
+benchmarks how many moves each model takes to react to a switch of mix
+and how many moves per second it handles.
+'''
+
+
+# Uniform pseudo counts plus the utility of each of our actions summed over
+# the pseudo counts, shared by both models
+class FrequencyModel:
+    def __init__(self, num_actions, utility_rows=None, prior=1.0):
+        self.NUM_ACTIONS = num_actions
+        self.prior = prior
+        self.counts = [0.0] * num_actions
+        self.total = 0.0
+        self.moves = 0
+        self.utility_rows = utility_rows
+        if utility_rows is not None:
+            self.utility_sum = [0.0] * num_actions
+            # Utility of each of our actions summed over all opponent actions
+            self.prior_utility = [sum(row[a] for row in utility_rows) for a in range(num_actions)]
+
+    # Weight one prior pseudo count carries, in the units of counts
+    def prior_weight(self):
+        return self.prior
+
+    def probability(self, action):
+        prior = self.prior_weight()
+        return (self.counts[action] + prior) / (self.total + prior * self.NUM_ACTIONS)
+
+    # The estimated opponent strategy
+    def strategy(self):
+        prior = self.prior_weight()
+        normalising_sum = self.total + prior * self.NUM_ACTIONS
+        return [(count + prior) / normalising_sum for count in self.counts]
+
+    # Expected utility of each of our actions against the estimated strategy
+    def expected_utilities(self):
+        prior = self.prior_weight()
+        normalising_sum = self.total + prior * self.NUM_ACTIONS
+        return [(self.utility_sum[a] + prior * self.prior_utility[a]) / normalising_sum
+                for a in range(self.NUM_ACTIONS)]
+
+    def add(self, action, weight):
+        self.counts[action] += weight
+        self.total += weight
+        if self.utility_rows is not None:
+            row = self.utility_rows[action]
+            utility_sum = self.utility_sum
+            for a in range(self.NUM_ACTIONS):
+                utility_sum[a] += weight * row[a]
+
+
+class SlidingWindowModel(FrequencyModel):
+    def __init__(self, num_actions, window=100, utility_rows=None, prior=1.0):
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        super().__init__(num_actions, utility_rows, prior)
+        self.window = window
+        # The last `window` moves, oldest at `position` once full
+        self.recent = array("l", bytes(array("l").itemsize * window))
+        self.position = 0
+
+    def update(self, action):
+        if self.moves >= self.window:
+            self.add(self.recent[self.position], -1.0)
+        self.recent[self.position] = action
+        self.position = self.position + 1 if self.position + 1 < self.window else 0
+        self.add(action, 1.0)
+        self.moves += 1
+
+
+class DecayedModel(FrequencyModel):
+    # Counts are divided down when the weight of a new move passes this
+    RESCALE = 1e100
+
+    def __init__(self, num_actions, half_life=100, utility_rows=None, prior=1.0):
+        if half_life is not None and half_life <= 0:
+            raise ValueError("half_life must be positive")
+        super().__init__(num_actions, utility_rows, prior)
+        self.half_life = half_life
+        self.growth = 1.0 if half_life is None else 2.0 ** (1.0 / half_life)
+        # Weight the next move is counted with
+        self.weight = 1.0
+
+    # The prior counts as much as `prior` moves made just now
+    def prior_weight(self):
+        return self.prior * self.weight / self.growth
+
+    def update(self, action):
+        self.add(action, self.weight)
+        self.weight *= self.growth
+        self.moves += 1
+        if self.weight > self.RESCALE:
+            self.rescale()
+
+    def rescale(self):
+        scale = self.weight
+        self.counts = [count / scale for count in self.counts]
+        self.total /= scale
+        if self.utility_rows is not None:
+            self.utility_sum = [utility / scale for utility in self.utility_sum]
+        self.weight = 1.0
+
+
+# Builds a model of `kind` ("window" or "decay") for the trainer's game.
+# size is the window length or the half life.
+def make_model(trainer, kind="window", size=100, prior=1.0):
+    if kind == "window":
+        return SlidingWindowModel(trainer.NUM_ACTIONS, size, trainer.utility_rows, prior)
+    if kind == "decay":
+        return DecayedModel(trainer.NUM_ACTIONS, size, trainer.utility_rows, prior)
+    raise ValueError("unknown model %r, expected 'window' or 'decay'" % kind)
+
+
+class OnlineTrainer:
+    # trainer provides the game (utility_rows and regret_matching()), model
+    # is a SlidingWindowModel or DecayedModel built with its utility rows
+    def __init__(self, trainer, model, update_rule="rm+", seed=None):
+        if model.utility_rows is None:
+            raise ValueError("the model needs the trainer's utility_rows")
+        self.trainer = trainer
+        self.model = model
+        self.NUM_ACTIONS = trainer.NUM_ACTIONS
+        self.update_rule = get_update_rule(update_rule)
+        self.sampler = ActionSampler(self.NUM_ACTIONS, seed)
+        self.regret_sum = [0.0] * self.NUM_ACTIONS
+        self.strategy_sum = [0.0] * self.NUM_ACTIONS
+        self.strategy = [1.0 / self.NUM_ACTIONS] * self.NUM_ACTIONS
+        self.moves = 0
+
+    # Takes in one opponent move and updates the strategy against the new
+    # estimate, O(NUM_ACTIONS)
+    def observe(self, opp_action):
+        self.model.update(opp_action)
+        utilities = self.model.expected_utilities()
+        strategy = self.strategy
+        received = 0.0
+        for a in range(self.NUM_ACTIONS):
+            received += strategy[a] * utilities[a]
+        for a in range(self.NUM_ACTIONS):
+            self.regret_sum[a] += utilities[a] - received
+        self.moves += 1
+        rule = self.update_rule
+        if rule.changes_regrets:
+            rule.apply(self.regret_sum, self.moves)
+        weight = self.moves ** rule.gamma if rule.gamma else 1
+        self.strategy = self.trainer.regret_matching(self.regret_sum, self.strategy_sum, weight)
+
+    # The action to play next, drawn from the current strategy
+    def get_action(self):
+        return self.sampler.sample(self.strategy)
+
+    # The pure best response to the current estimate
+    def best_response(self):
+        utilities = self.model.expected_utilities()
+        return max(range(self.NUM_ACTIONS), key=utilities.__getitem__)
+
+    def get_avg_strategy(self):
+        return self.trainer.normalise(self.strategy_sum)
+
+
+# Moves after the opponent switches from `before` to `after` until the
+# current strategy is within `tolerance` of a best response to `after`,
+# None if that does not happen within max_moves
+def adaptation_latency(online, payoff, before, after, warmup=1000, max_moves=5000, tolerance=0.1, seed=None):
+    sampler = ActionSampler(len(before), seed)
+    for opp_action in sampler.sample_block(sampler.table(before), warmup).tolist():
+        online.observe(opp_action)
+    for moves, opp_action in enumerate(sampler.sample_block(sampler.table(after), max_moves).tolist()):
+        online.observe(opp_action)
+        if best_response_gap(payoff, online.strategy, after) <= tolerance:
+            return moves + 1
+    return None
+
+
+# Observed moves per second, not counting drawing the opponent's moves
+def updates_per_second(online, opp_strategy, moves=100000, seed=None):
+    sampler = ActionSampler(len(opp_strategy), seed)
+    opp_actions = sampler.sample_block(sampler.table(opp_strategy), moves).tolist()
+    observe = online.observe
+    start = time.perf_counter()
+    for opp_action in opp_actions:
+        observe(opp_action)
+    return moves / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="cfr.opponent_model",
+                                     description="Adaptation latency and speed of the online opponent models.")
+    parser.add_argument("--game", choices=sorted(GAMES), default="rps")
+    parser.add_argument("--before", type=parse_strategy, default=None,
+                        help="opponent mix before the switch (default: mostly the first action)")
+    parser.add_argument("--after", type=parse_strategy, default=None,
+                        help="opponent mix after the switch (default: mostly the last action)")
+    parser.add_argument("--warmup", type=int, default=2000)
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--update-rule", default="rm+")
+    args = parser.parse_args(argv)
+
+    actions, payoff = get_game(args.game)
+    num_actions = len(actions)
+
+    def skewed(favourite):
+        return [0.6 if a == favourite else 0.4 / (num_actions - 1) for a in range(num_actions)]
+
+    before = args.before or skewed(0)
+    after = args.after or skewed(num_actions - 1)
+    trainer = MatrixGameTrainer(payoff, [1.0 / num_actions] * num_actions, actions)
+    models = [("window", 50), ("window", 200), ("decay", 35), ("decay", 140), ("decay", None)]
+
+    print("%s: opponent switches from %s to %s after %d moves" % (
+        args.game, [round(p, 3) for p in before], [round(p, 3) for p in after], args.warmup))
+    print("%-8s %6s %16s %12s %14s" % ("model", "size", "median moves", "not reached", "updates/s"))
+    for kind, size in models:
+        latencies = []
+        for repeat in range(args.repeats):
+            online = OnlineTrainer(trainer, make_model(trainer, kind, size), args.update_rule, seed=repeat)
+            latencies.append(adaptation_latency(online, payoff, before, after, args.warmup,
+                                                tolerance=args.tolerance, seed=repeat))
+        reached = [latency for latency in latencies if latency is not None]
+        rate = updates_per_second(OnlineTrainer(trainer, make_model(trainer, kind, size), args.update_rule),
+                                  after, seed=0)
+        print("%-8s %6s %16s %12d %14.0f" % (
+            kind, "all" if size is None else size,
+            "%.0f" % statistics.median(reached) if reached else "-", len(latencies) - len(reached), rate))
+
+
+if __name__ == "__main__":
+    main()
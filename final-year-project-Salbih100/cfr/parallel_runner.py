@@ -0,0 +1,132 @@
+import os
+import time
+from collections import namedtuple
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from cfr.batched_trainer import DEFAULT_BLOCK_SIZE
+from cfr.convergence import normalise
+from cfr.cyclic import make_batched_trainer
+from cfr.games import get_game
+
+'''
+Runs independent training jobs across a pool of worker processes.
+
+Every job gets its own RNG stream spawned from one SeedSequence, so runs are
+reproducible and no two jobs share random numbers however they are spread
+over the workers. Workers write the average strategies straight into a
+shared memory block instead of sending lists back through the pool, only the
+job index is pickled on the way back.
+
+Run this file directly for a scaling report (runs/sec against worker count).
+'''
+
+# game is a name from cfr.games, mode is "train" (best response to the fixed
+# opp_strategy), "nash" (both players learn, as in rps_to_nash) or "expected"
+# (nash with full-width expected utilities)
+TrainingJob = namedtuple("TrainingJob", ["game", "opp_strategy", "iterations", "seed", "mode"],
+                         defaults=[None, "train"])
+
+# Set in each worker by init_worker()
+worker_memory = None
+worker_results = None
+
+
+def init_worker(name, shape):
+    global worker_memory, worker_results
+    worker_memory = SharedMemory(name=name)
+    worker_results = np.ndarray(shape, dtype=np.float64, buffer=worker_memory.buf)
+
+
+# Trains one job and writes the player and opponent average strategies into
+# row `index` of the shared results
+def run_job(task):
+    index, job, seed_sequence, block_size = task
+    payoff = get_game(job.game)[1]
+    trainer = make_batched_trainer(payoff, job.opp_strategy, block_size, seed_sequence)
+    if job.mode == "train":
+        trainer.train(job.iterations)
+        strats = trainer.get_avg_strategy(), trainer.opp_strategy
+    elif job.mode == "nash":
+        strats = trainer.rps_to_nash(job.iterations)
+    elif job.mode == "expected":
+        strats = trainer.expected_nash_equilibrium(job.iterations)
+        strats = normalise(strats[0]), normalise(strats[1])
+    else:
+        raise ValueError("unknown mode %r, expected 'train', 'nash' or 'expected'" % job.mode)
+    worker_results[index, 0, :trainer.NUM_ACTIONS] = strats[0]
+    worker_results[index, 1, :trainer.NUM_ACTIONS] = strats[1]
+    return index
+
+
+# One independent seed sequence per job. Jobs with their own seed use it,
+# the rest get children spawned from root_seed.
+def job_seed_sequences(jobs, root_seed=None):
+    children = np.random.SeedSequence(root_seed).spawn(len(jobs))
+    sequences = []
+    for job, child in zip(jobs, children):
+        if job.seed is not None:
+            sequences.append(np.random.SeedSequence(job.seed))
+        else:
+            sequences.append(child)
+    return sequences
+
+
+# Runs every job and returns an array of shape (jobs, 2, max actions) where
+# [i, 0] is the player average strategy of job i and [i, 1] the opponent's.
+# Games with fewer actions than the largest are padded with zeros.
+def run_parallel(jobs, workers=None, root_seed=None, block_size=DEFAULT_BLOCK_SIZE, chunksize=None):
+    jobs = [TrainingJob(*job) if not isinstance(job, TrainingJob) else job for job in jobs]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, len(jobs) // (workers * 4))
+    max_actions = max(len(get_game(job.game)[1]) for job in jobs)
+    shape = (len(jobs), 2, max_actions)
+
+    memory = SharedMemory(create=True, size=max(1, int(np.prod(shape)) * 8))
+    results = np.ndarray(shape, dtype=np.float64, buffer=memory.buf)
+    try:
+        results[:] = 0.0
+        tasks = [(i, job, seed, block_size)
+                 for i, (job, seed) in enumerate(zip(jobs, job_seed_sequences(jobs, root_seed)))]
+        with Pool(workers, initializer=init_worker, initargs=(memory.name, shape)) as pool:
+            pool.map(run_job, tasks, chunksize)
+        finished = results.copy()
+    finally:
+        # The array has to go before the shared memory can be closed
+        del results
+        memory.close()
+        memory.unlink()
+    return finished
+
+
+# Times the same batch of jobs with different worker counts
+# Returns a list of (workers, runs per second)
+def scaling_report(jobs, worker_counts=None, root_seed=0):
+    if worker_counts is None:
+        cpus = os.cpu_count() or 1
+        worker_counts = sorted(set([1, 2, 4, 8, 16, 32, 64, cpus]))
+        worker_counts = [w for w in worker_counts if w <= cpus]
+    report = []
+    for workers in worker_counts:
+        start = time.perf_counter()
+        run_parallel(jobs, workers, root_seed)
+        elapsed = time.perf_counter() - start
+        report.append((workers, len(jobs) / elapsed))
+    return report
+
+
+def main():
+    jobs = [TrainingJob("rps", [0.4, 0.3, 0.3], 100000, mode="train") for x in range(64)]
+    print("Jobs:", len(jobs), "x", jobs[0].iterations, "iterations")
+    print("workers  runs/sec  speedup")
+    report = scaling_report(jobs)
+    for workers, rate in report:
+        print("%7d  %8.2f  %7.2f" % (workers, rate, rate / report[0][1]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+import argparse
+import asyncio
+import random
+import time
+
+import numpy as np
+
+from cfr.games import GAMES, get_game
+from cfr.matrix_game_trainer import MatrixGameTrainer
+from cfr.sampler import ActionSampler
+
+'''
+Online play against live opponents. Every session keeps its own regrets and
+strategy sum and learns from each move the opponent makes, using the utility
+rows and regret matching of a MatrixGameTrainer (rpsTrainer and
+rpslspTrainer work too). A move is O(NUM_ACTIONS):
+
+1. the action committed to last time is the reply to the opponent's move
+2. the regrets for that round are added from the opponent move's utility row
+3. regret matching gives the new strategy and the next action is drawn
+
+The TCP protocol is one line per move: the client sends an action (name or
+index) and gets back the server's action for that round, "quit" ends the
+session. A line longer than LINE_LIMIT bytes gets "error ..." back and
+ends the session, as does the client resetting the connection.
+PlayService can also be used in-process without a socket.
+
+    python -m cfr.play_server --benchmark --sessions 2000 --moves 200
+    python -m cfr.play_server --benchmark --socket --sessions 1000
+    python -m cfr.play_server --port 8765
+'''
+
+# Longest line a client may send, including the newline
+LINE_LIMIT = 1024
+
+
+class PlaySession:
+    __slots__ = ("regret_sum", "strategy_sum", "next_action", "moves")
+
+    def __init__(self, num_actions, first_action):
+        self.regret_sum = [0] * num_actions
+        self.strategy_sum = [0] * num_actions
+        self.next_action = first_action
+        self.moves = 0
+
+
+class PlayService:
+    def __init__(self, trainer, seed=None):
+        self.trainer = trainer
+        self.NUM_ACTIONS = trainer.NUM_ACTIONS
+        self.actions = trainer.actions
+        self.action_index = {name: a for a, name in enumerate(self.actions)}
+        self.sampler = ActionSampler(self.NUM_ACTIONS, seed)
+        self.uniform = [1.0 / self.NUM_ACTIONS] * self.NUM_ACTIONS
+        self.sessions = {}
+        self.next_session = 0
+
+    def open_session(self):
+        session_id = self.next_session
+        self.next_session += 1
+        self.sessions[session_id] = PlaySession(self.NUM_ACTIONS, self.sampler.sample(self.uniform))
+        return session_id
+
+    def close_session(self, session_id):
+        self.sessions.pop(session_id, None)
+
+    # Turns "rock", "Rock" or "0" into an action index
+    def parse_action(self, text):
+        text = text.strip().lower()
+        if text in self.action_index:
+            return self.action_index[text]
+        if text.isdigit() and int(text) < self.NUM_ACTIONS:
+            return int(text)
+        raise ValueError("unknown action %r" % text)
+
+    # Plays one round against the opponent's action and returns our action
+    def move(self, session_id, opp_action):
+        session = self.sessions[session_id]
+        my_action = session.next_action
+
+        # Add the regrets from this round
+        regret_sum = session.regret_sum
+        utility = self.trainer.utility_rows[opp_action]
+        received = utility[my_action]
+        for i in range(self.NUM_ACTIONS):
+            regret_sum[i] += utility[i] - received
+
+        strategy = self.trainer.regret_matching(regret_sum, session.strategy_sum)
+        session.next_action = self.sampler.sample(strategy)
+        session.moves += 1
+        return my_action
+
+    # Average strategy a session has played so far
+    def average_strategy(self, session_id):
+        return self.trainer.normalise(self.sessions[session_id].strategy_sum)
+
+    # Serves one TCP connection as one session
+    async def handle_client(self, reader, writer):
+        session_id = self.open_session()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Longer than the stream's limit, the rest of the line
+                    # cannot be told apart from the next move
+                    writer.write(b"error line longer than %d bytes\n" % LINE_LIMIT)
+                    await writer.drain()
+                    break
+                if not line or line.strip() == b"quit":
+                    break
+                try:
+                    opp_action = self.parse_action(line.decode())
+                except ValueError as error:
+                    writer.write(("error %s\n" % error).encode())
+                else:
+                    writer.write((self.actions[self.move(session_id, opp_action)] + "\n").encode())
+                await writer.drain()
+        except ConnectionError:
+            # The client reset the connection (or it broke while we were
+            # writing), there is nobody to send an error to
+            pass
+        finally:
+            self.close_session(session_id)
+            writer.close()
+
+    async def start_server(self, host="127.0.0.1", port=0):
+        return await asyncio.start_server(self.handle_client, host, port, limit=LINE_LIMIT)
+
+
+# p50/p99 latency and moves per second from per-move latencies in nanoseconds
+class LatencyReport:
+    def __init__(self, latencies_ns, moves, seconds):
+        latencies = np.asarray(latencies_ns, dtype=np.float64) / 1000.0
+        self.moves = moves
+        self.seconds = seconds
+        self.moves_per_second = moves / seconds if seconds > 0 else float("inf")
+        self.p50_us = float(np.percentile(latencies, 50))
+        self.p99_us = float(np.percentile(latencies, 99))
+
+    def __str__(self):
+        return ("%d moves in %.3fs: %.0f moves/sec, latency p50 %.1fus p99 %.1fus"
+                % (self.moves, self.seconds, self.moves_per_second, self.p50_us, self.p99_us))
+
+
+# Sessions play concurrently against the service in-process, each opponent
+# picks its moves from its own fixed random mix
+async def benchmark_in_process(service, sessions, moves, seed=0):
+    latencies = []
+
+    async def client(number):
+        rng = random.Random(seed + number)
+        mix = [rng.random() for a in range(service.NUM_ACTIONS)]
+        session_id = service.open_session()
+        for x in range(moves):
+            opp_action = rng.choices(range(service.NUM_ACTIONS), mix)[0]
+            start = time.perf_counter_ns()
+            service.move(session_id, opp_action)
+            latencies.append(time.perf_counter_ns() - start)
+            # Give the other sessions a turn, as a real connection would
+            await asyncio.sleep(0)
+        service.close_session(session_id)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(n) for n in range(sessions)))
+    return LatencyReport(latencies, sessions * moves, time.perf_counter() - start)
+
+
+# Same as benchmark_in_process but every session is a TCP connection to a
+# local server and latency is the client's round trip
+async def benchmark_socket(service, sessions, moves, seed=0):
+    server = await service.start_server()
+    port = server.sockets[0].getsockname()[1]
+    latencies = []
+
+    async def client(number):
+        rng = random.Random(seed + number)
+        mix = [rng.random() for a in range(service.NUM_ACTIONS)]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        for x in range(moves):
+            opp_action = rng.choices(range(service.NUM_ACTIONS), mix)[0]
+            start = time.perf_counter_ns()
+            writer.write(b"%d\n" % opp_action)
+            await reader.readline()
+            latencies.append(time.perf_counter_ns() - start)
+        writer.write(b"quit\n")
+        await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(n) for n in range(sessions)))
+    seconds = time.perf_counter() - start
+    server.close()
+    await server.wait_closed()
+    return LatencyReport(latencies, sessions * moves, seconds)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="cfr.play_server", description="Online regret matching play server.")
+    parser.add_argument("--game", choices=sorted(GAMES), default="rps")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--benchmark", action="store_true", help="run the load test instead of serving")
+    parser.add_argument("--socket", action="store_true", help="benchmark over local TCP connections")
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--moves", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    actions, payoff = get_game(args.game)
+    trainer = MatrixGameTrainer(payoff, [1.0 / len(actions)] * len(actions), actions)
+    service = PlayService(trainer, args.seed)
+
+    if args.benchmark:
+        benchmark = benchmark_socket if args.socket else benchmark_in_process
+        report = asyncio.run(benchmark(service, args.sessions, args.moves))
+        print("%s, %d sessions %s:" % (args.game, args.sessions, "over TCP" if args.socket else "in-process"))
+        print(report)
+        return
+
+    async def serve():
+        server = await service.start_server(args.host, args.port)
+        print("Serving %s on %s:%d" % (args.game, args.host, args.port))
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+import argparse
+import os
+import time
+from collections import namedtuple
+
+import numpy as np
+
+'''
+Graphs of how the average strategy changes with iterations.
+
+matplotlib takes hundreds of milliseconds to import, so it is only imported
+inside the functions that draw, never when this module or the trainers are
+imported.
+
+A history can hold millions of samples, far more than a graph a few hundred
+pixels wide can show, and drawing them all takes longer than the training.
+Every line is downsampled before it is drawn:
+- "lttb" (largest triangle three buckets, Steinarsson 2013) keeps
+  max_points of the real samples, picking in each bucket the one that makes
+  the largest triangle with its neighbours, so spikes and turns survive
+- "minmax" draws a band between the smallest and largest value of each
+  bucket, which shows all of the noise in a sampled run
+- "none" draws every sample
+
+Saving to a file never touches pyplot. The figure is drawn straight onto an
+Agg canvas, so it works on machines with no display and in worker processes.
+export_plots() saves the graphs of many runs across a pool of processes:
+
+    python -m cfr.plotting --runs 16 --points 1000000 --output-dir plots
+'''
+
+METHODS = ("lttb", "minmax", "none")
+DEFAULT_MAX_POINTS = 2000
+
+# One graph for export_plots(). history is a HistoryRecorder or an
+# (iterations, strategies) pair of arrays.
+PlotJob = namedtuple("PlotJob", ["history", "actions", "path", "graph_title"], defaults=[None])
+
+
+# Indexes of the `threshold` samples of (x, y) that largest triangle three
+# buckets keeps. The first and last samples are always kept.
+def lttb_indices(x, y, threshold):
+    samples = len(x)
+    if threshold >= samples or threshold < 3:
+        return np.arange(samples)
+    # threshold - 2 buckets between the first and last sample
+    edges = np.linspace(1, samples - 1, threshold - 1).astype(np.intp)
+    starts, ends = edges[:-1], edges[1:]
+    # Mean point of every bucket, the next bucket's mean is the third corner
+    # of the triangle. After the last bucket that is the last sample.
+    counts = ends - starts
+    mean_x = np.append(np.add.reduceat(x[:samples - 1], starts) / counts, x[-1])
+    mean_y = np.append(np.add.reduceat(y[:samples - 1], starts) / counts, y[-1])
+
+    kept = np.empty(threshold, dtype=np.intp)
+    kept[0] = 0
+    kept[-1] = samples - 1
+    chosen = 0
+    for bucket in range(threshold - 2):
+        start, end = starts[bucket], ends[bucket]
+        # Twice the triangle's area, the constant factor does not matter
+        areas = np.abs((x[chosen] - mean_x[bucket + 1]) * (y[start:end] - y[chosen])
+                       - (x[chosen] - x[start:end]) * (mean_y[bucket + 1] - y[chosen]))
+        chosen = start + int(areas.argmax())
+        kept[bucket + 1] = chosen
+    return kept
+
+
+def lttb(x, y, threshold):
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    kept = lttb_indices(x, y, threshold)
+    return x[kept], y[kept]
+
+
+# Smallest and largest y in each of `buckets` equal runs of samples. Returns
+# the x where every bucket starts, the minimums and the maximums.
+def minmax_envelope(x, y, buckets):
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if buckets >= len(x):
+        return x, y, y
+    starts = np.linspace(0, len(x), buckets, endpoint=False).astype(np.intp)
+    return x[starts], np.minimum.reduceat(y, starts), np.maximum.reduceat(y, starts)
+
+
+# The iterations and strategies of a HistoryRecorder or (iterations, strategies) pair
+def history_arrays(history):
+    if isinstance(history, tuple):
+        iterations, strategies = history
+        return np.asarray(iterations), np.asarray(strategies, dtype=np.float64)
+    return history.iterations(), history.strategies()
+
+
+# Draws every action's line onto a matplotlib Axes
+def draw_history(axes, iterations, strategies, actions, graph_title=None,
+                 max_points=DEFAULT_MAX_POINTS, method="lttb"):
+    if method not in METHODS:
+        raise ValueError("unknown method %r, expected one of %s" % (method, list(METHODS)))
+    if graph_title is not None:
+        axes.set_title(graph_title)
+    axes.set_ylim(-0.1, 1.1)
+    for action, name in enumerate(actions):
+        probabilities = strategies[:, action]
+        if method == "minmax":
+            x, low, high = minmax_envelope(iterations, probabilities, max_points)
+            line, = axes.plot(x, (low + high) / 2, linewidth=1, label=name)
+            axes.fill_between(x, low, high, color=line.get_color(), alpha=0.3, linewidth=0)
+        elif method == "lttb":
+            axes.plot(*lttb(iterations, probabilities, max_points), label=name)
+        else:
+            axes.plot(iterations, probabilities, label=name)
+    axes.legend(loc='best')
+
+
+# Draws the history onto an Agg canvas and saves it to `path`, the format
+# comes from the file extension. Needs no display.
+def save_plot(history, actions, path, graph_title=None, max_points=DEFAULT_MAX_POINTS,
+              method="lttb", dpi=100, size=(6.4, 4.8)):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    iterations, strategies = history_arrays(history)
+    figure = Figure(figsize=size, dpi=dpi)
+    FigureCanvasAgg(figure)
+    draw_history(figure.add_subplot(), iterations, strategies, actions, graph_title, max_points, method)
+    figure.savefig(path)
+
+
+# Plots every action's probability from a HistoryRecorder. Shows the graph
+# when no path is given, otherwise saves it to `path` without pyplot.
+def plot_history(history, actions, graph_title=None, path=None, max_points=DEFAULT_MAX_POINTS,
+                 method="lttb"):
+    if path is not None:
+        save_plot(history, actions, path, graph_title, max_points, method)
+        return
+    import matplotlib.pyplot as plt
+
+    iterations, strategies = history_arrays(history)
+    draw_history(plt.gca(), iterations, strategies, actions, graph_title, max_points, method)
+    plt.show()
+
+
+# The tasks of the export_plots() call in progress. Forked workers inherit
+# them, so the histories are not pickled over to every worker.
+export_tasks = None
+
+
+def export_job(task):
+    job, max_points, method, dpi = task
+    save_plot(job.history, job.actions, job.path, job.graph_title, max_points, method, dpi)
+    return job.path
+
+
+def export_inherited_job(index):
+    return export_job(export_tasks[index])
+
+
+# Saves the graph of every PlotJob, spread over `workers` processes (all
+# CPUs by default, 1 draws them in this process). Returns the paths written.
+def export_plots(jobs, workers=None, max_points=DEFAULT_MAX_POINTS, method="lttb", dpi=100):
+    # Send plain arrays to the workers rather than whole recorders
+    tasks = [(PlotJob(history_arrays(job.history), job.actions, job.path, job.graph_title),
+              max_points, method, dpi) for job in (PlotJob(*job) for job in jobs)]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers == 1 or len(tasks) <= 1:
+        return [export_job(task) for task in tasks]
+    global export_tasks
+    import multiprocessing
+
+    workers = min(workers, len(tasks))
+    if multiprocessing.get_start_method() != "fork":
+        with multiprocessing.Pool(workers) as pool:
+            return pool.map(export_job, tasks, chunksize=1)
+    export_tasks = tasks
+    try:
+        with multiprocessing.Pool(workers) as pool:
+            return pool.map(export_inherited_job, range(len(tasks)), chunksize=1)
+    finally:
+        export_tasks = None
+
+
+# A random walk that settles down, shaped like a long training history
+def synthetic_history(points, num_actions=3, seed=None):
+    rng = np.random.default_rng(seed)
+    iterations = np.arange(points) * 100
+    steps = rng.normal(0.0, 1.0, (points, num_actions)) / np.sqrt(np.arange(1, points + 1))[:, None]
+    strategies = np.exp(np.cumsum(steps, axis=0) * 0.05)
+    return iterations, strategies / strategies.sum(axis=1, keepdims=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="cfr.plotting", description="Time exporting history graphs.")
+    parser.add_argument("--runs", type=int, default=8)
+    parser.add_argument("--points", type=int, default=1000000)
+    parser.add_argument("--max-points", type=int, default=DEFAULT_MAX_POINTS)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output-dir", default="plots")
+    parser.add_argument("--skip-full", action="store_true", help="do not time drawing every sample")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    actions = ["rock", "paper", "scissors"]
+    history = synthetic_history(args.points, seed=0)
+    methods = ("lttb", "minmax") if args.skip_full else METHODS
+    # Import matplotlib and load its fonts before timing anything
+    save_plot(synthetic_history(10), actions, os.path.join(args.output_dir, "warm-up.png"))
+    for method in methods:
+        start = time.perf_counter()
+        save_plot(history, actions, os.path.join(args.output_dir, "single-%s.png" % method),
+                  max_points=args.max_points, method=method)
+        print("One graph of %d points, %-6s %.3fs" % (args.points, method, time.perf_counter() - start))
+
+    jobs = [PlotJob(synthetic_history(args.points, seed=run), actions,
+                    os.path.join(args.output_dir, "run-%d.png" % run), "Run %d" % run)
+            for run in range(args.runs)]
+    for workers in sorted(set([1, args.workers or os.cpu_count() or 1])):
+        start = time.perf_counter()
+        export_plots(jobs, workers, args.max_points)
+        seconds = time.perf_counter() - start
+        print("%d graphs with %d workers in %.3fs, %.1f graphs/s" % (args.runs, workers, seconds, args.runs / seconds))
+
+
+if __name__ == "__main__":
+    main()
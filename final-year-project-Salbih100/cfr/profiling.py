@@ -0,0 +1,183 @@
+import sys
+import time
+
+'''
+Opt-in per-phase timing for MatrixGameTrainer and CompactTrainer (and so
+rpsTrainer and rpslspTrainer).
+
+    profiler = trainer.enable_profiling()
+    trainer.train(1000000)
+    print(profiler.format_report())
+
+While profiling is off the trainers run their normal loops untouched. The
+loops in cfr.trainer_base.SampledTrainer fetch every function they call
+per phase through trainer.timed(), which with a profiler attached returns
+timed() from here, a wrapper that takes a perf_counter_ns() reading either
+side of the call. The same functions run in the same order and draw the
+same random numbers, so the results are identical. The phases are:
+
+    checkpoint        saving to a Checkpointer
+    sample_opponent   drawing a block of fixed opponent actions in train()
+    get_avg_strategy  the average strategy recorded into the history
+    get_strategy      regret matching for the player
+    get_strategy_opp  regret matching for the opponent
+    get_action        sampling an action from a strategy
+    update_rule       discounting/flooring regrets (only for those rules)
+    regret_update     the rest of the run: looking up the utility row,
+                      adding the regrets and the loop itself
+
+regret_update is not wrapped (it is a few lines of arithmetic inside the
+loop), it is the run's wall time less everything the wrappers measured.
+
+A timed call costs a few hundred nanoseconds, a lot next to the phases
+themselves. The profiler measures its own cost when it is made: the part
+inside the clock readings (lap_overhead_ns, taken off every phase's
+adjusted_ns) and the part outside them (call_overhead_ns, taken off
+regret_update). Compare phases by adjusted_ns rather than total_ns.
+
+With allocations=True each timed call also reads sys.getallocatedblocks(),
+blocks is the net number of memory blocks a phase left allocated (new
+strategy lists, the sampler's next block of uniforms). Small floats and
+ints come from free lists and do not show up. Counting walks the
+allocator's arenas, which makes a call several times dearer, so it is off
+by default.
+'''
+
+PHASES = ("checkpoint", "sample_opponent", "get_avg_strategy", "get_strategy", "get_strategy_opp",
+          "get_action", "update_rule", "regret_update")
+# Phases that are wrapped, regret_update is what is left over
+TIMED_PHASES = PHASES[:-1]
+
+
+def no_blocks():
+    return 0
+
+
+class PhaseStats:
+    __slots__ = ("calls", "total_ns", "blocks")
+
+    def __init__(self):
+        self.calls = 0
+        self.total_ns = 0
+        self.blocks = 0
+
+
+class Profiler:
+    def __init__(self, allocations=False):
+        self.allocations = allocations
+        self.clock = time.perf_counter_ns
+        self.blocks = sys.getallocatedblocks if allocations else no_blocks
+        self.phases = {phase: PhaseStats() for phase in PHASES}
+        self.runs = 0
+        self.iterations = 0
+        self.wall_ns = 0
+        self.lap_overhead_ns, self.call_overhead_ns = self.calibrate()
+
+    # Average cost of a timed call of a function that does nothing, inside
+    # and outside the clock readings
+    def calibrate(self, calls=20000):
+        self.phases["calibrate"] = PhaseStats()
+        function = self.timed("calibrate", no_blocks)
+        start = self.clock()
+        for x in range(calls):
+            function()
+        timed_ns = self.clock() - start
+        start = self.clock()
+        for x in range(calls):
+            no_blocks()
+        bare_ns = self.clock() - start
+        inside = self.phases.pop("calibrate").total_ns
+        return inside / calls, max(0.0, (timed_ns - bare_ns - inside) / calls)
+
+    # Wraps function so that every call is charged to `phase`
+    def timed(self, phase, function):
+        stats = self.phases[phase]
+        clock = self.clock
+        if not self.allocations:
+            def timed_function(*args):
+                start = clock()
+                result = function(*args)
+                stats.total_ns += clock() - start
+                stats.calls += 1
+                return result
+            return timed_function
+
+        blocks = self.blocks
+
+        def counted_function(*args):
+            start_blocks = blocks()
+            start = clock()
+            result = function(*args)
+            stats.total_ns += clock() - start
+            stats.blocks += blocks() - start_blocks
+            stats.calls += 1
+            return result
+        return counted_function
+
+    # Called by the trainers around a run. start_run() returns what
+    # finish_run() needs to charge the rest of the run to regret_update.
+    def start_run(self):
+        return self.clock(), self.timed_totals()
+
+    def finish_run(self, run, iterations):
+        wall_ns = self.clock() - run[0]
+        timed_ns, calls = self.timed_totals()
+        stats = self.phases["regret_update"]
+        stats.calls += iterations
+        stats.total_ns += max(0, wall_ns - (timed_ns - run[1][0])
+                              - int((calls - run[1][1]) * self.call_overhead_ns))
+        self.add_run(iterations, wall_ns)
+
+    # Total time and calls of the wrapped phases so far
+    def timed_totals(self):
+        total_ns = 0
+        calls = 0
+        for phase in TIMED_PHASES:
+            total_ns += self.phases[phase].total_ns
+            calls += self.phases[phase].calls
+        return total_ns, calls
+
+    def add_run(self, iterations, wall_ns):
+        self.runs += 1
+        self.iterations += iterations
+        self.wall_ns += wall_ns
+
+    def reset(self):
+        self.phases = {phase: PhaseStats() for phase in PHASES}
+        self.runs = 0
+        self.iterations = 0
+        self.wall_ns = 0
+
+    # {phase: {calls, total_ns, mean_ns, adjusted_ns, share, blocks}} for every
+    # phase that ran, share is the fraction of the adjusted total
+    def report(self):
+        adjusted = {}
+        for phase, stats in self.phases.items():
+            if stats.calls:
+                overhead = 0.0 if phase == "regret_update" else stats.calls * self.lap_overhead_ns
+                adjusted[phase] = max(0.0, stats.total_ns - overhead)
+        adjusted_total = sum(adjusted.values())
+        report = {}
+        for phase in adjusted:
+            stats = self.phases[phase]
+            report[phase] = {
+                "calls": stats.calls,
+                "total_ns": stats.total_ns,
+                "mean_ns": stats.total_ns / stats.calls,
+                "adjusted_ns": adjusted[phase],
+                "share": adjusted[phase] / adjusted_total if adjusted_total else 0.0,
+                "blocks": stats.blocks,
+            }
+        return report
+
+    def format_report(self):
+        lines = ["%d run(s), %d iterations, %.3fs wall, lap overhead %.0fns, call overhead %.0fns"
+                 % (self.runs, self.iterations, self.wall_ns / 1e9, self.lap_overhead_ns,
+                    self.call_overhead_ns),
+                 "%-17s %11s %12s %10s %12s %7s %9s"
+                 % ("phase", "calls", "total ms", "mean ns", "adjusted ms", "share", "blocks")]
+        for phase, stats in self.report().items():
+            lines.append("%-17s %11d %12.1f %10.0f %12.1f %6.1f%% %9d" % (
+                phase, stats["calls"], stats["total_ns"] / 1e6, stats["mean_ns"],
+                stats["adjusted_ns"] / 1e6, 100.0 * stats["share"], stats["blocks"]))
+        return "\n".join(lines)
@@ -0,0 +1,334 @@
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from cfr.checkpoint import MODES, pack_rng, restore, unpack_rng
+from cfr.convergence import normalise
+from cfr.exact import payoff_key
+from cfr.games import GAMES, get_game
+from cfr.history import RETENTIONS, HistoryRecorder
+
+'''
+On-disk memoization of whole training runs.
+
+A run is keyed by everything that decides its outcome: the trainer class,
+a hash of the payoff matrix, the opponent strategy, the mode, the number of
+iterations, the update rule, the sampler's block size, the history
+recorder's settings (for "train", the only mode that records) and the
+state of its random generator. The generator state stands in for the seed. A trainer
+built with seed=0 always starts from the same state, so its runs hit. A
+trainer built without a seed starts from a fresh random state every time,
+so its runs never hit.
+
+    cache = ResultCache("~/.cache/cfr-runs")
+    trainer = rpsTrainer([0.4, 0.3, 0.3], seed=0)
+    cache.train(trainer, 1000000)    # trains and stores the result
+    trainer = rpsTrainer([0.4, 0.3, 0.3], seed=0)
+    cache.train(trainer, 1000000)    # loads it again in microseconds
+
+Every entry is one small binary file, a magic string followed by a fixed
+layout record of the regrets, strategies, strategy sums and sampler state
+after the run (no .npy header to parse, which would be most of the cost of
+a hit). A "train" entry is followed by the samples its HistoryRecorder
+kept. A hit copies it all into the trainer and sets its iteration count,
+and the trainer then carries on exactly as if it had trained itself,
+history included. A "train" run with some other kind of history object is
+trained every time and never stored, its history could not be given back.
+The trainer must be fresh (nothing trained yet), or the result would not
+belong to the key.
+
+Entries are written to a temporary file and moved into place with
+os.replace(), so any number of processes can share a directory and never
+read half a file. The least recently used entries (by file modification
+time, which a hit bumps) are removed once there are more than max_entries
+or they take up more than max_bytes between them.
+'''
+
+FORMAT_VERSION = 2
+MAGIC = b"CFRRUN02"
+SUFFIX = ".run"
+STATE_FIELDS = ("regret_sum", "strategy", "strategy_sum",
+                "opp_regret_sum", "opp_strategy", "opp_strategy_sum")
+
+
+def entry_dtype(num_actions):
+    return np.dtype([(field, "<f8", (num_actions,)) for field in STATE_FIELDS] + [
+        ("rng", "<u8", (6,)),
+        ("block_rng", "<u8", (6,)),
+        ("uniform_count", "<i8"),
+        ("uniform_position", "<i8"),
+    ])
+
+
+# Follows the record of a "train" entry, then `stored` iterations and
+# `stored` rows of strategies
+HISTORY_DTYPE = np.dtype([("count", "<i8"), ("next_iteration", "<i8"), ("interval", "<i8"),
+                          ("ratio", "<f8"), ("stored", "<i8")])
+
+
+# Whether the run's history goes into the entry, and whether the run can be
+# cached at all
+def records_history(trainer, mode):
+    return mode == "train" and getattr(trainer, "history", None) is not None
+
+
+def cacheable(trainer, mode):
+    return not records_history(trainer, mode) or isinstance(trainer.history, HistoryRecorder)
+
+
+# Settings of the recorder that decide what a run puts into it
+def history_key(trainer, mode):
+    if not records_history(trainer, mode):
+        return None
+    history = trainer.history
+    return [history.capacity, RETENTIONS.index(history.retention), history.interval, history.ratio,
+            history.count, history.next_iteration]
+
+
+# The recorder's state and stored samples, as written after the record
+def history_bytes(history):
+    stored = len(history)
+    header = np.zeros((), dtype=HISTORY_DTYPE)
+    header["count"] = history.count
+    header["next_iteration"] = history.next_iteration
+    header["interval"] = history.interval
+    header["ratio"] = history.ratio
+    header["stored"] = stored
+    return (header.tobytes() + history.iteration_buffer[:stored].astype("<i8").tobytes()
+            + history.strategy_buffer[:stored].astype("<f8").tobytes())
+
+
+# Copies what history_bytes() wrote at `offset` of data back into a recorder
+def load_history(history, data, offset):
+    header = np.frombuffer(data, dtype=HISTORY_DTYPE, count=1, offset=offset)[0]
+    stored = int(header["stored"])
+    offset += HISTORY_DTYPE.itemsize
+    history.count = int(header["count"])
+    history.next_iteration = int(header["next_iteration"])
+    history.interval = int(header["interval"])
+    history.ratio = float(header["ratio"])
+    history.iteration_buffer[:stored] = np.frombuffer(data, dtype="<i8", count=stored, offset=offset)
+    offset += 8 * stored
+    history.strategy_buffer[:stored] = np.frombuffer(
+        data, dtype="<f8", count=stored * history.NUM_ACTIONS, offset=offset).reshape(stored, history.NUM_ACTIONS)
+
+
+# Hash of the run configuration, the name of the entry's file
+def run_key(trainer, mode, iterations):
+    if mode not in MODES:
+        raise ValueError("unknown mode %r, expected one of %s" % (mode, list(MODES)))
+    rule = getattr(trainer, "update_rule", None)
+    config = {
+        "format": FORMAT_VERSION,
+        "trainer": type(trainer).__name__,
+        "payoff": payoff_key(trainer.payoff),
+        "opp_strategy": [float(p) for p in trainer.opp_strategy],
+        "mode": mode,
+        "iterations": int(iterations),
+        "update_rule": None if rule is None else repr(rule),
+        "block_size": getattr(trainer, "block_size", None),
+        "sampler_block_size": trainer.sampler.block_size,
+        "rng": pack_rng(trainer.sampler.rng.bit_generator.state),
+        "history": history_key(trainer, mode),
+    }
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()
+
+
+class CacheStats:
+    def __init__(self, hits, misses, evictions, entries, size_bytes):
+        # hits, misses and evictions are for this ResultCache object, entries
+        # and size_bytes for the whole directory
+        self.hits = hits
+        self.misses = misses
+        self.evictions = evictions
+        self.entries = entries
+        self.size_bytes = size_bytes
+        lookups = hits + misses
+        self.hit_rate = hits / lookups if lookups else 0.0
+
+    def __repr__(self):
+        return ("CacheStats(hits=%d, misses=%d, hit_rate=%.3f, evictions=%d, entries=%d, size_bytes=%d)"
+                % (self.hits, self.misses, self.hit_rate, self.evictions, self.entries, self.size_bytes))
+
+
+class ResultCache:
+    def __init__(self, directory, max_entries=10000, max_bytes=None):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        if max_bytes is not None and max_bytes < 1:
+            raise ValueError("max_bytes must be at least 1")
+        self.directory = os.path.expanduser(directory)
+        os.makedirs(self.directory, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    # Trains `trainer` in `mode` for `iterations`, or loads the result of the
+    # same run from the cache. Returns True for a hit.
+    def run(self, trainer, mode, iterations):
+        if trainer.iteration or any(trainer.strategy_sum) or any(trainer.opp_strategy_sum):
+            raise ValueError("only runs from a freshly built trainer can be cached")
+        if not cacheable(trainer, mode):
+            self.misses += 1
+            trainer.train(iterations)
+            return False
+        key = run_key(trainer, mode, iterations)
+        if self.load(key, trainer, mode):
+            trainer.iteration = iterations
+            self.hits += 1
+            return True
+        self.misses += 1
+        if mode == "train":
+            trainer.train(iterations)
+        elif mode == "expected":
+            trainer.expected_nash_equilibrium(iterations)
+        else:
+            trainer.nash_equilibrium(iterations)
+        self.store(key, trainer, mode)
+        return False
+
+    def train(self, trainer, iterations):
+        return self.run(trainer, "train", iterations)
+
+    # The cached version of trainer.rps_to_nash(iterations), as NumPy arrays
+    def rps_to_nash(self, trainer, iterations):
+        self.run(trainer, "nash", iterations)
+        return normalise(trainer.strategy_sum), normalise(trainer.opp_strategy_sum)
+
+    # Copies a stored run into the trainer, False if there is none
+    def load(self, key, trainer, mode):
+        path = self.path(key)
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+            # Bump the modification time, the entry was just used
+            os.utime(path)
+        except OSError:
+            # Missing, or evicted by another process since
+            return False
+        dtype = entry_dtype(trainer.NUM_ACTIONS)
+        size = len(MAGIC) + dtype.itemsize
+        if len(data) < size or not data.startswith(MAGIC):
+            return False
+        if records_history(trainer, mode):
+            if len(data) < size + HISTORY_DTYPE.itemsize:
+                return False
+            stored = int(np.frombuffer(data, dtype=HISTORY_DTYPE, count=1, offset=size)[0]["stored"])
+            size += HISTORY_DTYPE.itemsize + stored * 8 * (1 + trainer.NUM_ACTIONS)
+        if len(data) != size:
+            return False
+        record = np.frombuffer(data, dtype=dtype, count=1, offset=len(MAGIC))[0]
+        for field in STATE_FIELDS:
+            restore(getattr(trainer, field), record[field])
+        count = int(record["uniform_count"])
+        block_state = unpack_rng(record["block_rng"]) if count > 0 else None
+        trainer.sampler.set_state((unpack_rng(record["rng"]), block_state, count,
+                                   int(record["uniform_position"])))
+        if records_history(trainer, mode):
+            load_history(trainer.history, data, len(MAGIC) + dtype.itemsize)
+        return True
+
+    def store(self, key, trainer, mode):
+        record = np.zeros((), dtype=entry_dtype(trainer.NUM_ACTIONS))
+        for field in STATE_FIELDS:
+            record[field] = np.asarray(getattr(trainer, field), dtype=np.float64)
+        rng_state, block_state, count, position = trainer.sampler.get_state()
+        record["rng"] = pack_rng(rng_state)
+        record["block_rng"] = pack_rng(block_state)
+        record["uniform_count"] = count
+        record["uniform_position"] = position
+
+        descriptor, temporary = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                file.write(MAGIC)
+                file.write(record.tobytes())
+                if records_history(trainer, mode):
+                    file.write(history_bytes(trainer.history))
+            os.replace(temporary, self.path(key))
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        self.evict()
+
+    # Removes the least recently used entries down to max_entries and
+    # max_bytes
+    def evict(self):
+        entries = self.entries()
+        count = len(entries)
+        total = sum(size for path, used, size in entries)
+        entries.sort(key=lambda entry: entry[1])
+        for path, used, size in entries:
+            if count <= self.max_entries and (self.max_bytes is None or total <= self.max_bytes):
+                break
+            try:
+                os.unlink(path)
+                self.evictions += 1
+            except FileNotFoundError:
+                # Another process got there first
+                pass
+            count -= 1
+            total -= size
+
+    # (path, last used, size) of every entry in the directory
+    def entries(self):
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.endswith(SUFFIX):
+                    try:
+                        info = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((entry.path, info.st_mtime_ns, info.st_size))
+        return entries
+
+    def stats(self):
+        entries = self.entries()
+        return CacheStats(self.hits, self.misses, self.evictions, len(entries),
+                          sum(size for path, used, size in entries))
+
+    def clear(self):
+        for path, used, size in self.entries():
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="cfr.result_cache",
+                                     description="Train the same run twice through the result cache.")
+    parser.add_argument("directory")
+    parser.add_argument("--game", choices=sorted(GAMES), default="rps")
+    parser.add_argument("--mode", choices=MODES, default="nash")
+    parser.add_argument("--iterations", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-entries", type=int, default=10000)
+    parser.add_argument("--max-bytes", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    from cfr.matrix_game_trainer import MatrixGameTrainer
+    actions, payoff = get_game(args.game)
+    cache = ResultCache(args.directory, args.max_entries, args.max_bytes)
+    for attempt in range(2):
+        trainer = MatrixGameTrainer(payoff, [1.0 / len(actions)] * len(actions), actions, args.seed)
+        start = time.perf_counter()
+        hit = cache.run(trainer, args.mode, args.iterations)
+        print("%s in %.6fs: %s" % ("Hit" if hit else "Miss", time.perf_counter() - start,
+                                    " ".join("%s: %.5f" % (a, p) for a, p in zip(actions, trainer.get_avg_strategy()))))
+    print(cache.stats())
+
+
+if __name__ == "__main__":
+    main()
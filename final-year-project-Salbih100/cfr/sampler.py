@@ -0,0 +1,141 @@
+import numpy as np
+
+'''
+Action sampling for the trainers. Each trainer owns an ActionSampler with its
+own seeded NumPy generator instead of using the global random module, so a
+run can be repeated exactly and parallel runs can be given separate streams
+(pass a SeedSequence child as the seed).
+
+There are three ways of drawing an action:
+- sample(strategy) for a strategy that changes every iteration. It takes the
+  next number from a block of pre-drawn uniforms and does the same
+  cumulative probability scan as the original get_action().
+- CumulativeTable for a fixed strategy such as the static opp_strategy in
+  train(). The cumulative probabilities are worked out once and whole blocks
+  of actions are drawn with a binary search.
+- AliasTable, also for a fixed strategy, draws each action in constant time
+  with Walker's alias method. table() picks it once there are more than
+  ALIAS_THRESHOLD actions.
+
+Both tables treat an all-zero strategy as uniform and refuse negative
+probabilities.
+'''
+
+ALIAS_THRESHOLD = 32
+
+
+# A fixed strategy as a float array. A strategy with no probability at all
+# (all zeros) is split evenly, as regret matching does with no regret.
+def table_probabilities(strategy):
+    probability = np.asarray(strategy, dtype=np.float64)
+    if (probability < 0).any():
+        raise ValueError("probabilities must be non-negative")
+    if probability.sum() <= 0:
+        return np.full(len(probability), 1.0 / len(probability))
+    return probability
+
+
+class CumulativeTable:
+    def __init__(self, strategy):
+        self.NUM_ACTIONS = len(strategy)
+        self.cumulative = np.cumsum(table_probabilities(strategy))
+
+    # Actions for an array of uniform numbers
+    def sample_block(self, rng, samples):
+        actions = np.searchsorted(self.cumulative, rng.random(samples), side="right")
+        return np.minimum(actions, self.NUM_ACTIONS - 1)
+
+
+class AliasTable:
+    def __init__(self, strategy):
+        self.NUM_ACTIONS = len(strategy)
+        probability = table_probabilities(strategy)
+        scaled = (probability * self.NUM_ACTIONS / probability.sum()).tolist()
+        self.probability = [1.0] * self.NUM_ACTIONS
+        self.alias = list(range(self.NUM_ACTIONS))
+
+        # Vose's version of the alias method. Every column is topped up to 1
+        # with probability taken from an action that has more than its share.
+        small = [a for a in range(self.NUM_ACTIONS) if scaled[a] < 1.0]
+        large = [a for a in range(self.NUM_ACTIONS) if scaled[a] >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self.probability[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1.0
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+        # Anything left over is 1 up to rounding error
+
+        self.probability = np.array(self.probability)
+        self.alias = np.array(self.alias)
+
+    # Actions for a block, one random column and one coin flip per sample
+    def sample_block(self, rng, samples):
+        column = rng.integers(0, self.NUM_ACTIONS, samples)
+        keep = rng.random(samples) < self.probability[column]
+        return np.where(keep, column, self.alias[column])
+
+
+class ActionSampler:
+    def __init__(self, num_actions, seed=None, block_size=4096):
+        if block_size < 1:
+            raise ValueError("block_size must be at least 1")
+        self.NUM_ACTIONS = num_actions
+        self.block_size = block_size
+        self.rng = np.random.default_rng(seed)
+
+        # Pre-drawn uniform numbers used by sample(), and the generator state
+        # from just before they were drawn so they can be drawn again
+        self.uniforms = []
+        self.position = 0
+        self.block_state = None
+
+    # Gets an action based on the probabilities of a strategy, using the next
+    # pre-drawn uniform number and drawing another block when they run out
+    def sample(self, strategy):
+        if self.position == len(self.uniforms):
+            self.block_state = self.rng.bit_generator.state
+            self.uniforms = self.rng.random(self.block_size).tolist()
+            self.position = 0
+        r = self.uniforms[self.position]
+        self.position += 1
+
+        a = 0
+        cumulative_probability = 0
+
+        while (a < self.NUM_ACTIONS - 1):
+            cumulative_probability += strategy[a]
+            if r < cumulative_probability:
+                break
+            a += 1
+        return a
+
+    # Precomputed table for a strategy that will be sampled many times
+    def table(self, strategy):
+        if len(strategy) > ALIAS_THRESHOLD:
+            return AliasTable(strategy)
+        return CumulativeTable(strategy)
+
+    # Draws a block of actions from a table, returned as a NumPy array
+    def sample_block(self, table, samples):
+        return table.sample_block(self.rng, samples)
+
+    # Everything needed to carry on drawing exactly the same numbers:
+    # (generator state, state before the current uniform block, how many
+    # uniforms were drawn in it, how many of them have been used)
+    def get_state(self):
+        return self.rng.bit_generator.state, self.block_state, len(self.uniforms), self.position
+
+    def set_state(self, state):
+        rng_state, block_state, count, position = state
+        self.block_state = block_state
+        self.uniforms = []
+        if count > 0:
+            self.rng.bit_generator.state = block_state
+            self.uniforms = self.rng.random(count).tolist()
+        self.position = position
+        self.rng.bit_generator.state = rng_state
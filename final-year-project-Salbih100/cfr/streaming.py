@@ -0,0 +1,71 @@
+from cfr import convergence
+
+'''
+Streaming access to a training run. stream_training() is a generator that
+trains `every` iterations at a time and yields a Snapshot after each chunk,
+so a consumer can log, plot or stop the run as it goes:
+
+    for snapshot in trainer.stream(10000000, every=100000):
+        print(snapshot.iteration, snapshot.exploitability)
+        if snapshot.exploitability < 0.001:
+            break
+
+Training only happens while the generator is being iterated. Breaking out
+leaves the trainer as it was after the last snapshot, and it can carry on
+training from there. Snapshot.iteration is the trainer's own count, so a
+second stream over the same trainer carries on from where the first one
+stopped.
+'''
+
+
+class Snapshot:
+    __slots__ = ("iteration", "strategy", "opp_strategy", "regret_sum", "exploitability")
+
+    def __init__(self, iteration, strategy, opp_strategy, regret_sum, exploitability):
+        self.iteration = iteration
+        # Average strategies as tuples, the opponent's is its fixed strategy in
+        # "train" mode
+        self.strategy = strategy
+        self.opp_strategy = opp_strategy
+        self.regret_sum = regret_sum
+        # None when the stream was made with with_exploitability=False
+        self.exploitability = exploitability
+
+    def __repr__(self):
+        return ("Snapshot(iteration=%d, strategy=%s, exploitability=%s)"
+                % (self.iteration, [round(p, 4) for p in self.strategy], self.exploitability))
+
+
+def take_snapshot(trainer, iteration, mode, with_exploitability=True):
+    strategy = convergence.normalise(trainer.strategy_sum)
+    if mode == "train":
+        opp_strategy = trainer.opp_strategy
+    else:
+        opp_strategy = convergence.normalise(trainer.opp_strategy_sum)
+    value = None
+    if with_exploitability:
+        value = convergence.trainer_exploitability(trainer, mode)
+    return Snapshot(iteration, tuple(strategy.tolist()), tuple(float(p) for p in opp_strategy),
+                    tuple(float(r) for r in trainer.regret_sum), value)
+
+
+# Trains `iterations` more iterations in chunks of `every`, yielding a
+# Snapshot after each chunk
+def stream_training(trainer, iterations, every=1000, mode="nash", with_exploitability=True):
+    if every < 1:
+        raise ValueError("every must be at least 1")
+    if mode == "train":
+        step = trainer.train
+    elif mode == "nash":
+        step = trainer.nash_equilibrium
+    elif mode == "expected":
+        step = trainer.expected_nash_equilibrium
+    else:
+        raise ValueError("unknown mode %r, expected 'train', 'nash' or 'expected'" % mode)
+
+    done = 0
+    while done < iterations:
+        chunk = min(every, iterations - done)
+        step(chunk)
+        done += chunk
+        yield take_snapshot(trainer, trainer.iteration, mode, with_exploitability)
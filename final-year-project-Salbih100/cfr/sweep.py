@@ -0,0 +1,90 @@
+import numpy as np
+
+from cfr.batched_trainer import DEFAULT_BLOCK_SIZE
+from cfr.games import RPS_PAYOFF
+
+'''
+Trains a best response against many opponent strategies at once. Each row of
+the stacked arrays is one independent run of train() against the opponent
+strategy in the same row of opp_strategies, so 10,000 opponent profiles are
+handled by one set of (10000, NUM_ACTIONS) arrays rather than 10,000 trainers.
+
+Samples are taken in blocks the same way as BatchedTrainer.train(), the
+strategy of every row is held fixed for block_size samples, only the number
+of times each opponent action was played in the block is drawn, and the
+regret is taken against the strategy's expected utility rather than a
+sampled action of its own. A row therefore follows the same update as a
+BatchedTrainer trained against that opponent.
+'''
+
+
+# Regret matching for every row of a stacked regret array
+def stacked_regret_matching(regret_sum):
+    strategy = np.maximum(regret_sum, 0.0)
+    normalising_sum = strategy.sum(axis=1, keepdims=True)
+    no_regret = normalising_sum[:, 0] <= 0
+    normalising_sum[no_regret] = 1.0
+    strategy /= normalising_sum
+    strategy[no_regret] = 1.0 / regret_sum.shape[1]
+    return strategy
+
+
+# Normalises every row of a stacked strategy sum
+def stacked_normalise(strategy_sum):
+    normalising_sum = strategy_sum.sum(axis=1, keepdims=True)
+    avg_strategy = np.full(strategy_sum.shape, 1.0 / strategy_sum.shape[1])
+    has_sum = normalising_sum[:, 0] > 0
+    avg_strategy[has_sum] = strategy_sum[has_sum] / normalising_sum[has_sum]
+    return avg_strategy
+
+
+class SweepTrainer:
+    def __init__(self, payoff, opp_strategies, block_size=DEFAULT_BLOCK_SIZE, seed=None):
+        self.payoff = np.asarray(payoff, dtype=np.float64)
+        self.NUM_ACTIONS = self.payoff.shape[0]
+        if self.payoff.shape != (self.NUM_ACTIONS, self.NUM_ACTIONS):
+            raise ValueError("payoff matrix must be square, got shape %s" % (self.payoff.shape,))
+        self.opp_strategies = np.array(opp_strategies, dtype=np.float64, ndmin=2)
+        if self.opp_strategies.ndim != 2 or self.opp_strategies.shape[1] != self.NUM_ACTIONS:
+            raise ValueError("opp_strategies must have shape (runs, %d), got %s"
+                             % (self.NUM_ACTIONS, self.opp_strategies.shape))
+        if block_size < 1:
+            raise ValueError("block_size must be at least 1")
+        self.NUM_RUNS = self.opp_strategies.shape[0]
+        self.block_size = block_size
+        self.rng = np.random.default_rng(seed)
+
+        # One row per opponent strategy
+        self.regret_sum = np.zeros((self.NUM_RUNS, self.NUM_ACTIONS))
+        self.strategy_sum = np.zeros((self.NUM_RUNS, self.NUM_ACTIONS))
+
+    # Same as BatchedTrainer.train() for every opponent strategy at once
+    def train(self, iterations):
+        done = 0
+        while done < iterations:
+            samples = min(self.block_size, iterations - done)
+            strategy = stacked_regret_matching(self.regret_sum)
+            self.strategy_sum += samples * strategy
+
+            # How often each opponent action came up in the block, every
+            # row drawn from its own opponent strategy
+            counts = self.rng.multinomial(samples, self.opp_strategies)
+
+            # Summed utility of every action against the sampled opponent
+            # actions, minus the strategy's expected utility against them,
+            # as in BatchedTrainer.block_regret()
+            utility = counts @ self.payoff.T
+            received = (strategy * utility).sum(axis=1)
+            self.regret_sum += utility - received[:, None] + 0.1 * samples
+            done += samples
+        return self.get_avg_strategy()
+
+    # Average strategy of every row, shape (runs, actions)
+    def get_avg_strategy(self):
+        return stacked_normalise(self.strategy_sum)
+
+
+# Trains a best response against every row of opp_strategies and returns the
+# matrix of average strategies
+def sweep(opp_strategies, iterations, payoff=RPS_PAYOFF, block_size=DEFAULT_BLOCK_SIZE, seed=None):
+    return SweepTrainer(payoff, opp_strategies, block_size, seed).train(iterations)
@@ -0,0 +1,280 @@
+from cfr import convergence, profiling, streaming
+from cfr.exact import check_convergence, exact_strategies
+
+'''
+Methods every matrix game trainer has in common. MatrixGameTrainer,
+CompactTrainer and BatchedTrainer (and so CyclicTrainer) all keep
+strategy_sum, opp_strategy_sum and payoff and provide nash_equilibrium(),
+everything below only needs those.
+
+normalise() returns a NumPy array. The pure Python trainers override it to
+return a list, the other trainer methods do not care which.
+
+SampledTrainer is the one copy of the per-sample train() and
+nash_equilibrium() loops and of the full-width expected_nash_equilibrium(),
+shared by MatrixGameTrainer and CompactTrainer.
+The storage is left to the subclass: get_strategy() and get_strategy_opp()
+do the regret matching (MatrixGameTrainer builds a new list,
+CompactTrainer writes into its array('d') buffers) and return the strategy
+to sample from. Everything else the loops need is looked up by name:
+NUM_ACTIONS, payoff, sampler, utility_rows, opp_utility_rows, regret_sum,
+opp_regret_sum, strategy_sum, opp_strategy_sum, opp_strategy, history
+(None for no history), update_rule, profiler and iteration.
+
+iteration is the number of iterations the trainer has completed. Every
+loop runs `iterations` more from there and adds them on, so a trainer
+trained in several calls (stream(), train_until(), a resumed checkpoint)
+counts on rather than from 0, and the t of the update rule weights carries
+on where the last call stopped.
+
+Profiling is a hook rather than a second copy of the loops. The loops
+fetch every function they call per phase through timed(), which hands back
+the function itself while profiling is off and a timing wrapper from the
+cfr.profiling.Profiler while it is on. The random numbers are drawn in the
+same order either way, so a profiled run gives the same results.
+
+Both base classes declare empty __slots__, so CompactTrainer keeps its
+fixed layout.
+'''
+
+
+class TrainerBase:
+    __slots__ = ()
+
+    # Normalises a strategy sum so the probabilities add to 1
+    def normalise(self, strategy_sum):
+        return convergence.normalise(strategy_sum)
+
+    # Get the average strategy using the sum of every strategy
+    def get_avg_strategy(self):
+        return self.normalise(self.strategy_sum)
+
+    # Trains both players and returns their average strategies. exact=True
+    # returns the exact equilibrium (see cfr.exact) without training, with a
+    # tolerance the trained strategies are checked against it and
+    # cfr.exact.NotConvergedError is raised if they fall short.
+    def rps_to_nash(self, iterations, exact=False, tolerance=None):
+        if exact:
+            return exact_strategies(self.payoff)
+        strats = self.nash_equilibrium(iterations)
+        strategies = self.normalise(strats[0]), self.normalise(strats[1])
+        if tolerance is not None:
+            check_convergence(self.payoff, strategies[0], strategies[1], tolerance)
+        return strategies
+
+    # Exploitability of the average strategies, see cfr.convergence
+    def exploitability(self, mode="nash"):
+        return convergence.trainer_exploitability(self, mode)
+
+    # Trains until the exploitability is at most epsilon or max_iterations
+    # have been run, checking every check_every iterations
+    def train_until(self, epsilon, max_iterations, mode="nash", check_every=1000):
+        return convergence.train_until(self, epsilon, max_iterations, mode, check_every)
+
+    # Generator that trains `every` iterations at a time and yields a
+    # Snapshot after each chunk, see cfr.streaming
+    def stream(self, iterations, every=1000, mode="nash", with_exploitability=True):
+        return streaming.stream_training(self, iterations, every, mode, with_exploitability)
+
+
+class SampledTrainer(TrainerBase):
+    __slots__ = ()
+
+    # Normalises a strategy sum so the probabilities add to 1, as a list
+    def normalise(self, strategy_sum):
+        return convergence.normalise(strategy_sum).tolist()
+
+    # function itself, or while profiling is on a wrapper that charges every
+    # call to `phase`
+    def timed(self, phase, function):
+        if self.profiler is None:
+            return function
+        return self.profiler.timed(phase, function)
+
+    # Keeps the average strategy in the history (for graph production)
+    def record_history(self, iteration):
+        self.history.record(iteration, self.get_avg_strategy())
+
+    # Training algorithm based on https://www.pranav.ai/CFRM-RPS
+    # Trains the player against the static opponent strategy for
+    # `iterations` more iterations. With a Checkpointer the state is saved
+    # between blocks of samples.
+    def train(self, iterations, checkpointer=None):
+        start = self.iteration
+        end = start + iterations
+        profiler = self.profiler
+        run = profiler.start_run() if profiler is not None else None
+        regret_sum = self.regret_sum
+        utility_rows = self.utility_rows
+        num_actions = self.NUM_ACTIONS
+        history = self.history
+        rule = self.update_rule
+        gamma = rule.gamma
+        sampler = self.sampler
+        get_strategy = self.timed("get_strategy", self.get_strategy)
+        sample = self.timed("get_action", sampler.sample)
+        sample_block = self.timed("sample_opponent", sampler.sample_block)
+        record_history = self.timed("get_avg_strategy", self.record_history)
+        apply_rule = self.timed("update_rule", rule.apply)
+        save = self.timed("checkpoint", checkpointer.save) if checkpointer else None
+        # The opponent strategy never changes, so its actions are drawn a
+        # whole block at a time from a precomputed table
+        opp_table = sampler.table(self.opp_strategy)
+        # Iteration of the next history sample, end never comes round. A
+        # sample that fell due before start (a recorder carried over from
+        # another run) is taken at the first iteration.
+        record_at = history.next_iteration if history is not None else end
+        iteration = start
+        next_checkpoint = checkpointer.next_checkpoint(start) if checkpointer else end
+        while iteration < end:
+            if iteration >= next_checkpoint:
+                save("train", iteration, end)
+                next_checkpoint = checkpointer.next_checkpoint(iteration)
+
+            samples = min(sampler.block_size, end - iteration)
+            other_actions = sample_block(opp_table, samples).tolist()
+
+            for other_action in other_actions:
+                if iteration >= record_at:
+                    record_history(iteration)
+                    record_at = history.next_iteration
+
+                strategy = get_strategy((iteration + 1) ** gamma if gamma else 1)[0]
+                my_action = sample(strategy)
+
+                # Add the regrets from this decision
+                utility = utility_rows[other_action]
+                received = utility[my_action] - 0.1
+                for i in range(num_actions):
+                    regret_sum[i] += utility[i] - received
+                iteration += 1
+                if rule.changes_regrets:
+                    apply_rule(regret_sum, iteration)
+
+        self.iteration = end
+        if checkpointer:
+            save("train", end, end)
+        if run is not None:
+            profiler.finish_run(run, iterations)
+
+    # Nash equilibrium based on https://www.pranav.ai/CFRM-RPS
+    # Both the player and the opponent learn against each other.
+    # iterations and checkpointer work the same way as in train()
+    def nash_equilibrium(self, iterations, checkpointer=None):
+        start = self.iteration
+        end = start + iterations
+        profiler = self.profiler
+        run = profiler.start_run() if profiler is not None else None
+        regret_sum = self.regret_sum
+        opp_regret_sum = self.opp_regret_sum
+        utility_rows = self.utility_rows
+        opp_utility_rows = self.opp_utility_rows
+        num_actions = self.NUM_ACTIONS
+        rule = self.update_rule
+        gamma = rule.gamma
+        get_strategy = self.timed("get_strategy", self.get_strategy)
+        get_strategy_opp = self.timed("get_strategy_opp", self.get_strategy_opp)
+        sample = self.timed("get_action", self.sampler.sample)
+        apply_rule = self.timed("update_rule", rule.apply)
+        save = self.timed("checkpoint", checkpointer.save) if checkpointer else None
+        next_checkpoint = checkpointer.next_checkpoint(start) if checkpointer else end
+        for x in range(start, end):
+            if x == next_checkpoint:
+                save("nash", x, end)
+                next_checkpoint = checkpointer.next_checkpoint(x)
+
+            weight = (x + 1) ** gamma if gamma else 1
+            strategy1 = get_strategy(weight)[0]
+            my_action = sample(strategy1)
+
+            strategy2 = get_strategy_opp(weight)[0]
+            opp_action = sample(strategy2)
+
+            # Add the regrets from this decision for both players
+            utility = utility_rows[opp_action]
+            received = utility[my_action]
+            opp_utility = opp_utility_rows[my_action]
+            opp_received = opp_utility[opp_action]
+            for i in range(num_actions):
+                regret_sum[i] += utility[i] - received
+                opp_regret_sum[i] += opp_utility[i] - opp_received
+            if rule.changes_regrets:
+                apply_rule(regret_sum, x + 1)
+                apply_rule(opp_regret_sum, x + 1)
+
+        self.iteration = end
+        if checkpointer:
+            save("nash", end, end)
+        if run is not None:
+            profiler.finish_run(run, iterations)
+        return self.strategy_sum, self.opp_strategy_sum
+
+    # Full-width version of nash_equilibrium(). Instead of sampling one
+    # action for each side, both players' regrets are updated with the
+    # expected utility of every action against the other's whole current
+    # strategy. The updates alternate: the player goes first and the
+    # opponent then answers the strategy the player's new regrets give,
+    # which converges far faster than updating both at once. No random
+    # numbers are used, so every run gives the same numbers. Costs
+    # O(NUM_ACTIONS^2) an iteration.
+    def expected_nash_equilibrium(self, iterations, checkpointer=None):
+        start = self.iteration
+        end = start + iterations
+        regret_sum = self.regret_sum
+        opp_regret_sum = self.opp_regret_sum
+        payoff = self.payoff
+        actions = range(self.NUM_ACTIONS)
+        rule = self.update_rule
+        gamma = rule.gamma
+        next_checkpoint = checkpointer.next_checkpoint(start) if checkpointer else end
+        for x in range(start, end):
+            if x == next_checkpoint:
+                checkpointer.save("expected", x, end)
+                next_checkpoint = checkpointer.next_checkpoint(x)
+
+            weight = (x + 1) ** gamma if gamma else 1
+            strategy1 = self.get_strategy(weight)[0]
+            strategy2 = self.get_strategy_opp(weight)[0]
+
+            # Expected utility of every player action against the opponent's strategy
+            utilities = [0] * self.NUM_ACTIONS
+            received = 0
+            for a in actions:
+                row = payoff[a]
+                for b in actions:
+                    utilities[a] += row[b] * strategy2[b]
+                received += strategy1[a] * utilities[a]
+            for i in actions:
+                regret_sum[i] += utilities[i] - received
+            if rule.changes_regrets:
+                rule.apply(regret_sum, x + 1)
+
+            # The opponent answers the player's updated strategy, weight 0 so
+            # it is not added to the average strategy a second time
+            strategy1 = self.get_strategy(0)[0]
+            opp_utilities = [0] * self.NUM_ACTIONS
+            for a in actions:
+                row = payoff[a]
+                for b in actions:
+                    opp_utilities[b] -= row[b] * strategy1[a]
+            opp_received = 0
+            for i in actions:
+                opp_received += strategy2[i] * opp_utilities[i]
+            for i in actions:
+                opp_regret_sum[i] += opp_utilities[i] - opp_received
+            if rule.changes_regrets:
+                rule.apply(opp_regret_sum, x + 1)
+
+        self.iteration = end
+        if checkpointer:
+            checkpointer.save("expected", end, end)
+        return self.strategy_sum, self.opp_strategy_sum
+
+    # Times every phase of train() and nash_equilibrium() from now on.
+    # Returns the Profiler, its report() has the numbers.
+    def enable_profiling(self, allocations=False):
+        self.profiler = profiling.Profiler(allocations)
+        return self.profiler
+
+    def disable_profiling(self):
+        self.profiler = None
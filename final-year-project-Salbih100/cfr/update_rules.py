@@ -0,0 +1,74 @@
+'''
+Regret and averaging update rules for MatrixGameTrainer.
+
+Every rule is a discounted CFR style rule (Brown & Sandholm, "Solving
+Imperfect-Information Games via Discounted Regret Minimization"). After each
+iteration t (counting from 1):
+- positive regrets are multiplied by t^alpha / (t^alpha + 1)
+- negative regrets are multiplied by t^beta / (t^beta + 1), or set to 0 when
+  floor is on (regret-matching+)
+- the strategy of iteration t is added to strategy_sum with weight t^gamma
+  (the trainers work this out inline, it is in their inner loop)
+
+alpha or beta of None leaves that side of the regrets alone, gamma=0 is the
+uniform averaging the trainers have always used.
+'''
+
+
+class UpdateRule:
+    def __init__(self, name, alpha=None, beta=None, gamma=0, floor=False):
+        self.name = name
+        self.alpha = alpha
+        self.beta = beta
+        self.gamma = gamma
+        self.floor = floor
+        # Whether apply() has anything to do, so plain regret matching skips it
+        self.changes_regrets = floor or alpha is not None or beta is not None
+
+    def __repr__(self):
+        return ("UpdateRule(%r, alpha=%r, beta=%r, gamma=%r, floor=%r)"
+                % (self.name, self.alpha, self.beta, self.gamma, self.floor))
+
+    # Discounts (or floors) the regrets in place after iteration t
+    def apply(self, regret_sum, t):
+        positive = 1.0
+        negative = 1.0
+        if self.alpha is not None:
+            positive = t ** self.alpha / (t ** self.alpha + 1)
+        if self.beta is not None:
+            negative = t ** self.beta / (t ** self.beta + 1)
+        if self.floor:
+            negative = 0.0
+        for i in range(len(regret_sum)):
+            if regret_sum[i] > 0:
+                regret_sum[i] *= positive
+            else:
+                regret_sum[i] *= negative
+
+
+# Discounted CFR with the given parameters, the defaults are the ones the
+# paper recommends
+def discounted(alpha=1.5, beta=0.0, gamma=2.0):
+    return UpdateRule("dcfr", alpha, beta, gamma)
+
+
+UPDATE_RULES = {
+    # Plain regret matching with uniform averaging
+    "vanilla": UpdateRule("vanilla"),
+    # Regret-matching+, regrets are floored at zero
+    "rm+": UpdateRule("rm+", floor=True),
+    # Linear CFR, regrets and strategies weighted by iteration
+    "linear": UpdateRule("linear", alpha=1, beta=1, gamma=1),
+    # CFR+, regret-matching+ with linearly weighted averaging
+    "cfr+": UpdateRule("cfr+", floor=True, gamma=1),
+    "dcfr": discounted(),
+}
+
+
+# Accepts an UpdateRule or the name of one of the built in rules
+def get_update_rule(rule):
+    if isinstance(rule, UpdateRule):
+        return rule
+    if rule not in UPDATE_RULES:
+        raise ValueError("unknown update rule %r, expected one of %s" % (rule, sorted(UPDATE_RULES)))
+    return UPDATE_RULES[rule]
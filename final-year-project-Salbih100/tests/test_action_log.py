@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from cfr.action_log import train_from_log, write_action_log
+from cfr.batched_trainer import BatchedTrainer
+from cfr.games import RPS_ACTIONS, RPS_PAYOFF
+from cfr.matrix_game_trainer import MatrixGameTrainer
+
+OPP_STRATEGY = [0.4, 0.3, 0.3]
+
+
+# The same block update written out record by record
+def naive_training(payoff, moves, block_size):
+    num_actions = len(payoff)
+    regret_sum = [0.0] * num_actions
+    strategy_sum = [0.0] * num_actions
+    for start in range(0, len(moves), block_size):
+        positive = [max(r, 0.0) for r in regret_sum]
+        total = sum(positive)
+        strategy = [p / total if total > 0 else 1.0 / num_actions for p in positive]
+        for move in moves[start:start + block_size]:
+            utilities = [payoff[a][move] for a in range(num_actions)]
+            received = sum(s * u for s, u in zip(strategy, utilities))
+            for a in range(num_actions):
+                strategy_sum[a] += strategy[a]
+                regret_sum[a] += utilities[a] - received + 0.1
+    return regret_sum, strategy_sum
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    path = tmp_path / "moves.bin"
+    write_action_log(path, OPP_STRATEGY, 10000, seed=0)
+    return path
+
+
+def test_log_has_one_byte_per_record(log_path):
+    moves = np.fromfile(log_path, dtype=np.uint8)
+    assert len(moves) == 10000
+    np.testing.assert_allclose(np.bincount(moves) / len(moves), OPP_STRATEGY, atol=0.02)
+
+
+# Block sizes that do and do not divide the chunks
+@pytest.mark.parametrize("block_size, chunk_size", [(64, 1 << 20), (100, 1000), (7, 50)])
+def test_matches_a_naive_loop(log_path, block_size, chunk_size):
+    moves = np.fromfile(log_path, dtype=np.uint8).tolist()
+    trainer = MatrixGameTrainer(RPS_PAYOFF, OPP_STRATEGY, RPS_ACTIONS)
+    result = train_from_log(trainer, log_path, block_size, chunk_size)
+    regret_sum, strategy_sum = naive_training(RPS_PAYOFF, moves, block_size)
+    np.testing.assert_allclose(trainer.regret_sum, regret_sum, rtol=1e-9, atol=1e-6)
+    np.testing.assert_allclose(trainer.strategy_sum, strategy_sum, rtol=1e-9, atol=1e-6)
+    assert result.counts.tolist() == np.bincount(moves, minlength=3).tolist()
+    assert result.records == 10000 and result.end == 10000
+    assert trainer.iteration == 10000
+
+
+def test_start_and_limit(log_path):
+    moves = np.fromfile(log_path, dtype=np.uint8)
+    trainer = BatchedTrainer(RPS_PAYOFF, OPP_STRATEGY)
+    first = train_from_log(trainer, log_path, 100, start=0, limit=3000)
+    second = train_from_log(trainer, log_path, 100, start=first.end)
+    assert (first.end, second.end) == (3000, 10000)
+    assert (first.counts + second.counts).tolist() == np.bincount(moves, minlength=3).tolist()
+    assert trainer.iteration == 10000
+    # Nothing left to read
+    assert train_from_log(trainer, log_path, start=10000).records == 0
+
+
+def test_learns_the_best_response(log_path):
+    trainer = BatchedTrainer(RPS_PAYOFF, OPP_STRATEGY)
+    train_from_log(trainer, log_path, 64)
+    # Paper beats an opponent that leans towards rock, it is played most
+    # once the early uniform blocks are averaged in
+    assert trainer.get_avg_strategy().argmax() == 1
+    assert trainer.get_avg_strategy()[1] > 0.6
+
+
+def test_refuses_other_update_rules(log_path):
+    trainer = MatrixGameTrainer(RPS_PAYOFF, OPP_STRATEGY, update_rule="cfr+")
+    with pytest.raises(ValueError):
+        train_from_log(trainer, log_path)
+
+
+def test_refuses_out_of_range_actions(tmp_path):
+    path = tmp_path / "moves.bin"
+    np.array([0, 1, 5], dtype=np.uint8).tofile(path)
+    with pytest.raises(ValueError):
+        train_from_log(MatrixGameTrainer(RPS_PAYOFF, OPP_STRATEGY), path)
+
+
+def test_refuses_bad_settings(log_path, tmp_path):
+    with pytest.raises(ValueError):
+        train_from_log(MatrixGameTrainer(RPS_PAYOFF, OPP_STRATEGY), log_path, block_size=0)
+    with pytest.raises(ValueError):
+        write_action_log(tmp_path / "big.bin", [1 / 300] * 300, 10)
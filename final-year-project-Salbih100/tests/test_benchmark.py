@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from cfr.benchmark import (FORMAT_VERSION, benchmark_epsilon, benchmark_opp_strategy, compare_reports,
+                           load_report, main, make_trainer, run_suite, summarise)
+from cfr.matrix_game_trainer import MatrixGameTrainer
+from rps_trainer import rpsTrainer
+
+
+def test_opp_strategy_is_a_distribution():
+    strategy = benchmark_opp_strategy(5)
+    assert sum(strategy) == pytest.approx(1)
+    assert strategy == sorted(strategy, reverse=True)
+
+
+def test_make_trainer():
+    assert isinstance(make_trainer("rps", "python"), rpsTrainer)
+    assert isinstance(make_trainer("rps-7", "python"), MatrixGameTrainer)
+    with pytest.raises(ValueError):
+        make_trainer("rps", "cuda")
+
+
+def test_summarise():
+    assert summarise([1.0, 2.0, 6.0]) == {"min": 1.0, "median": 2.0, "mean": 3.0,
+                                          "stdev": pytest.approx(2.6457513), "max": 6.0, "runs": 3}
+    assert summarise([4.0])["stdev"] == 0.0
+
+
+def test_run_suite():
+    report = run_suite(["rps"], ["python", "batched"], ["train"], [500], repeats=2,
+                       epsilon=0.1, max_iterations=5000)
+    assert report["format"] == FORMAT_VERSION
+    assert [(r["engine"], r["iterations"]) for r in report["throughput"]] == [("python", 500), ("batched", 500)]
+    for result in report["throughput"]:
+        assert result["seconds"]["runs"] == 2
+        assert result["peak_memory_bytes"] > 0
+    assert len(report["time_to_epsilon"]) == 2
+    json.dumps(report)
+
+
+# Runs that never get there are not timed
+def test_epsilon_counts_converged_runs_only():
+    result = benchmark_epsilon("rps", "python", 0.0, 2000, check_every=1000, repeats=2)
+    assert result["converged"] == 0
+    assert result["seconds"] is None and result["iterations"] is None
+
+
+def report_with(rate):
+    return {"format": FORMAT_VERSION, "throughput": [{
+        "game": "rps", "engine": "python", "method": "train", "iterations": 1000,
+        "iterations_per_second": {"median": rate}}]}
+
+
+def test_compare_reports_flags_regressions():
+    assert compare_reports(report_with(1000.0), report_with(950.0)) == []
+    assert compare_reports(report_with(1000.0), report_with(800.0)) == [("rps", "python", "train", 1000)]
+
+
+def test_compare_from_files(tmp_path):
+    before, after = tmp_path / "before.json", tmp_path / "after.json"
+    before.write_text(json.dumps(report_with(1000.0)))
+    after.write_text(json.dumps(report_with(500.0)))
+    assert main(["--compare", str(before), str(before)]) == 0
+    assert main(["--compare", str(before), str(after)]) == 1
+
+
+def test_load_report_checks_the_format(tmp_path):
+    path = tmp_path / "old.json"
+    path.write_text(json.dumps({"format": FORMAT_VERSION + 1}))
+    with pytest.raises(ValueError):
+        load_report(path)
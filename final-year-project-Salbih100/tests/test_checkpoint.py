@@ -0,0 +1,69 @@
+import pytest
+
+from cfr.batched_trainer import BatchedTrainer
+from cfr.checkpoint import Checkpointer, resume_training
+from cfr.compact_trainer import CompactGame, CompactTrainer
+from cfr.games import RPS_PAYOFF
+from cfr.matrix_game_trainer import MatrixGameTrainer
+
+OPP_STRATEGY = [0.4, 0.3, 0.3]
+ITERATIONS = 20000
+STEPS = {"train": "train", "nash": "nash_equilibrium", "expected": "expected_nash_equilibrium"}
+FACTORIES = {
+    "matrix": lambda: MatrixGameTrainer(RPS_PAYOFF, OPP_STRATEGY, seed=5, update_rule="linear"),
+    "compact": lambda: CompactTrainer(CompactGame(RPS_PAYOFF, seed=5), OPP_STRATEGY, update_rule="dcfr"),
+    "batched": lambda: BatchedTrainer(RPS_PAYOFF, OPP_STRATEGY, block_size=64, seed=5),
+}
+
+
+class Crash(Exception):
+    pass
+
+
+# Trains with a checkpointer that raises once the first checkpoint past
+# the middle of the run has been written, as if the process had died there
+def crash_half_way(path, trainer, mode):
+    checkpointer = Checkpointer(path, trainer, every=3000)
+    save = checkpointer.save
+
+    def save_then_crash(mode, iteration, iterations, sync=False):
+        save(mode, iteration, iterations, sync)
+        if ITERATIONS // 2 <= iteration < ITERATIONS:
+            raise Crash()
+
+    checkpointer.save = save_then_crash
+    with pytest.raises(Crash):
+        getattr(trainer, STEPS[mode])(ITERATIONS, checkpointer=checkpointer)
+    checkpointer.close()
+
+
+def as_list(values):
+    return [float(v) for v in values]
+
+
+@pytest.mark.parametrize("engine", sorted(FACTORIES))
+@pytest.mark.parametrize("mode", sorted(STEPS))
+def test_resume_is_bit_exact(tmp_path, engine, mode):
+    factory = FACTORIES[engine]
+    uninterrupted = factory()
+    getattr(uninterrupted, STEPS[mode])(ITERATIONS)
+
+    path = str(tmp_path / "run.ckpt")
+    crash_half_way(path, factory(), mode)
+    resumed = factory()
+    state = resume_training(path, resumed, every=3000)
+
+    assert state.mode == mode
+    assert ITERATIONS // 2 <= state.iteration < ITERATIONS
+    assert resumed.iteration == ITERATIONS
+    for field in ("regret_sum", "strategy_sum", "opp_regret_sum", "opp_strategy_sum"):
+        assert as_list(getattr(resumed, field)) == as_list(getattr(uninterrupted, field))
+    if resumed.history is not None:
+        assert resumed.history.iterations().tolist() == uninterrupted.history.iterations().tolist()
+        assert resumed.history.strategies().tolist() == uninterrupted.history.strategies().tolist()
+
+
+def test_empty_checkpoint_resumes_nothing(tmp_path):
+    trainer = FACTORIES["matrix"]()
+    assert resume_training(str(tmp_path / "run.ckpt"), trainer) is None
+    assert trainer.iteration == 0
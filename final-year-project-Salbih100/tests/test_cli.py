@@ -0,0 +1,67 @@
+import argparse
+
+import pytest
+
+from cfr.cli import main, parse_strategy
+from cfr.games import RPS_ACTIONS, format_strategy
+from cfr.matrix_game_trainer import MatrixGameTrainer
+
+
+def test_parse_strategy():
+    assert parse_strategy("0.5,0.25,0.25") == [0.5, 0.25, 0.25]
+
+
+@pytest.mark.parametrize("text", ["a,b,c", "0.5,0.6", "1.5,-0.5"])
+def test_parse_strategy_refuses_bad_probabilities(text):
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_strategy(text)
+
+
+def test_format_strategy():
+    assert format_strategy(RPS_ACTIONS, [0.5, 0.25, 0.25]) == "Rock: 0.5 Paper: 0.25 Scissors: 0.25"
+    assert format_strategy(RPS_ACTIONS, [1 / 3] * 3, 2) == "Rock: 0.33 Paper: 0.33 Scissors: 0.33"
+
+
+# The trainer method and the CLI share the one formatter
+def test_trainer_formats_like_the_cli():
+    trainer = MatrixGameTrainer([[0, -1, 1], [1, 0, -1], [-1, 1, 0]], [0.4, 0.3, 0.3], RPS_ACTIONS, seed=0)
+    trainer.train(1000)
+    strategy = trainer.get_avg_strategy()
+    assert trainer.format_strategy(strategy, 7) == format_strategy(RPS_ACTIONS, strategy)
+    assert trainer.print_avg_strategy() == "Trainer Strategy \n" + format_strategy(RPS_ACTIONS, strategy) + "\n"
+
+
+@pytest.mark.parametrize("engine", ["python", "batched"])
+def test_main_prints_the_strategies(engine, capsys):
+    assert main(["--mode", "train", "--iterations", "2000", "--seed", "1", "--engine", engine,
+                 "--opp-strategy", "0.4,0.3,0.3"]) == 0
+    out = capsys.readouterr().out
+    assert "Number of Iterations: 2000" in out
+    assert "Player Strategy: Rock:" in out
+    assert "Opponent Strategy: Rock: 0.4 Paper: 0.3 Scissors: 0.3" in out
+
+
+def test_main_stops_at_epsilon(capsys):
+    main(["--mode", "expected", "--iterations", "100000", "--epsilon", "0.05", "--check-every", "100"])
+    assert "Reached epsilon 0.05" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("argv", [
+    ["--mode", "nash", "--graph"],
+    ["--mode", "expected", "--graph", "out.png"],
+    ["--engine", "batched", "--update-rule", "cfr+"],
+    ["--opp-strategy", "0.5,0.5"],
+    ["--iterations", "0"],
+])
+def test_main_refuses_bad_combinations(argv, capsys):
+    with pytest.raises(SystemExit) as error:
+        main(argv)
+    assert error.value.code == 2
+    assert "error:" in capsys.readouterr().err
+
+
+def test_graph_is_saved_in_train_mode(tmp_path):
+    pytest.importorskip("matplotlib")
+    path = tmp_path / "history.png"
+    main(["--mode", "train", "--iterations", "1000", "--seed", "0", "--graph", str(path)])
+    assert path.stat().st_size > 0
@@ -0,0 +1,43 @@
+import pytest
+
+from cfr.compact_trainer import CompactGame, CompactTrainer
+from cfr.games import RPS_PAYOFF, RPSLSP_PAYOFF
+from cfr.matrix_game_trainer import MatrixGameTrainer
+
+STEPS = {"train": "train", "nash": "nash_equilibrium", "expected": "expected_nash_equilibrium"}
+
+
+def as_list(values):
+    return [float(v) for v in values]
+
+
+@pytest.mark.parametrize("payoff", [RPS_PAYOFF, RPSLSP_PAYOFF])
+@pytest.mark.parametrize("mode", sorted(STEPS))
+@pytest.mark.parametrize("update_rule", ["vanilla", "cfr+", "dcfr"])
+def test_compact_matches_matrix_trainer(payoff, mode, update_rule):
+    opp_strategy = [1.0 / len(payoff)] * len(payoff)
+    matrix = MatrixGameTrainer(payoff, opp_strategy, seed=3, update_rule=update_rule)
+    compact = CompactTrainer(CompactGame(payoff, seed=3), opp_strategy, update_rule=update_rule)
+    # Two calls, so the second carries on from the iteration count
+    for iterations in (7000, 5000):
+        getattr(matrix, STEPS[mode])(iterations)
+        getattr(compact, STEPS[mode])(iterations)
+
+    assert compact.iteration == matrix.iteration == 12000
+    for field in ("regret_sum", "strategy_sum", "opp_regret_sum", "opp_strategy_sum"):
+        assert as_list(getattr(compact, field)) == as_list(getattr(matrix, field))
+
+
+def test_profiling_does_not_change_results():
+    plain = MatrixGameTrainer(RPS_PAYOFF, [0.4, 0.3, 0.3], seed=1, update_rule="linear")
+    profiled = MatrixGameTrainer(RPS_PAYOFF, [0.4, 0.3, 0.3], seed=1, update_rule="linear")
+    profiler = profiled.enable_profiling(allocations=True)
+    for trainer in (plain, profiled):
+        trainer.train(5000)
+        trainer.nash_equilibrium(5000)
+
+    assert profiled.regret_sum == plain.regret_sum
+    assert profiled.strategy_sum == plain.strategy_sum
+    assert profiled.opp_strategy_sum == plain.opp_strategy_sum
+    assert profiler.iterations == 10000
+    assert profiler.report()["get_strategy"]["calls"] == 10000
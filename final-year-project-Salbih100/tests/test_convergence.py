@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from cfr.convergence import best_response_gap, exploitability, normalise
+from cfr.games import CyclicPayoff, RPS_ACTIONS, RPS_PAYOFF, RPSLSP_PAYOFF
+from cfr.matrix_game_trainer import MatrixGameTrainer
+
+UNIFORM = [1 / 3] * 3
+
+
+def test_normalise():
+    np.testing.assert_allclose(normalise([2, 1, 1]), [0.5, 0.25, 0.25])
+    # Nothing summed yet is the uniform strategy
+    np.testing.assert_allclose(normalise([0, 0, 0, 0]), [0.25] * 4)
+
+
+def test_equilibrium_has_no_exploitability():
+    assert exploitability(RPS_PAYOFF, UNIFORM, UNIFORM) == pytest.approx(0)
+    assert exploitability(RPSLSP_PAYOFF, [0.2] * 5, [0.2] * 5) == pytest.approx(0)
+
+
+def test_exploitability_of_pure_strategies():
+    # Paper beats the player's rock and rock ties the opponent's rock
+    assert exploitability(RPS_PAYOFF, [1, 0, 0], [1, 0, 0]) == pytest.approx(2)
+    assert exploitability(RPS_PAYOFF, [1, 0, 0], UNIFORM) == pytest.approx(1)
+
+
+def test_best_response_gap():
+    # Against 0.4 rock, paper wins 0.1 and uniform play wins nothing
+    assert best_response_gap(RPS_PAYOFF, UNIFORM, [0.4, 0.3, 0.3]) == pytest.approx(0.1)
+    assert best_response_gap(RPS_PAYOFF, [0, 1, 0], [0.4, 0.3, 0.3]) == pytest.approx(0)
+
+
+# The O(N) path for the generated games matches the dense matrix
+def test_cyclic_payoff_matches_dense():
+    payoff = CyclicPayoff(7)
+    rng = np.random.default_rng(0)
+    strategy, opp_strategy = rng.dirichlet(np.ones(7)), rng.dirichlet(np.ones(7))
+    assert exploitability(payoff, strategy, opp_strategy) == pytest.approx(
+        exploitability(list(payoff), strategy, opp_strategy))
+    assert best_response_gap(payoff, strategy, opp_strategy) == pytest.approx(
+        best_response_gap(list(payoff), strategy, opp_strategy))
+
+
+def test_train_until_stops_at_epsilon():
+    trainer = MatrixGameTrainer(RPS_PAYOFF, UNIFORM, RPS_ACTIONS, seed=0)
+    result = trainer.train_until(0.05, 1000000, "expected", check_every=100)
+    assert result.converged
+    assert result.exploitability <= 0.05
+    assert result.iterations == trainer.iteration < 1000000
+    assert result.iterations % 100 == 0
+    assert result.trace[-1] == (result.iterations, result.exploitability)
+    assert all(value > 0.05 for _, value in result.trace[:-1])
+
+
+def test_train_until_gives_up_at_max_iterations():
+    trainer = MatrixGameTrainer(RPS_PAYOFF, UNIFORM, RPS_ACTIONS, seed=0)
+    result = trainer.train_until(0, 500, "nash", check_every=200)
+    assert not result.converged
+    assert result.iterations == trainer.iteration == 500
+    assert [iteration for iteration, _ in result.trace] == [200, 400, 500]
+
+
+def test_train_until_carries_on_from_the_trainer():
+    trainer = MatrixGameTrainer(RPS_PAYOFF, [0.4, 0.3, 0.3], RPS_ACTIONS, seed=0)
+    trainer.train(1000)
+    result = trainer.train_until(0, 300, "train", check_every=100)
+    assert result.iterations == 1300
+    assert result.exploitability == pytest.approx(trainer.exploitability("train"))
+
+
+def test_unknown_mode():
+    trainer = MatrixGameTrainer(RPS_PAYOFF, UNIFORM, RPS_ACTIONS)
+    with pytest.raises(ValueError):
+        trainer.exploitability("best")
@@ -0,0 +1,137 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from cfr import distributed
+from cfr.distributed import (DELTA, GRANT, HEADER, HELLO, MAGIC, REJECT, STATE, WELCOME, Coordinator, pack_message,
+                             payload_size, run_local, unpack_arrays, unpack_header)
+from cfr.exact import payoff_key
+from cfr.games import RPS_PAYOFF
+
+SYNC_EVERY = 100
+
+
+def test_message_round_trip():
+    arrays = np.arange(12.0).reshape(4, 3)
+    message = pack_message(DELTA, 3, 1234, *arrays)
+    assert len(message) == HEADER.size + payload_size(DELTA, 3)
+    assert unpack_header(message[:HEADER.size]) == (DELTA, 3, 1234)
+    np.testing.assert_array_equal(unpack_arrays(message[HEADER.size:], 3, 4), arrays)
+
+
+def test_bad_magic():
+    with pytest.raises(ValueError):
+        unpack_header(b"HTTP" + bytes(HEADER.size - 4))
+
+
+# A worker driven by hand over a real connection to the coordinator
+class FakeWorker:
+    async def connect(self, port, payoff=RPS_PAYOFF):
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", port)
+        self.writer.write(HEADER.pack(MAGIC, HELLO, len(payoff), 0) + bytes.fromhex(payoff_key(payoff)))
+        return await self.receive()
+
+    # (kind, grant) of the coordinator's next message
+    async def receive(self):
+        kind, num_actions, value = unpack_header(await self.reader.readexactly(HEADER.size))
+        payload = await self.reader.readexactly(payload_size(kind, num_actions))
+        if kind in (WELCOME, STATE):
+            self.regrets = unpack_arrays(payload[GRANT.size:], num_actions, 2)
+            return kind, GRANT.unpack_from(payload)[0]
+        return kind, None
+
+    async def report(self, done, regret_delta):
+        self.writer.write(pack_message(DELTA, 3, done, regret_delta, regret_delta, [1.0, 0, 0], [0, 1.0, 0]))
+        return await self.receive()
+
+    def close(self):
+        self.writer.close()
+
+
+async def with_coordinator(coordinator, play):
+    started = threading.Event()
+    serving = asyncio.ensure_future(coordinator.serve("127.0.0.1", 0, started))
+    await asyncio.get_running_loop().run_in_executor(None, started.wait)
+    await play(coordinator.port)
+    await asyncio.wait_for(serving, 5)
+
+
+def test_deltas_are_averaged_over_num_workers():
+    coordinator = Coordinator(RPS_PAYOFF, SYNC_EVERY, SYNC_EVERY, num_workers=2)
+
+    async def play(port):
+        worker = FakeWorker()
+        assert await worker.connect(port) == (WELCOME, SYNC_EVERY)
+        assert await worker.report(SYNC_EVERY, [2.0, -4.0, 0.0]) == (STATE, 0)
+        np.testing.assert_array_equal(worker.regrets[0], [1.0, -2.0, 0.0])
+        worker.close()
+
+    asyncio.run(with_coordinator(coordinator, play))
+    assert coordinator.completed == coordinator.granted == SYNC_EVERY
+    np.testing.assert_array_equal(coordinator.strategy_sum, [1.0, 0, 0])
+
+
+# The first worker drops with its grant after the second has nothing left
+# to be given. The second is kept waiting and gets the returned grant.
+@pytest.mark.parametrize("drop", ["close", "garbage"])
+def test_lost_grant_goes_to_a_waiting_worker(drop):
+    coordinator = Coordinator(RPS_PAYOFF, 2 * SYNC_EVERY, SYNC_EVERY)
+
+    async def play(port):
+        first, second = FakeWorker(), FakeWorker()
+        assert await first.connect(port) == (WELCOME, SYNC_EVERY)
+        assert await second.connect(port) == (WELCOME, SYNC_EVERY)
+        reply = asyncio.ensure_future(second.report(SYNC_EVERY, [0.0, 0.0, 0.0]))
+        await asyncio.sleep(0.1)
+        assert not reply.done()
+        if drop == "close":
+            first.close()
+        else:
+            first.writer.write(b"HTTP/1.1 200 OK\r\n\r\n")
+        assert await reply == (STATE, SYNC_EVERY)
+        assert await second.report(SYNC_EVERY, [0.0, 0.0, 0.0]) == (STATE, 0)
+        second.close()
+
+    asyncio.run(with_coordinator(coordinator, play))
+    assert coordinator.completed == coordinator.granted == 2 * SYNC_EVERY
+    assert coordinator.workers == 2
+
+
+def test_other_games_are_turned_away():
+    coordinator = Coordinator(RPS_PAYOFF, SYNC_EVERY, SYNC_EVERY)
+
+    async def play(port):
+        stranger = FakeWorker()
+        assert await stranger.connect(port, [[0, 1, -1], [-1, 0, 1], [1, -1, 0]]) == (REJECT, None)
+        stranger.close()
+        worker = FakeWorker()
+        assert await worker.connect(port) == (WELCOME, SYNC_EVERY)
+        await worker.report(SYNC_EVERY, [0.0, 0.0, 0.0])
+        worker.close()
+
+    asyncio.run(with_coordinator(coordinator, play))
+    assert coordinator.workers == 1
+
+
+def test_run_local():
+    result = run_local("rps", 20000, workers=2, sync_every=2000, seed=0, timeout=60)
+    assert result.iterations == 20000
+    assert result.exploitability < 0.1
+
+
+def test_run_local_coordinator_that_cannot_start(monkeypatch):
+    async def refuse(*args, **kwargs):
+        raise OSError("address in use")
+
+    monkeypatch.setattr(distributed.asyncio, "start_server", refuse)
+    with pytest.raises(RuntimeError, match="did not start"):
+        run_local("rps", 1000, workers=1, timeout=10)
+
+
+def test_bad_settings():
+    with pytest.raises(ValueError):
+        Coordinator(RPS_PAYOFF, 100, sync_every=0)
+    with pytest.raises(ValueError):
+        Coordinator(RPS_PAYOFF, 100, num_workers=0)
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from cfr.convergence import exploitability
+from cfr.exact import simplex, solve_game
+from cfr.games import GAMES, RPS_PAYOFF
+
+
+def test_rps_is_uniform_with_value_zero():
+    equilibrium = solve_game(RPS_PAYOFF)
+    np.testing.assert_allclose(equilibrium.strategy, [1 / 3] * 3, atol=1e-12)
+    np.testing.assert_allclose(equilibrium.opp_strategy, [1 / 3] * 3, atol=1e-12)
+    assert equilibrium.value == pytest.approx(0.0, abs=1e-12)
+
+
+def test_two_by_two_game():
+    # Player mixes p on the first action with 2p - (1 - p) = -p + (1 - p),
+    # so p = 0.4, and by the same working the opponent also plays 0.4
+    equilibrium = solve_game([[2, -1], [-1, 1]])
+    np.testing.assert_allclose(equilibrium.strategy, [0.4, 0.6], atol=1e-12)
+    np.testing.assert_allclose(equilibrium.opp_strategy, [0.4, 0.6], atol=1e-12)
+    assert equilibrium.value == pytest.approx(0.2, abs=1e-12)
+
+
+def test_dominated_action_gets_no_weight():
+    equilibrium = solve_game([[1, -1], [-1, 1], [-2, -2]])
+    np.testing.assert_allclose(equilibrium.strategy, [0.5, 0.5, 0.0], atol=1e-12)
+    assert equilibrium.value == pytest.approx(0.0, abs=1e-12)
+
+
+def test_pure_saddle_point():
+    equilibrium = solve_game([[3, 1], [4, 2]])
+    assert equilibrium.strategy == (0.0, 1.0)
+    assert equilibrium.opp_strategy == (0.0, 1.0)
+    assert equilibrium.value == pytest.approx(2.0)
+
+
+@pytest.mark.parametrize("name", sorted(GAMES))
+def test_equilibrium_is_unexploitable(name):
+    payoff = [list(row) for row in GAMES[name][1]]
+    equilibrium = solve_game(payoff)
+    assert exploitability(payoff, np.array(equilibrium.strategy), np.array(equilibrium.opp_strategy)) \
+        == pytest.approx(0.0, abs=1e-9)
+
+
+def test_random_games_match_their_value():
+    rng = np.random.default_rng(0)
+    for rows, columns in [(2, 5), (4, 4), (6, 3)]:
+        payoff = rng.normal(size=(rows, columns))
+        equilibrium = solve_game(payoff)
+        strategy = np.array(equilibrium.strategy)
+        opp_strategy = np.array(equilibrium.opp_strategy)
+        # Neither side can do better than the value against the other
+        assert (strategy @ payoff).min() == pytest.approx(equilibrium.value, abs=1e-9)
+        assert (payoff @ opp_strategy).max() == pytest.approx(equilibrium.value, abs=1e-9)
+
+
+def test_simplex_needs_a_feasible_origin():
+    with pytest.raises(ValueError):
+        simplex([1, 1], [[1, 0], [0, 1]], [1, -1])
@@ -0,0 +1,70 @@
+import pytest
+
+from cfr.extensive_form import CFRTrainer, kuhn_poker, leduc_holdem
+
+
+def test_kuhn_tree():
+    game = kuhn_poker()
+    assert len(game.deals) == 6
+    # 4 decision nodes (root, p, b, pb) and 5 leaves
+    assert len(game.nodes) == 9
+    assert sorted(node.history for node in game.nodes if not node.terminal) == ["", "b", "p", "pb"]
+
+
+def test_showdowns():
+    game = leduc_holdem()
+    for deal in game.deals:
+        mine, theirs, board = deal.cards
+        if mine == theirs:
+            assert deal.showdown == 0
+        elif mine == board:
+            assert deal.showdown == 1
+        elif theirs == board:
+            assert deal.showdown == -1
+        else:
+            assert deal.showdown == (1 if mine > theirs else -1)
+
+
+# Kuhn poker is worth -1/18 to the first player at equilibrium
+def test_kuhn_converges_to_the_game_value():
+    trainer = CFRTrainer("kuhn", seed=0)
+    trainer.train(30000)
+    assert len(trainer.info_sets()) == 12
+    assert trainer.game_value() == pytest.approx(-1 / 18, abs=0.002)
+    assert trainer.exploitability() < 0.02
+    strategy = trainer.get_avg_strategy()
+    # Never call a bet holding the jack, always call holding the king
+    assert strategy["J b"][1] < 0.01
+    assert strategy["K b"][1] > 0.99
+
+
+def test_leduc_information_sets():
+    game = leduc_holdem()
+    decisions = [node for node in game.nodes if not node.terminal]
+    first_round = sum(1 for node in decisions if node.round == 0)
+    second_round = sum(1 for node in decisions if node.round == 1)
+    # 3 private cards before the board, 3 x 3 with it
+    assert 3 * first_round + 9 * second_round == 288
+    trainer = CFRTrainer(game, seed=0)
+    trainer.train(1000)
+    assert len(trainer.info_sets()) == 288
+
+
+def test_untrained_strategies_are_uniform():
+    trainer = CFRTrainer("kuhn")
+    assert trainer.get_avg_strategy() == {}
+    assert trainer.game_value() == pytest.approx(0.125)
+    assert trainer.exploitability() > 0.5
+
+
+def test_training_is_repeatable():
+    first, second = CFRTrainer("kuhn", seed=3), CFRTrainer("kuhn", seed=3)
+    assert first.train(500) == second.train(500)
+    assert first.get_avg_strategy() == second.get_avg_strategy()
+    assert first.nodes_touched == second.nodes_touched > 0
+    assert first.iterations == 500
+
+
+def test_unknown_game():
+    with pytest.raises(ValueError):
+        CFRTrainer("holdem")
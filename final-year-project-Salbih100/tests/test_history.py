@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from cfr.batched_trainer import BatchedTrainer
+from cfr.games import RPS_PAYOFF
+from cfr.history import HistoryRecorder
+from cfr.matrix_game_trainer import MatrixGameTrainer
+
+
+def fill(recorder, samples):
+    for x in range(samples):
+        recorder.record(recorder.next_iteration, [x, 0.0, 0.0])
+
+
+def test_decimate_keeps_the_whole_run():
+    recorder = HistoryRecorder(3, interval=10, capacity=8, retention="decimate")
+    fill(recorder, 20)
+    iterations = recorder.iterations()
+    assert len(recorder) < recorder.capacity
+    assert iterations[0] == 0
+    assert np.all(np.diff(iterations) > 0)
+    # Every decimation doubles the interval
+    assert recorder.interval > 10
+    assert recorder.next_iteration == iterations[-1] + recorder.interval
+
+
+def test_ring_keeps_the_latest_samples_in_order():
+    recorder = HistoryRecorder(3, interval=1, capacity=5, retention="ring")
+    fill(recorder, 12)
+    assert len(recorder) == 5
+    assert recorder.iterations().tolist() == [7, 8, 9, 10, 11]
+    assert recorder.action_history(0).tolist() == [7, 8, 9, 10, 11]
+
+
+def test_log_retention_spaces_samples_by_ratio():
+    recorder = HistoryRecorder(3, capacity=1000, retention="log", per_decade=10)
+    fill(recorder, 60)
+    iterations = recorder.iterations()
+    # Consecutive samples after the first few are about 10^(1/10) apart
+    ratios = iterations[30:] / iterations[29:-1]
+    np.testing.assert_allclose(ratios, 10 ** 0.1, rtol=0.05)
+
+
+def test_max_bytes_sets_the_capacity():
+    recorder = HistoryRecorder(3, max_bytes=3200)
+    assert recorder.capacity == 100
+    assert recorder.nbytes() == 3200
+
+
+def test_bad_settings_are_refused():
+    with pytest.raises(ValueError):
+        HistoryRecorder(3, retention="everything")
+    with pytest.raises(ValueError):
+        HistoryRecorder(3, interval=0)
+    with pytest.raises(ValueError):
+        HistoryRecorder(3, capacity=1)
+
+
+# A recorder that is behind the trainer (here attached after 1000
+# iterations) records at the first iteration it sees, in both engines
+@pytest.mark.parametrize("factory", [
+    lambda history: MatrixGameTrainer(RPS_PAYOFF, [0.4, 0.3, 0.3], seed=0, history=history),
+    lambda history: BatchedTrainer(RPS_PAYOFF, [0.4, 0.3, 0.3], seed=0, history=history),
+])
+def test_recorder_behind_the_trainer_catches_up(factory):
+    trainer = factory(None)
+    trainer.train(1000)
+    trainer.history = HistoryRecorder(3, interval=100)
+    trainer.train(1000)
+    iterations = trainer.history.iterations()
+    assert iterations[0] == 1000
+    # BatchedTrainer checks once per block, so it can take fewer samples
+    assert len(iterations) >= 5
+    assert iterations[-1] < 2000
+
+
+def test_split_training_records_like_one_run():
+    whole = MatrixGameTrainer(RPS_PAYOFF, [0.4, 0.3, 0.3], seed=0)
+    whole.train(5000)
+    split = MatrixGameTrainer(RPS_PAYOFF, [0.4, 0.3, 0.3], seed=0)
+    split.train(1234)
+    split.train(5000 - 1234)
+    # The opponent's blocks are drawn at other points of the random stream,
+    # so only when the samples were taken has to match
+    assert split.history.iterations().tolist() == whole.history.iterations().tolist()
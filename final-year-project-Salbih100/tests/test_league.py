@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from cfr.batched_trainer import DEFAULT_BLOCK_SIZE
+from cfr.games import RPSLSP_PAYOFF, RPS_PAYOFF
+from cfr.league import LeagueTrainer, make_league, scaling_report
+from cfr.update_rules import UPDATE_RULES
+
+
+def test_default_block_size():
+    assert make_league(RPS_PAYOFF, 4).block_size == DEFAULT_BLOCK_SIZE
+    assert LeagueTrainer(RPS_PAYOFF, ["vanilla", "rm+"]).block_size == DEFAULT_BLOCK_SIZE
+
+
+def test_rules_are_taken_in_turn():
+    league = make_league(RPS_PAYOFF, 7, ["vanilla", "cfr+"])
+    assert [rule.name for rule in league.rules] == ["vanilla", "cfr+"] * 3 + ["vanilla"]
+    assert {name: result["agents"] for name, result in league.rule_summary().items()} == {"vanilla": 4, "cfr+": 3}
+
+
+# Every agent faces the mean of the others' strategies, never its own
+def test_opponent_mix_leaves_the_agent_out():
+    league = make_league(RPS_PAYOFF, 3)
+    strategy = np.array([[1.0, 0, 0], [0, 1.0, 0], [0, 0, 1.0]])
+    np.testing.assert_allclose(league.opponent_mix(strategy), [[0, 0.5, 0.5], [0.5, 0, 0.5], [0.5, 0.5, 0]])
+
+
+# apply_rules() does for every row what UpdateRule.apply() does for one list
+@pytest.mark.parametrize("t", [1, 3, 10])
+def test_apply_rules_matches_update_rule(t):
+    rules = list(UPDATE_RULES)
+    league = LeagueTrainer(RPS_PAYOFF, rules, seed=0)
+    regrets = np.random.default_rng(t).normal(size=(len(rules), 3))
+    league.regret_sum = regrets.copy()
+    league.apply_rules(t)
+    rows = regrets.tolist()
+    for row, name in zip(rows, rules):
+        UPDATE_RULES[name].apply(row, t)
+    np.testing.assert_allclose(league.regret_sum, rows)
+
+
+@pytest.mark.parametrize("mode", ["expected", "sampled"])
+def test_league_approaches_equilibrium(mode):
+    league = make_league(RPSLSP_PAYOFF, 10, seed=0)
+    league.train(2000, mode)
+    assert league.rounds == 2000
+    assert league.exploitability().max() < 0.1
+    np.testing.assert_allclose(league.get_avg_strategy().sum(axis=1), 1)
+
+
+def test_same_seed_same_league():
+    first, second = make_league(RPS_PAYOFF, 6, seed=4), make_league(RPS_PAYOFF, 6, seed=4)
+    first.train(50, "sampled")
+    second.train(50, "sampled")
+    np.testing.assert_array_equal(first.strategy_sum, second.strategy_sum)
+
+
+def test_pairwise_payoffs_and_scores():
+    league = make_league(RPS_PAYOFF, 5, seed=1)
+    league.train(20, evaluate_every=10)
+    pairwise = league.pairwise_payoffs()
+    # A symmetric zero-sum game, what i wins j loses
+    np.testing.assert_allclose(pairwise, -pairwise.T, atol=1e-12)
+    assert league.league_scores(pairwise).sum() == pytest.approx(0, abs=1e-12)
+    assert [t for t, scores in league.evaluations] == [10, 20]
+
+
+def test_scaling_report():
+    report = scaling_report(RPS_PAYOFF, (2, 5), rounds=5)
+    assert [agents for agents, *rates in report] == [2, 5]
+
+
+def test_bad_settings():
+    with pytest.raises(ValueError):
+        LeagueTrainer(RPS_PAYOFF, ["vanilla"])
+    with pytest.raises(ValueError):
+        LeagueTrainer([[0, 1]], ["vanilla", "rm+"])
+    with pytest.raises(ValueError):
+        LeagueTrainer(RPS_PAYOFF, ["vanilla", "rm+"], block_size=0)
+    with pytest.raises(ValueError):
+        LeagueTrainer(RPS_PAYOFF, ["vanilla", "rm+"], seeds=[1])
+    with pytest.raises(ValueError):
+        make_league(RPS_PAYOFF, 2).train(1, "full")
@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from cfr.games import RPS_ACTIONS, RPS_PAYOFF
+from cfr.matrix_game_trainer import MatrixGameTrainer
+from cfr.opponent_model import (DecayedModel, OnlineTrainer, SlidingWindowModel, adaptation_latency,
+                                make_model)
+
+ROCK_HEAVY = [0.8, 0.1, 0.1]
+PAPER_HEAVY = [0.1, 0.8, 0.1]
+
+
+def make_trainer():
+    return MatrixGameTrainer(RPS_PAYOFF, [1 / 3] * 3, RPS_ACTIONS)
+
+
+def moves(count, seed=0):
+    return np.random.default_rng(seed).integers(0, 3, count).tolist()
+
+
+# (count + prior) / (total + prior * actions) over weighted moves
+def naive_strategy(history, weights, prior_weight):
+    counts = np.zeros(3)
+    for action, weight in zip(history, weights):
+        counts[action] += weight
+    return (counts + prior_weight) / (counts.sum() + 3 * prior_weight)
+
+
+@pytest.mark.parametrize("count", [0, 5, 50, 51, 333])
+def test_sliding_window_counts_the_last_moves(count):
+    history = moves(count)
+    model = SlidingWindowModel(3, window=50)
+    for action in history:
+        model.update(action)
+    recent = history[-50:]
+    assert model.counts == [float(recent.count(a)) for a in range(3)]
+    assert model.total == len(recent)
+    np.testing.assert_allclose(model.strategy(), naive_strategy(recent, [1.0] * len(recent), 1.0))
+
+
+# Move i of n counts 2^-((n - 1 - i) / half_life), the prior as much as the
+# latest move. half_life=1.5 passes RESCALE a few times.
+@pytest.mark.parametrize("half_life, count", [(10, 40), (100, 500), (1.5, 2000)])
+def test_decayed_counts(half_life, count):
+    history = moves(count, seed=count)
+    model = DecayedModel(3, half_life)
+    for action in history:
+        model.update(action)
+    weights = [2.0 ** (-(count - 1 - i) / half_life) for i in range(count)]
+    np.testing.assert_allclose(model.strategy(), naive_strategy(history, weights, 1.0))
+    assert model.moves == count
+    assert model.weight <= DecayedModel.RESCALE
+
+
+def test_no_half_life_counts_every_move_the_same():
+    history = moves(300)
+    model = DecayedModel(3, None)
+    for action in history:
+        model.update(action)
+    assert model.counts == [float(history.count(a)) for a in range(3)]
+
+
+@pytest.mark.parametrize("kind, size", [("window", 20), ("decay", 20), ("decay", None)])
+def test_expected_utilities_match_the_estimate(kind, size):
+    trainer = make_trainer()
+    model = make_model(trainer, kind, size, prior=0.5)
+    np.testing.assert_allclose(model.expected_utilities(), [0, 0, 0], atol=1e-12)
+    for action in moves(100):
+        model.update(action)
+    np.testing.assert_allclose(model.expected_utilities(), np.asarray(RPS_PAYOFF) @ model.strategy())
+
+
+def test_online_trainer_follows_the_opponent():
+    trainer = make_trainer()
+    online = OnlineTrainer(trainer, make_model(trainer, "window", 50), seed=0)
+    for action in [0] * 200:
+        online.observe(action)
+    assert online.best_response() == 1
+    assert online.strategy[1] > 0.9
+    for action in [1] * 200:
+        online.observe(action)
+    assert online.best_response() == 2
+    assert online.strategy[2] > 0.9
+    assert online.moves == 400
+
+
+def test_adaptation_latency():
+    trainer = make_trainer()
+    online = OnlineTrainer(trainer, make_model(trainer, "window", 50), seed=0)
+    latency = adaptation_latency(online, RPS_PAYOFF, ROCK_HEAVY, PAPER_HEAVY, warmup=500, seed=0)
+    assert latency is not None and latency < 500
+    # A model that never forgets takes far longer to notice the switch
+    slow = OnlineTrainer(trainer, make_model(trainer, "decay", None), seed=0)
+    slow_latency = adaptation_latency(slow, RPS_PAYOFF, ROCK_HEAVY, PAPER_HEAVY, warmup=500, seed=0)
+    assert slow_latency is None or slow_latency > latency
+
+
+def test_bad_settings():
+    with pytest.raises(ValueError):
+        SlidingWindowModel(3, window=0)
+    with pytest.raises(ValueError):
+        DecayedModel(3, half_life=0)
+    with pytest.raises(ValueError):
+        make_model(make_trainer(), "kalman")
+    with pytest.raises(ValueError):
+        OnlineTrainer(make_trainer(), SlidingWindowModel(3))
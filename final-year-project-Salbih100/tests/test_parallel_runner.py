@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from cfr.cyclic import make_batched_trainer
+from cfr.games import get_game
+from cfr.parallel_runner import TrainingJob, job_seed_sequences, run_parallel
+
+JOBS = [
+    TrainingJob("rps", [0.4, 0.3, 0.3], 20000),
+    TrainingJob("rpslsp", [0.2] * 5, 20000, mode="nash"),
+    TrainingJob("rps", [1 / 3] * 3, 2000, seed=11, mode="expected"),
+    TrainingJob("rps-7", [1 / 7] * 7, 20000, mode="nash"),
+]
+
+
+def test_results_do_not_depend_on_the_worker_count():
+    one = run_parallel(JOBS, workers=1, root_seed=3)
+    two = run_parallel(JOBS, workers=2, root_seed=3, chunksize=1)
+    np.testing.assert_array_equal(one, two)
+
+
+def test_smaller_games_are_padded_with_zeros():
+    results = run_parallel(JOBS, workers=1, root_seed=0)
+    assert results.shape == (len(JOBS), 2, 7)
+    assert not results[0, :, 3:].any()
+    assert not results[1, :, 5:].any()
+    np.testing.assert_allclose(results[:, 0].sum(axis=1), 1.0)
+
+
+# A job with its own seed gets the same stream as a trainer built by hand
+def test_job_seed_matches_a_single_trainer():
+    job = TrainingJob("rpslsp", [0.1, 0.2, 0.3, 0.2, 0.2], 10000, seed=5)
+    results = run_parallel([job], workers=1, root_seed=99)
+    trainer = make_batched_trainer(get_game("rpslsp")[1], job.opp_strategy, seed=np.random.SeedSequence(5))
+    trainer.train(job.iterations)
+    np.testing.assert_array_equal(results[0, 0], trainer.get_avg_strategy())
+    np.testing.assert_array_equal(results[0, 1], job.opp_strategy)
+
+
+def test_jobs_get_independent_streams():
+    sequences = job_seed_sequences([TrainingJob("rps", [1 / 3] * 3, 10)] * 3, root_seed=0)
+    states = [np.random.default_rng(sequence).random() for sequence in sequences]
+    assert len(set(states)) == 3
+
+
+def test_unknown_mode_is_refused():
+    with pytest.raises(ValueError):
+        run_parallel([TrainingJob("rps", [1 / 3] * 3, 10, mode="bogus")], workers=1)
@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from cfr.games import RPS_ACTIONS, RPS_PAYOFF
+from cfr.matrix_game_trainer import MatrixGameTrainer
+from cfr.play_server import LINE_LIMIT, PlayService, benchmark_in_process
+
+
+def make_service(seed=0):
+    trainer = MatrixGameTrainer(RPS_PAYOFF, [1 / 3] * 3, RPS_ACTIONS)
+    return PlayService(trainer, seed)
+
+
+@pytest.mark.parametrize("text, action", [("rock", 0), ("Paper\n", 1), (" 2 ", 2)])
+def test_parse_action(text, action):
+    assert make_service().parse_action(text) == action
+
+
+@pytest.mark.parametrize("text", ["lizard", "3", "-1", ""])
+def test_parse_action_refuses_unknown(text):
+    with pytest.raises(ValueError):
+        make_service().parse_action(text)
+
+
+# A move replies with the action committed to before it and adds that
+# round's regrets, the same as a trainer iteration would
+def test_move_updates_the_regrets():
+    service = make_service()
+    session_id = service.open_session()
+    session = service.sessions[session_id]
+    committed = session.next_action
+    assert service.move(session_id, 0) == committed
+    utility = service.trainer.utility_rows[0]
+    assert session.regret_sum == [u - utility[committed] for u in utility]
+    assert session.moves == 1
+    assert sum(session.strategy_sum) == pytest.approx(1)
+
+
+def test_session_learns_to_beat_a_fixed_opponent():
+    service = make_service()
+    session_id = service.open_session()
+    for x in range(2000):
+        service.move(session_id, 0)
+    # Paper beats an opponent that always plays rock
+    assert service.average_strategy(session_id)[1] > 0.9
+
+
+def test_sessions_are_independent():
+    service = make_service()
+    first, second = service.open_session(), service.open_session()
+    service.move(first, 0)
+    assert service.sessions[second].moves == 0
+    service.close_session(first)
+    assert list(service.sessions) == [second]
+
+
+async def talk(service, lines):
+    server = await service.start_server()
+    port = server.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    replies = []
+    for line in lines:
+        writer.write(line)
+        await writer.drain()
+        replies.append(await reader.readline())
+    # The server closes the connection once the session is over
+    ended = await reader.read() == b""
+    writer.close()
+    server.close()
+    await server.wait_closed()
+    return replies, ended
+
+
+def test_tcp_session():
+    service = make_service()
+    replies, ended = asyncio.run(talk(service, [b"rock\n", b"1\n", b"lizard\n", b"quit\n"]))
+    assert replies[0].strip().decode() in RPS_ACTIONS
+    assert replies[1].strip().decode() in RPS_ACTIONS
+    assert replies[2].startswith(b"error unknown action")
+    assert replies[3] == b""
+    assert ended
+    assert service.sessions == {}
+
+
+def test_overlong_line_ends_the_session():
+    service = make_service()
+    replies, ended = asyncio.run(talk(service, [b"r" * (LINE_LIMIT * 2) + b"\n"]))
+    assert replies == [b"error line longer than %d bytes\n" % LINE_LIMIT]
+    assert ended
+    assert service.sessions == {}
+
+
+def test_benchmark_in_process():
+    service = make_service()
+    report = asyncio.run(benchmark_in_process(service, 5, 20))
+    assert report.moves == 100
+    assert report.p50_us <= report.p99_us
+    assert service.sessions == {}
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from cfr.history import HistoryRecorder
+from cfr.plotting import (PlotJob, export_plots, history_arrays, lttb, lttb_indices, minmax_envelope,
+                          save_plot, synthetic_history)
+
+ACTIONS = ["rock", "paper", "scissors"]
+
+
+# Largest triangle three buckets written out point by point, with the same
+# bucket edges as lttb_indices()
+def naive_lttb(x, y, threshold):
+    samples = len(x)
+    edges = [int(e) for e in np.linspace(1, samples - 1, threshold - 1)]
+    kept = [0]
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 1 < threshold - 2:
+            following = range(edges[bucket + 1], edges[bucket + 2])
+            mean_x = sum(x[i] for i in following) / len(following)
+            mean_y = sum(y[i] for i in following) / len(following)
+        else:
+            mean_x, mean_y = x[-1], y[-1]
+        a = kept[-1]
+        areas = [abs((x[a] - mean_x) * (y[i] - y[a]) - (x[a] - x[i]) * (mean_y - y[a]))
+                 for i in range(start, end)]
+        kept.append(start + areas.index(max(areas)))
+    kept.append(samples - 1)
+    return kept
+
+
+@pytest.mark.parametrize("samples, threshold", [(1000, 50), (1001, 3), (12345, 2000), (100, 99)])
+def test_lttb_keeps_the_endpoints_and_point_count(samples, threshold):
+    x = np.arange(samples) * 10.0
+    y = np.random.default_rng(samples).random(samples)
+    kept = lttb_indices(x, y, threshold)
+    assert len(kept) == threshold
+    assert kept[0] == 0 and kept[-1] == samples - 1
+    assert np.all(np.diff(kept) > 0)
+    assert kept.tolist() == naive_lttb(x.tolist(), y.tolist(), threshold)
+
+
+def test_lttb_keeps_a_spike():
+    x = np.arange(10000.0)
+    y = np.zeros(10000)
+    y[4321] = 1.0
+    assert 4321 in lttb_indices(x, y, 100)
+
+
+def test_lttb_short_lines_are_kept_whole():
+    x, y = lttb([0, 1, 2], [0.5, 0.2, 0.3], 2000)
+    assert x.tolist() == [0, 1, 2] and y.tolist() == [0.5, 0.2, 0.3]
+
+
+def test_minmax_envelope():
+    x = np.arange(8)
+    y = np.array([3, 1, 4, 1, 5, 9, 2, 6])
+    starts, low, high = minmax_envelope(x, y, 4)
+    assert starts.tolist() == [0, 2, 4, 6]
+    assert low.tolist() == [1, 1, 5, 2]
+    assert high.tolist() == [3, 4, 9, 6]
+
+
+def test_history_arrays():
+    recorder = HistoryRecorder(3, interval=1)
+    recorder.record(1, [0.2, 0.3, 0.5])
+    recorder.record(2, [0.1, 0.1, 0.8])
+    iterations, strategies = history_arrays(recorder)
+    assert iterations.tolist() == [1, 2]
+    np.testing.assert_allclose(strategies[1], [0.1, 0.1, 0.8])
+    pair = history_arrays(([1, 2], [[1, 0, 0], [0, 1, 0]]))
+    assert pair[1].dtype == np.float64
+
+
+# Saving draws on an Agg canvas, no display is needed
+@pytest.mark.parametrize("method", ["lttb", "minmax", "none"])
+def test_save_plot(tmp_path, method):
+    pytest.importorskip("matplotlib")
+    path = tmp_path / ("history-%s.png" % method)
+    save_plot(synthetic_history(5000, seed=0), ACTIONS, str(path), "Title", max_points=200, method=method)
+    assert path.read_bytes()[:8] == b"\x89PNG\r\n\x1a\n"
+
+
+def test_save_plot_refuses_unknown_method(tmp_path):
+    pytest.importorskip("matplotlib")
+    with pytest.raises(ValueError):
+        save_plot(synthetic_history(10), ACTIONS, str(tmp_path / "x.png"), method="spline")
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_export_plots(tmp_path, workers):
+    pytest.importorskip("matplotlib")
+    jobs = [PlotJob(synthetic_history(1000, seed=run), ACTIONS, str(tmp_path / ("run-%d.png" % run)))
+            for run in range(3)]
+    assert export_plots(jobs, workers, max_points=100) == [job.path for job in jobs]
+    assert all((tmp_path / ("run-%d.png" % run)).stat().st_size > 0 for run in range(3))
+
+
+def test_synthetic_history_rows_are_strategies():
+    iterations, strategies = synthetic_history(100, 4, seed=0)
+    assert iterations[-1] == 9900
+    np.testing.assert_allclose(strategies.sum(axis=1), 1)
@@ -0,0 +1,72 @@
+import pytest
+
+from cfr.batched_trainer import BatchedTrainer
+from cfr.compact_trainer import CompactGame, CompactTrainer
+from cfr.games import RPS_PAYOFF
+from cfr.history import HistoryRecorder
+from cfr.matrix_game_trainer import MatrixGameTrainer
+from cfr.result_cache import ResultCache
+
+OPP_STRATEGY = [0.4, 0.3, 0.3]
+STEPS = {"train": "train", "nash": "nash_equilibrium", "expected": "expected_nash_equilibrium"}
+FACTORIES = {
+    "matrix": lambda: MatrixGameTrainer(RPS_PAYOFF, OPP_STRATEGY, seed=0),
+    "ring_history": lambda: MatrixGameTrainer(RPS_PAYOFF, OPP_STRATEGY, seed=0,
+                                              history=HistoryRecorder(3, capacity=50, retention="ring")),
+    "compact": lambda: CompactTrainer(CompactGame(RPS_PAYOFF, seed=0), OPP_STRATEGY),
+    "batched": lambda: BatchedTrainer(RPS_PAYOFF, OPP_STRATEGY, seed=0),
+}
+
+
+def as_list(values):
+    return [float(v) for v in values]
+
+
+def assert_same_state(trainer, expected):
+    assert trainer.iteration == expected.iteration
+    for field in ("regret_sum", "strategy_sum", "opp_regret_sum", "opp_strategy_sum"):
+        assert as_list(getattr(trainer, field)) == as_list(getattr(expected, field))
+    if expected.history is not None:
+        assert trainer.history.iterations().tolist() == expected.history.iterations().tolist()
+        assert trainer.history.strategies().tolist() == expected.history.strategies().tolist()
+        assert trainer.history.next_iteration == expected.history.next_iteration
+
+
+@pytest.mark.parametrize("engine", sorted(FACTORIES))
+@pytest.mark.parametrize("mode", sorted(STEPS))
+def test_hit_matches_fresh_run(tmp_path, engine, mode):
+    factory = FACTORIES[engine]
+    cache = ResultCache(str(tmp_path))
+    assert not cache.run(factory(), mode, 30000)
+    cached = factory()
+    assert cache.run(cached, mode, 30000)
+
+    fresh = factory()
+    getattr(fresh, STEPS[mode])(30000)
+    assert_same_state(cached, fresh)
+
+    # Both carry on the same way from there
+    cached.train(1000)
+    fresh.train(1000)
+    assert_same_state(cached, fresh)
+
+
+def test_trained_trainer_is_refused(tmp_path):
+    trainer = FACTORIES["matrix"]()
+    trainer.train(10)
+    with pytest.raises(ValueError):
+        ResultCache(str(tmp_path)).run(trainer, "train", 1000)
+
+
+def test_eviction_keeps_within_max_bytes(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    for seed in range(6):
+        cache.run(MatrixGameTrainer(RPS_PAYOFF, OPP_STRATEGY, seed=seed), "nash", 1000)
+    entry_bytes = cache.stats().size_bytes // 6
+
+    small = ResultCache(str(tmp_path), max_bytes=2 * entry_bytes)
+    small.evict()
+    stats = small.stats()
+    assert stats.entries == 2
+    assert stats.size_bytes <= 2 * entry_bytes
+    assert small.evictions == 4
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from cfr.sampler import ALIAS_THRESHOLD, ActionSampler, AliasTable, CumulativeTable
+
+SAMPLES = 200000
+
+
+def frequencies(table, samples=SAMPLES, seed=0):
+    actions = table.sample_block(np.random.default_rng(seed), samples)
+    return np.bincount(actions, minlength=table.NUM_ACTIONS) / samples
+
+
+@pytest.mark.parametrize("table_class", [CumulativeTable, AliasTable])
+def test_tables_draw_the_strategy(table_class):
+    strategy = np.random.default_rng(1).dirichlet(np.ones(40))
+    np.testing.assert_allclose(frequencies(table_class(strategy)), strategy, atol=0.005)
+
+
+@pytest.mark.parametrize("table_class", [CumulativeTable, AliasTable])
+def test_zero_probability_actions_never_come_up(table_class):
+    assert frequencies(table_class([0.0, 0.5, 0.0, 0.5]))[[0, 2]].sum() == 0
+
+
+@pytest.mark.parametrize("table_class", [CumulativeTable, AliasTable])
+def test_all_zero_strategy_is_uniform(table_class):
+    table = table_class([0.0] * 5)
+    np.testing.assert_allclose(frequencies(table), [0.2] * 5, atol=0.005)
+
+
+@pytest.mark.parametrize("table_class", [CumulativeTable, AliasTable])
+def test_negative_probability_is_refused(table_class):
+    with pytest.raises(ValueError):
+        table_class([0.5, -0.1, 0.6])
+
+
+def test_table_picks_alias_for_many_actions():
+    sampler = ActionSampler(ALIAS_THRESHOLD + 1, seed=0)
+    assert isinstance(sampler.table([1.0 / (ALIAS_THRESHOLD + 1)] * (ALIAS_THRESHOLD + 1)), AliasTable)
+    assert isinstance(ActionSampler(3, seed=0).table([0.2, 0.3, 0.5]), CumulativeTable)
+
+
+def test_sample_matches_cumulative_scan():
+    sampler = ActionSampler(3, seed=2, block_size=16)
+    uniforms = np.random.default_rng(2).random(40)
+    strategy = [0.2, 0.5, 0.3]
+    expected = [int(np.searchsorted(np.cumsum(strategy), r, side="right")) for r in uniforms]
+    assert [sampler.sample(strategy) for x in range(40)] == expected
+
+
+# Saving and restoring the state mid-block carries on with the same numbers
+def test_state_round_trip():
+    sampler = ActionSampler(3, seed=4, block_size=10)
+    strategy = [0.3, 0.3, 0.4]
+    table = sampler.table(strategy)
+    for x in range(13):
+        sampler.sample(strategy)
+    state = sampler.get_state()
+    expected = [sampler.sample(strategy) for x in range(25)] + sampler.sample_block(table, 50).tolist()
+
+    restored = ActionSampler(3, seed=123, block_size=10)
+    restored.set_state(state)
+    assert [restored.sample(strategy) for x in range(25)] + restored.sample_block(table, 50).tolist() == expected
+
+
+def test_same_seed_same_actions():
+    first = ActionSampler(5, seed=9)
+    second = ActionSampler(5, seed=9)
+    strategy = [0.1, 0.2, 0.3, 0.2, 0.2]
+    assert [first.sample(strategy) for x in range(1000)] == [second.sample(strategy) for x in range(1000)]
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from cfr.batched_trainer import BatchedTrainer
+from cfr.convergence import best_response_gap
+from cfr.games import RPS_PAYOFF, RPSLSP_PAYOFF
+from cfr.sweep import SweepTrainer, stacked_normalise, stacked_regret_matching, sweep
+
+
+def test_stacked_regret_matching_rows():
+    strategy = stacked_regret_matching(np.array([[1.0, 3.0, -2.0], [-1.0, -1.0, 0.0]]))
+    np.testing.assert_allclose(strategy, [[0.25, 0.75, 0.0], [1 / 3, 1 / 3, 1 / 3]])
+
+
+def test_stacked_normalise_rows():
+    average = stacked_normalise(np.array([[2.0, 2.0, 4.0], [0.0, 0.0, 0.0]]))
+    np.testing.assert_allclose(average, [[0.25, 0.25, 0.5], [1 / 3, 1 / 3, 1 / 3]])
+
+
+# Against a pure opponent the counts are not random, so every row has to
+# follow BatchedTrainer.train() exactly
+def test_rows_follow_batched_trainer():
+    opponents = np.eye(3)
+    trainer = SweepTrainer(RPS_PAYOFF, opponents, block_size=100, seed=0)
+    trainer.train(10000)
+    for row, opp_strategy in enumerate(opponents):
+        single = BatchedTrainer(RPS_PAYOFF, opp_strategy, block_size=100, seed=0)
+        single.train(10000)
+        np.testing.assert_allclose(trainer.regret_sum[row], single.regret_sum, rtol=1e-12)
+        np.testing.assert_allclose(trainer.strategy_sum[row], single.strategy_sum, rtol=1e-12)
+
+
+def test_every_row_is_a_best_response():
+    opponents = np.random.default_rng(1).dirichlet(np.ones(5), size=20)
+    strategies = sweep(opponents, 200000, RPSLSP_PAYOFF, seed=0)
+    assert strategies.shape == (20, 5)
+    np.testing.assert_allclose(strategies.sum(axis=1), 1.0)
+    for strategy, opp_strategy in zip(strategies, opponents):
+        assert best_response_gap(RPSLSP_PAYOFF, strategy, opp_strategy) < 0.05
+
+
+def test_same_seed_same_sweep():
+    opponents = [[0.4, 0.3, 0.3], [0.1, 0.1, 0.8]]
+    np.testing.assert_array_equal(sweep(opponents, 5000, seed=7), sweep(opponents, 5000, seed=7))
+
+
+def test_bad_shapes_are_refused():
+    with pytest.raises(ValueError):
+        SweepTrainer(RPS_PAYOFF, [[0.5, 0.5]])
+    with pytest.raises(ValueError):
+        SweepTrainer([[1, 0, 0], [0, 1, 0]], [[1, 0, 0]])
+    with pytest.raises(ValueError):
+        SweepTrainer(RPS_PAYOFF, [[1, 0, 0]], block_size=0)
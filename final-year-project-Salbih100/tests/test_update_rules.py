@@ -0,0 +1,93 @@
+import pytest
+
+from cfr.compare_rules import compare_rules, summarise
+from cfr.convergence import ConvergenceResult
+from cfr.games import RPS_ACTIONS, RPS_PAYOFF
+from cfr.matrix_game_trainer import MatrixGameTrainer
+from cfr.update_rules import UPDATE_RULES, UpdateRule, discounted, get_update_rule
+
+UNIFORM = [1 / 3] * 3
+
+
+def test_vanilla_leaves_the_regrets_alone():
+    rule = get_update_rule("vanilla")
+    assert not rule.changes_regrets
+    regrets = [2.0, -3.0, 0.0]
+    rule.apply(regrets, 5)
+    assert regrets == [2.0, -3.0, 0.0]
+
+
+def test_regret_matching_plus_floors_at_zero():
+    regrets = [2.0, -3.0, 0.5]
+    get_update_rule("rm+").apply(regrets, 5)
+    assert regrets == [2.0, 0.0, 0.5]
+
+
+@pytest.mark.parametrize("t", [1, 2, 10])
+def test_discount_factors(t):
+    regrets = [4.0, -4.0]
+    UpdateRule("test", alpha=1.5, beta=0.5).apply(regrets, t)
+    assert regrets[0] == pytest.approx(4 * t ** 1.5 / (t ** 1.5 + 1))
+    assert regrets[1] == pytest.approx(-4 * t ** 0.5 / (t ** 0.5 + 1))
+
+
+def test_linear_discounts_both_sides_by_t_over_t_plus_one():
+    regrets = [3.0, -3.0]
+    get_update_rule("linear").apply(regrets, 2)
+    assert regrets == pytest.approx([2.0, -2.0])
+
+
+def test_dcfr_defaults():
+    rule = discounted()
+    assert (rule.alpha, rule.beta, rule.gamma) == (1.5, 0.0, 2.0)
+    # beta=0 halves the negative regrets every iteration
+    regrets = [-1.0]
+    rule.apply(regrets, 7)
+    assert regrets == [-0.5]
+
+
+# Iteration t adds its strategy with weight t^gamma, so strategy_sum adds up
+# to the sum of the weights
+@pytest.mark.parametrize("rule, total", [("vanilla", 4), ("linear", 1 + 2 + 3 + 4),
+                                         ("dcfr", 1 + 4 + 9 + 16)])
+def test_average_strategy_weights(rule, total):
+    trainer = MatrixGameTrainer(RPS_PAYOFF, UNIFORM, RPS_ACTIONS, seed=0, update_rule=rule)
+    trainer.nash_equilibrium(4)
+    assert sum(trainer.strategy_sum) == pytest.approx(total)
+    assert sum(trainer.opp_strategy_sum) == pytest.approx(total)
+
+
+@pytest.mark.parametrize("name", sorted(UPDATE_RULES))
+def test_every_rule_converges(name):
+    trainer = MatrixGameTrainer(RPS_PAYOFF, UNIFORM, RPS_ACTIONS, seed=0, update_rule=name)
+    trainer.expected_nash_equilibrium(5000)
+    assert trainer.exploitability("expected") < 0.05
+
+
+def test_get_update_rule():
+    rule = UpdateRule("custom", floor=True)
+    assert get_update_rule(rule) is rule
+    assert get_update_rule("cfr+") is UPDATE_RULES["cfr+"]
+    with pytest.raises(ValueError):
+        get_update_rule("cfr++")
+    with pytest.raises(ValueError):
+        MatrixGameTrainer(RPS_PAYOFF, UNIFORM, update_rule="fast")
+
+
+def run(converged, iterations):
+    return ConvergenceResult(converged, iterations, iterations / 1000.0, 0.0, [])
+
+
+# Runs that hit the limit are counted apart, not folded into the medians
+def test_summarise_uses_converged_runs_only():
+    assert summarise([run(True, 100), run(True, 300), run(False, 10000)]) == (200, 0.2, 1)
+    assert summarise([run(False, 10000), run(False, 10000)]) == (None, None, 2)
+
+
+def test_compare_rules():
+    results = compare_rules(["rps"], ["vanilla", "cfr+"], epsilon=0.05, max_iterations=2000,
+                            check_every=500, repeats=2)
+    assert list(results) == [("rps", "vanilla"), ("rps", "cfr+")]
+    for runs in results.values():
+        assert len(runs) == 2
+        assert all(run.iterations <= 2000 for run in runs)